@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén compartido de versiones de datos en formato Arrow IPC
+Cada versión de los datos (tablas e índices ya construidos) se publica como
+archivos Arrow IPC sin compresión en un directorio compartido. Los procesos
+de la app los abren con memory-map, de modo que todos leen las mismas
+páginas del cache del sistema operativo en lugar de tener copias privadas.
+El archivo puntero y la reserva de construcción son los de
+almacen_versiones.AlmacenVersiones
+"""
+
+import os
+import sys
+import json
+import shutil
+import traceback
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+    print("⚠️ pyarrow no está instalado. Se desactiva el almacén Arrow compartido.", file=sys.stderr)
+
+import config_sharepoint as config
+from conjunto_datos import ConjuntoDatos, construir_conjunto_datos
+from indices import IndicePacientes, IndiceActividades, IndiceNombres
+from cubo_actividades import CuboActividades
+from almacen_versiones import AlmacenVersiones
+from instrumentacion import instrumentacion
+
+
+MANIFIESTO = 'manifiesto.json'
+SUFIJO_TABLA = '.arrow'
+
+# Se incrementa cuando cambian las tablas o arreglos que se publican, para
+# no abrir versiones escritas con un formato anterior
+FORMATO = 3
+
+
+def _a_pandas(tabla):
+    """
+    DataFrame de una tabla Arrow abierta, con los mismos dtypes de la versión construida
+    
+    Los metadatos pandas que escribe Table.from_pandas restauran los dtypes
+    de config.ESQUEMAS (int32, Int32, string, categorías, datetime64), así
+    que la versión abierta se consulta igual que la construida en memoria.
+    Las columnas numpy sin nulos y las de texto de pyarrow siguen apuntando
+    al memory-map. Con pandas 3 el texto que era object se abre como str, así
+    que esas columnas se devuelven a object.
+    """
+    df = tabla.to_pandas(split_blocks=True)
+    for columna in tabla.schema.pandas_metadata['columns']:
+        if columna['numpy_type'] == 'object' and df[columna['name']].dtype != object:
+            df[columna['name']] = df[columna['name']].astype(object)
+    return df
+
+
+def _escribir_tabla(path, tabla):
+    """Escribir una tabla Arrow como archivo IPC sin compresión (apto para memory-map)"""
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, tabla.schema) as writer:
+            writer.write_table(tabla)
+
+
+def _leer_tabla(path):
+    """Abrir un archivo IPC con memory-map (no lee los datos hasta que se usan)"""
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+class AlmacenArrow(AlmacenVersiones):
+    """Publicación y apertura de versiones de datos en un directorio compartido"""
+    
+    def __init__(self, directorio=None):
+        super().__init__(directorio or config.ALMACEN_ARROW_DIRECTORIO)
+    
+    def _version_path(self, version):
+        return os.path.join(self.directorio, f"{version}-f{FORMATO}")
+    
+    def publicar(self, conjunto):
+        """
+        Escribir una versión completa y apuntar el puntero a ella
+        
+        Los archivos se escriben en un directorio temporal que se renombra al
+        terminar, así que un directorio de versión siempre está completo.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        destino = self._version_path(conjunto.version)
+        tmp_path = f"{destino}.tmp{os.getpid()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        
+        tablas_pacientes, arreglos_pacientes = conjunto.indice_pacientes.partes()
+        tablas_actividades, arreglos_actividades = conjunto.indice_actividades.partes()
+        tablas_nombres, arreglos_nombres = conjunto.indice_nombres.partes()
+        tablas_cubo, arreglos_cubo = conjunto.cubo_actividades.partes()
+        tablas = {'actividades': conjunto.actividades}
+        tablas.update({f'pacientes.{k}': v for k, v in tablas_pacientes.items()})
+        tablas.update({f'actividades.{k}': v for k, v in tablas_actividades.items()})
+        tablas.update({f'nombres.{k}': v for k, v in tablas_nombres.items()})
+        tablas.update({f'cubo.{k}': v for k, v in tablas_cubo.items()})
+        arreglos = {f'pacientes.{k}': v for k, v in arreglos_pacientes.items()}
+        arreglos.update({f'actividades.{k}': v for k, v in arreglos_actividades.items()})
+        arreglos.update({f'nombres.{k}': v for k, v in arreglos_nombres.items()})
+        arreglos.update({f'cubo.{k}': v for k, v in arreglos_cubo.items()})
+        
+        try:
+            with instrumentacion.fase('almacen_publicar') as medida:
+                for nombre, df in tablas.items():
+                    _escribir_tabla(os.path.join(tmp_path, nombre + SUFIJO_TABLA),
+                                    pa.Table.from_pandas(df, preserve_index=False))
+                for nombre, arreglo in arreglos.items():
+                    _escribir_tabla(os.path.join(tmp_path, nombre + SUFIJO_TABLA),
+                                    pa.table({'valores': pa.array(arreglo)}))
+                medida['bytes'] = sum(entrada.stat().st_size for entrada in os.scandir(tmp_path))
+            
+            with open(os.path.join(tmp_path, MANIFIESTO), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': conjunto.version,
+                    'cargado_en': conjunto.cargado_en.isoformat(),
+                    'tablas': sorted(tablas),
+                    'arreglos': sorted(arreglos),
+                }, f)
+        except BaseException:
+            # No dejar directorios temporales a medio escribir
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        
+        if os.path.exists(destino):
+            # Otro proceso ya publicó esta versión
+            shutil.rmtree(tmp_path)
+        else:
+            os.replace(tmp_path, destino)
+        
+        self._apuntar(conjunto.version)
+        print(f"📦 Versión {conjunto.version} publicada en {self.directorio}")
+        self._limpiar(conjunto.version)
+    
+    def construir(self, loader, version, anterior=None):
+        """Construir una versión en memoria, publicarla y abrir la copia compartida"""
+        conjunto = construir_conjunto_datos(loader, version=version, anterior=anterior)
+        try:
+            self.publicar(conjunto)
+        except Exception as e:
+            # Sin publicar (disco lleno, permisos) la versión construida sigue
+            # sirviendo a este proceso; los demás la construyen por su cuenta
+            print(f"❌ No se pudo publicar la versión {version} en {self.directorio}: {e}")
+            traceback.print_exc()
+            return conjunto
+        
+        # Usar también aquí la copia compartida para liberar la privada
+        return self.abrir(version) or conjunto
+    
+    def abrir(self, version):
+        """
+        Abrir una versión publicada con memory-map
+        
+        Returns:
+            ConjuntoDatos cuyas tablas y arreglos apuntan a los archivos
+            compartidos, o None si la versión no está publicada
+        """
+        path = self._version_path(version)
+        try:
+            with open(os.path.join(path, MANIFIESTO), 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        with instrumentacion.fase('almacen_abrir'):
+            tablas = {
+                nombre: _a_pandas(_leer_tabla(os.path.join(path, nombre + SUFIJO_TABLA)))
+                for nombre in manifiesto['tablas']
+            }
+            # Arreglos numpy de solo lectura sobre el memory-map (sin copia)
+            arreglos = {
+                nombre: _leer_tabla(os.path.join(path, nombre + SUFIJO_TABLA)).column(0).chunk(0).to_numpy()
+                for nombre in manifiesto['arreglos']
+            }
+        
+        def partes(prefijo, origen):
+            return {k[len(prefijo):]: v for k, v in origen.items() if k.startswith(prefijo)}
+        
+        indice_pacientes = IndicePacientes.desde_partes(
+            partes('pacientes.', tablas), partes('pacientes.', arreglos))
+        indice_actividades = IndiceActividades.desde_partes(
+            partes('actividades.', tablas), partes('actividades.', arreglos))
+        indice_nombres = IndiceNombres.desde_partes(
+            partes('nombres.', tablas), partes('nombres.', arreglos), indice_pacientes.pacientes)
+        cubo_actividades = CuboActividades.desde_partes(partes('cubo.', tablas), partes('cubo.', arreglos))
+        
+        print(f"📦 Versión {version} abierta desde {self.directorio} (memory-map)")
+        return ConjuntoDatos(tablas['actividades'], indice_pacientes, indice_actividades, indice_nombres,
+                             cubo_actividades, version,
+                             cargado_en=datetime.fromisoformat(manifiesto['cargado_en']))
+    
+    def _limpiar(self, version_actual):
+        """Eliminar versiones antiguas, conservando las más recientes"""
+        versiones = [
+            nombre for nombre in os.listdir(self.directorio)
+            if os.path.isfile(os.path.join(self.directorio, nombre, MANIFIESTO))
+        ]
+        versiones.sort(key=lambda nombre: os.path.getmtime(os.path.join(self.directorio, nombre)), reverse=True)
+        
+        actual = os.path.basename(self._version_path(version_actual))
+        for nombre in versiones[config.ALMACEN_ARROW_VERSIONES_CONSERVAR:]:
+            if nombre == actual:
+                continue
+            # En Linux los procesos que aún tengan la versión abierta conservan
+            # sus páginas; en Windows puede fallar mientras esté en uso
+            shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
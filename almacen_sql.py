@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend SQL embebido (DuckDB o SQLite) para consultar fuera de memoria
+Alternativa a los índices en memoria para cuando el histórico no cabe en
+RAM: cada versión de los datos se ingiere por bloques desde los CSV en un
+archivo de base de datos con índices sobre ID_PACIENTE, IDE_PAC, ID_ACTPYP
+e IDCAB_FAC, y las búsquedas se resuelven con joins en SQL. La memoria
+queda acotada por el bloque de ingesta y por el tamaño de cada resultado,
+no por el tamaño del histórico. Devuelve los mismos resultados que los
+índices de indices.py y se publica con el mismo puntero y la misma reserva
+de construcción entre procesos que el almacén Arrow
+"""
+
+import os
+import sys
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+import config_sharepoint as config
+from sharepoint_loader import aplicar_esquema
+from conjunto_datos import preparar_actividades, preparar_datos_pacientes
+from indices import IndiceNombres, COLUMNAS_HISTORICO, COLUMNAS_PACIENTE
+from cubo_actividades import CuboActividades
+from almacen_versiones import AlmacenVersiones
+from instrumentacion import instrumentacion
+
+
+# Se incrementa cuando cambian las tablas o los índices de la base
+FORMATO = 2
+
+# Fechas en SQLite: texto de ancho fijo, que se ordena y compara como la fecha
+FORMATO_FECHA_SQLITE = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def _esquema_resultados():
+    """
+    Tipos de los IDs y fechas de los resultados, los mismos de config.ESQUEMAS
+    que tienen las tablas en memoria (nullable si alguna declaración lo es)
+    
+    Las fechas de SQLite llegan como texto con FORMATO_FECHA_SQLITE; las de
+    DuckDB ya son fechas. Los textos quedan como object: convertir cada
+    resultado a categorías cuesta más que la consulta
+    """
+    esquema = {'FECHA_ATENCION': ('datetime64[ns]', FORMATO_FECHA_SQLITE)}
+    for tipos in config.ESQUEMAS.values():
+        for columna, tipo in tipos.items():
+            if isinstance(tipo, tuple):
+                esquema[columna] = (tipo[0], FORMATO_FECHA_SQLITE)
+            elif tipo.lower().startswith('int') and not esquema.get(columna, '').startswith('Int'):
+                esquema[columna] = tipo
+    return esquema
+
+
+ESQUEMA_RESULTADOS = _esquema_resultados()
+
+ESQUEMA_BASE = """
+CREATE TABLE actividades (ID_ACTXPROG INTEGER, DES_ACTXPROG VARCHAR);
+CREATE TABLE historico (ID_PACIENTE INTEGER, ID_ACTPYP INTEGER, IDCAB_FAC INTEGER, FECHA {fecha}, POSICION BIGINT);
+CREATE TABLE facturas (IDCAB_FAC INTEGER, FAC_FEC {fecha}, POSICION BIGINT);
+CREATE TABLE metadatos (clave VARCHAR, valor VARCHAR);
+CREATE TABLE cubo (CELDA BIGINT, CLAVE BIGINT, ATENCIONES BIGINT, PACIENTES BIGINT);
+CREATE TABLE cubo_sexos (CODIGO INTEGER, SEX_PAC VARCHAR);
+"""
+
+INDICES_BASE = """
+CREATE INDEX idx_pacientes_documento ON pacientes (IDE_PAC);
+CREATE INDEX idx_pacientes_id ON pacientes (ID_PACIENTE);
+CREATE INDEX idx_historico_paciente ON historico (ID_PACIENTE);
+CREATE INDEX idx_historico_actividad ON historico (ID_ACTPYP);
+CREATE INDEX idx_facturas_id ON facturas (IDCAB_FAC);
+"""
+
+# Fecha de la atención: la de la factura y, si no tiene, la del histórico
+FECHA_ATENCION = "COALESCE(f.FAC_FEC, h.FECHA)"
+
+SQL_PACIENTE = "SELECT * FROM pacientes WHERE IDE_PAC = ? ORDER BY POSICION LIMIT 1"
+
+SQL_ATENCIONES_PACIENTE = f"""
+SELECT h.ID_PACIENTE, h.ID_ACTPYP, h.IDCAB_FAC, h.FECHA, f.FAC_FEC, a.DES_ACTXPROG,
+       {FECHA_ATENCION} AS FECHA_ATENCION
+FROM historico h
+JOIN actividades a ON a.ID_ACTXPROG = h.ID_ACTPYP
+LEFT JOIN facturas f ON f.IDCAB_FAC = h.IDCAB_FAC
+WHERE h.ID_PACIENTE = ?
+ORDER BY FECHA_ATENCION DESC NULLS LAST, h.POSICION
+"""
+
+SQL_DOCUMENTOS = f"""
+WITH encontrados AS (
+    SELECT b.ORDEN, p.*, ROW_NUMBER() OVER (PARTITION BY b.ORDEN ORDER BY p.POSICION) AS N
+    FROM buscados b
+    JOIN pacientes p ON p.IDE_PAC = b.DOCUMENTO
+)
+SELECT b.DOCUMENTO AS DOCUMENTO_BUSCADO,
+       CASE WHEN e.ORDEN IS NULL THEN 'No encontrado'
+            WHEN h.ID_ACTPYP IS NULL THEN 'Sin atenciones'
+            ELSE 'Encontrado' END AS ESTADO,
+       e.ID_PACIENTE, {', '.join(f'e.{c}' for c in COLUMNAS_PACIENTE)},
+       h.ID_ACTPYP, a.DES_ACTXPROG, {FECHA_ATENCION} AS FECHA_ATENCION, h.IDCAB_FAC
+FROM buscados b
+LEFT JOIN encontrados e ON e.ORDEN = b.ORDEN AND e.N = 1
+LEFT JOIN historico h ON h.ID_PACIENTE = e.ID_PACIENTE
+LEFT JOIN actividades a ON a.ID_ACTXPROG = h.ID_ACTPYP
+LEFT JOIN facturas f ON f.IDCAB_FAC = h.IDCAB_FAC
+ORDER BY b.ORDEN, FECHA_ATENCION DESC NULLS LAST, h.POSICION
+"""
+
+SQL_ACTIVIDAD = f"""
+SELECT {', '.join(f'p.{c}' for c in COLUMNAS_PACIENTE)}, {FECHA_ATENCION} AS FECHA_ATENCION, h.IDCAB_FAC
+FROM historico h
+LEFT JOIN facturas f ON f.IDCAB_FAC = h.IDCAB_FAC
+LEFT JOIN pacientes p ON p.ID_PACIENTE = h.ID_PACIENTE
+WHERE h.ID_ACTPYP = ?{{filtros}}
+ORDER BY FECHA_ATENCION DESC NULLS LAST, h.POSICION, p.POSICION{{limite}}
+"""
+
+# Sexo de cada paciente: el del primer registro en DAT_PER (como sexo_pacientes)
+SQL_SEXO_PACIENTES = """
+SELECT ID_PACIENTE, SEX_PAC FROM (
+    SELECT ID_PACIENTE, SEX_PAC, ROW_NUMBER() OVER (PARTITION BY ID_PACIENTE ORDER BY POSICION) AS N
+    FROM pacientes
+    WHERE ID_PACIENTE IS NOT NULL
+) WHERE N = 1
+"""
+
+# Sexos del cubo en el orden en que aparecen en el histórico (códigos 1, 2, ...)
+SQL_CUBO_SEXOS = f"""
+WITH sexos AS ({SQL_SEXO_PACIENTES})
+SELECT s.SEX_PAC
+FROM historico h
+JOIN sexos s ON s.ID_PACIENTE = h.ID_PACIENTE
+WHERE s.SEX_PAC IS NOT NULL
+GROUP BY s.SEX_PAC
+ORDER BY MIN(h.POSICION)
+"""
+
+# Meses desde 1970-01 de la fecha de atención (vacío si no tiene fecha)
+MES_ATENCION = {
+    'duckdb': f"(year({FECHA_ATENCION}) - 1970) * 12 + month({FECHA_ATENCION}) - 1",
+    'sqlite': f"(CAST(substr({FECHA_ATENCION}, 1, 4) AS INTEGER) - 1970) * 12"
+              f" + CAST(substr({FECHA_ATENCION}, 6, 2) AS INTEGER) - 1",
+}
+
+# Celdas del cubo de actividades contadas en la base: cada atención en
+# (actividad, mes), (actividad, todos los meses), (todas, mes) y (todas,
+# todos), por sexo. Los pacientes que no están en DAT_PER no se cuentan
+# como pacientes (con_sexo) y de una factura repetida en CAB_FAC se usa la
+# primera fila (atenciones_cubo), para no contar dos veces sus atenciones
+SQL_CUBO_CELDAS = f"""
+WITH sexos AS ({SQL_SEXO_PACIENTES}),
+facturas_unicas AS (
+    SELECT IDCAB_FAC, FAC_FEC FROM (
+        SELECT IDCAB_FAC, FAC_FEC, ROW_NUMBER() OVER (PARTITION BY IDCAB_FAC ORDER BY POSICION) AS N
+        FROM facturas
+    ) WHERE N = 1
+),
+atenciones AS (
+    SELECT h.ID_ACTPYP AS ACTIVIDAD, {{mes}} AS MES, s.SEX_PAC, s.ID_PACIENTE
+    FROM historico h
+    LEFT JOIN facturas_unicas f ON f.IDCAB_FAC = h.IDCAB_FAC
+    LEFT JOIN sexos s ON s.ID_PACIENTE = h.ID_PACIENTE
+)
+SELECT ACTIVIDAD, MES, 0 AS TODOS_LOS_MESES, SEX_PAC,
+       COUNT(*) AS ATENCIONES, COUNT(DISTINCT ID_PACIENTE) AS PACIENTES
+FROM atenciones GROUP BY ACTIVIDAD, MES, SEX_PAC
+UNION ALL
+SELECT ACTIVIDAD, NULL, 1, SEX_PAC, COUNT(*), COUNT(DISTINCT ID_PACIENTE)
+FROM atenciones GROUP BY ACTIVIDAD, SEX_PAC
+UNION ALL
+SELECT NULL, MES, 0, SEX_PAC, COUNT(*), COUNT(DISTINCT ID_PACIENTE)
+FROM atenciones GROUP BY MES, SEX_PAC
+UNION ALL
+SELECT NULL, NULL, 1, SEX_PAC, COUNT(*), COUNT(DISTINCT ID_PACIENTE)
+FROM atenciones GROUP BY SEX_PAC
+"""
+
+
+def motor_sql():
+    """Motor configurado: 'duckdb' (columnar) si está instalado, si no 'sqlite'"""
+    motor = config.BACKEND_SQL_MOTOR
+    if motor == 'auto':
+        return 'duckdb' if DUCKDB_AVAILABLE else 'sqlite'
+    if motor == 'duckdb' and not DUCKDB_AVAILABLE:
+        raise RuntimeError("BACKEND_SQL_MOTOR = 'duckdb' pero duckdb no está instalado (pip install duckdb)")
+    return motor
+
+
+def _tipo_sql(dtype, motor):
+    """Tipo de columna SQL para un dtype de pandas"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'BIGINT'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'DOUBLE'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP' if motor == 'duckdb' else 'VARCHAR'
+    return 'VARCHAR'
+
+
+def _tipo_declarado(columna, esquema, motor):
+    """
+    Tipo SQL de una columna según su tipo en config.ESQUEMAS; las no
+    declaradas (y las derivadas, como NOMBRE_COMPLETO) se guardan como texto
+    """
+    tipo = esquema.get(columna)
+    if tipo is None:
+        return 'VARCHAR'
+    return _tipo_sql(tipo[0] if isinstance(tipo, tuple) else tipo, motor)
+
+
+def _para_sql(df, motor):
+    """
+    Bloque listo para insertar: categorías y textos como object y, en
+    SQLite, fechas como texto de ancho fijo (None para las vacías)
+    """
+    columnas = {}
+    for columna in df.columns:
+        serie = df[columna]
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            if motor == 'sqlite':
+                serie = serie.dt.strftime(FORMATO_FECHA_SQLITE).astype(object).where(serie.notna(), None)
+        elif not (pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_bool_dtype(serie.dtype)):
+            serie = serie.astype(object).where(serie.notna(), None)
+        elif motor == 'sqlite' and (serie.hasnans or isinstance(serie.dtype, pd.api.extensions.ExtensionDtype)):
+            # sqlite3 no acepta pd.NA ni guarda NaN: los vacíos van como None. Los
+            # enteros nullable se iteran como escalares numpy, que guardaría como BLOB
+            serie = serie.astype(object).where(serie.notna(), None)
+        columnas[columna] = serie
+    return pd.DataFrame(columnas)
+
+
+def _parametro_fecha(fecha, motor):
+    fecha = pd.Timestamp(fecha)
+    return fecha.strftime(FORMATO_FECHA_SQLITE) if motor == 'sqlite' else fecha.to_pydatetime()
+
+
+def _conectar(path, motor, solo_lectura):
+    if motor == 'duckdb':
+        con = duckdb.connect(path, read_only=solo_lectura)
+        con.execute(f"SET memory_limit = '{config.BACKEND_SQL_MEMORIA_MB}MB'")
+        return con
+    
+    if solo_lectura:
+        con = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        con = sqlite3.connect(path, check_same_thread=False)
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+    con.execute(f"PRAGMA cache_size = -{config.BACKEND_SQL_SQLITE_CACHE_MB * 1024}")
+    return con
+
+
+def _insertar(con, motor, tabla, df):
+    """Agregar un bloque a una tabla ya creada (mismas columnas, en el mismo orden)"""
+    df = _para_sql(df, motor)
+    columnas = ', '.join(df.columns)
+    if motor == 'duckdb':
+        con.register('bloque', df)
+        con.execute(f"INSERT INTO {tabla} ({columnas}) SELECT {columnas} FROM bloque")
+        con.unregister('bloque')
+    else:
+        marcadores = ', '.join('?' * len(df.columns))
+        con.executemany(f"INSERT INTO {tabla} ({columnas}) VALUES ({marcadores})",
+                        df.itertuples(index=False, name=None))
+
+
+def _consultar(con, motor, sql, parametros=()):
+    """Resultado de una consulta como DataFrame, con los tipos de config.ESQUEMAS"""
+    if motor == 'duckdb':
+        df = con.execute(sql, list(parametros)).df()
+    else:
+        cursor = con.execute(sql, list(parametros))
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+    return aplicar_esquema(df, ESQUEMA_RESULTADOS)
+
+
+def _guardar_cubo(con, motor, cubo):
+    """Guardar las celdas del cubo de actividades (los pares ya contados no se guardan)"""
+    _insertar(con, motor, 'cubo', pd.DataFrame({
+        'CELDA': range(len(cubo.claves)),
+        'CLAVE': cubo.claves,
+        'ATENCIONES': cubo.atenciones,
+        'PACIENTES': cubo.pacientes,
+    }))
+    _insertar(con, motor, 'cubo_sexos', pd.DataFrame({
+        'CODIGO': range(1, len(cubo.sexos) + 1),
+        'SEX_PAC': pd.Series(cubo.sexos, dtype=object),
+    }))
+
+
+def _leer_cubo(base, filas):
+    """Cubo de actividades guardado en la base (sin pares contados: no admite filas nuevas)"""
+    celdas = base.consultar("SELECT CLAVE, ATENCIONES, PACIENTES FROM cubo ORDER BY CELDA")
+    sexos = base.consultar("SELECT SEX_PAC FROM cubo_sexos ORDER BY CODIGO")
+    return CuboActividades.desde_partes({'sexos': sexos}, {
+        'claves': celdas['CLAVE'].to_numpy(dtype='int64'),
+        'atenciones': celdas['ATENCIONES'].to_numpy(dtype='int64'),
+        'pacientes': celdas['PACIENTES'].to_numpy(dtype='int64'),
+        'filas': [filas],
+    })
+
+
+def _bloques(loader, csv_key, **kwargs):
+    """Bloques del CSV con los tipos de config.ESQUEMAS (sin cargarlo completo)"""
+    esquema = config.ESQUEMAS.get(csv_key, {})
+    ruta = loader.ruta_local(csv_key)
+    with pd.read_csv(ruta, encoding='utf-8', chunksize=config.BACKEND_SQL_FILAS_BLOQUE, **kwargs) as lector:
+        for bloque in lector:
+            yield aplicar_esquema(bloque, esquema)
+
+
+def construir_base_sql(loader, path, version, motor):
+    """
+    Ingerir todos los archivos en una base nueva, por bloques
+    
+    Mismas preparaciones que construir_conjunto_datos: catálogo sin
+    duplicados, nombres normalizados y NOMBRE_COMPLETO, y solo las atenciones
+    de actividades del catálogo. POSICION conserva el orden de cada archivo
+    para desempatar igual que los índices en memoria.
+    
+    Args:
+        loader: SharePointLoader usado para obtener los archivos
+        path: Archivo de base de datos a crear
+        version: Versión de las fuentes
+        motor: 'duckdb' o 'sqlite'
+    """
+    con = _conectar(path, motor, solo_lectura=False)
+    try:
+        for sentencia in ESQUEMA_BASE.format(fecha=_tipo_sql('datetime64[ns]', motor)).split(';'):
+            if sentencia.strip():
+                con.execute(sentencia)
+        
+        # Catálogo (pequeño): se prepara completo en memoria
+        with instrumentacion.fase('ingesta_sql', 'ACTXPROG_FILTRADO') as medida:
+            catalogo = preparar_actividades(loader.load_csv('ACTXPROG_FILTRADO'))
+            catalogo = catalogo[['ID_ACTXPROG', 'DES_ACTXPROG']].drop_duplicates('ID_ACTXPROG')
+            _insertar(con, motor, 'actividades', catalogo)
+            medida['filas'] = len(catalogo)
+        codigos = pd.Index(catalogo['ID_ACTXPROG'])
+        
+        with instrumentacion.fase('ingesta_sql', 'DAT_PER') as medida:
+            filas = 0
+            for bloque in _bloques(loader, 'DAT_PER'):
+                bloque = preparar_datos_pacientes(bloque)
+                bloque['POSICION'] = range(filas, filas + len(bloque))
+                if filas == 0:
+                    # Tipos declarados, no los del primer bloque: una columna vacía en
+                    # él se leería como numérica y los bloques siguientes no cabrían
+                    esquema = dict(config.ESQUEMAS.get('DAT_PER', {}), POSICION='int64')
+                    columnas = ', '.join(f"{c} {_tipo_declarado(c, esquema, motor)}" for c in bloque.columns)
+                    con.execute(f"CREATE TABLE pacientes ({columnas})")
+                _insertar(con, motor, 'pacientes', bloque)
+                filas += len(bloque)
+            medida['filas'] = filas
+        
+        with instrumentacion.fase('ingesta_sql', 'HISTORICO_PYP') as medida:
+            filas = leidas = 0
+            for bloque in _bloques(loader, 'HISTORICO_PYP', usecols=COLUMNAS_HISTORICO):
+                bloque['POSICION'] = range(leidas, leidas + len(bloque))
+                leidas += len(bloque)
+                bloque = bloque[codigos.get_indexer(bloque['ID_ACTPYP']) >= 0]
+                _insertar(con, motor, 'historico', bloque[COLUMNAS_HISTORICO + ['POSICION']])
+                filas += len(bloque)
+            medida['filas'] = filas
+        
+        with instrumentacion.fase('ingesta_sql', 'CAB_FAC') as medida:
+            filas = 0
+            for bloque in _bloques(loader, 'CAB_FAC', usecols=['IDCAB_FAC', 'FAC_FEC']):
+                bloque['POSICION'] = range(filas, filas + len(bloque))
+                _insertar(con, motor, 'facturas', bloque[['IDCAB_FAC', 'FAC_FEC', 'POSICION']])
+                filas += len(bloque)
+            medida['filas'] = filas
+        
+        with instrumentacion.fase('ingesta_sql', 'indices'):
+            for sentencia in INDICES_BASE.split(';'):
+                if sentencia.strip():
+                    con.execute(sentencia)
+        
+        # Cubo de actividades: las celdas se cuentan en la base (solo ellas llegan a memoria)
+        with instrumentacion.fase('ingesta_sql', 'cubo') as medida:
+            sexos = _consultar(con, motor, SQL_CUBO_SEXOS)['SEX_PAC'].tolist()
+            celdas = _consultar(con, motor, SQL_CUBO_CELDAS.format(mes=MES_ATENCION[motor]))
+            celdas['SEXO'] = pd.Index(sexos, dtype=object).get_indexer(celdas['SEX_PAC']) + 1
+            cubo = CuboActividades.desde_celdas(celdas, sexos)
+            _guardar_cubo(con, motor, cubo)
+            medida['filas'] = cubo.filas
+        
+        con.execute("INSERT INTO metadatos VALUES (?, ?), (?, ?), (?, ?)",
+                    ['version', version, 'cargado_en', datetime.now().isoformat(), 'cubo_filas', str(cubo.filas)])
+        if motor == 'sqlite':
+            con.commit()
+            con.execute("ANALYZE")
+        else:
+            con.execute("CHECKPOINT")
+    finally:
+        con.close()
+
+
+class BaseSQL:
+    """
+    Conexiones de solo lectura a una base de versión, una por hilo
+    
+    DuckDB comparte una conexión y entrega un cursor por hilo; SQLite abre
+    una conexión por hilo. Todas las consultas son de solo lectura.
+    """
+    
+    def __init__(self, path, motor):
+        self.path = path
+        self.motor = motor
+        self._local = threading.local()
+        self._con = _conectar(path, motor, solo_lectura=True) if motor == 'duckdb' else None
+    
+    def conexion(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = self._con.cursor() if self.motor == 'duckdb' else _conectar(self.path, self.motor, solo_lectura=True)
+            self._local.con = con
+        return con
+    
+    def consultar(self, sql, parametros=()):
+        return _consultar(self.conexion(), self.motor, sql, parametros)
+    
+    def consultar_con_tabla(self, sql, nombre, df, parametros=()):
+        """Consulta que usa df como tabla temporal (p. ej. la lista de documentos buscados)"""
+        con = self.conexion()
+        if self.motor == 'duckdb':
+            con.register(nombre, df)
+            try:
+                return _consultar(con, self.motor, sql, parametros)
+            finally:
+                con.unregister(nombre)
+        
+        columnas = ', '.join(f"{c} {_tipo_sql(df[c].dtype, self.motor)}" for c in df.columns)
+        con.execute(f"CREATE TEMP TABLE {nombre} ({columnas})")
+        try:
+            _insertar(con, self.motor, nombre, df)
+            return _consultar(con, self.motor, sql, parametros)
+        finally:
+            con.execute(f"DROP TABLE temp.{nombre}")
+
+
+class IndicePacientesSQL:
+    """Búsquedas por documento y por paciente resueltas en la base (misma interfaz que IndicePacientes)"""
+    
+    def __init__(self, base):
+        self.base = base
+    
+    def partes(self):
+        """Nada en memoria: las tablas viven en la base"""
+        return {}, {}
+    
+    def congelar(self):
+        return self
+    
+    def id_paciente(self, documento):
+        """ID_PACIENTE asociado a un documento (None si no existe)"""
+        paciente = self.buscar_documento(documento)
+        return None if paciente is None else paciente['ID_PACIENTE']
+    
+    def buscar_documento(self, documento):
+        """Fila de DAT_PER del paciente con ese documento (None si no existe)"""
+        # Una sola fila: se arma la Serie directamente, sin pasar por un DataFrame
+        cursor = self.base.conexion().execute(SQL_PACIENTE, [str(documento)])
+        fila = cursor.fetchone()
+        if fila is None:
+            return None
+        return pd.Series(fila, index=[d[0] for d in cursor.description], dtype=object).drop('POSICION')
+    
+    def atenciones_paciente(self, id_paciente):
+        """Atenciones de un paciente, ordenadas por fecha descendente"""
+        return self.base.consultar(SQL_ATENCIONES_PACIENTE, [int(id_paciente)])
+    
+    def buscar_documentos(self, documentos):
+        """
+        Resolver muchos documentos con un solo join (búsqueda masiva)
+        
+        Mismo resultado que IndicePacientes.buscar_documentos: una fila por
+        atención, o una sola fila si el documento no existe o no tiene
+        atenciones, en el orden de la lista.
+        """
+        documentos = pd.Series(list(documentos), dtype=object).astype(str).str.strip()
+        buscados = pd.DataFrame({'ORDEN': range(len(documentos)), 'DOCUMENTO': documentos.to_numpy()})
+        return self.base.consultar_con_tabla(SQL_DOCUMENTOS, 'buscados', buscados)
+
+
+class IndiceActividadesSQL:
+    """Pacientes por actividad resueltos en la base (misma interfaz que IndiceActividades)"""
+    
+    def __init__(self, base):
+        self.base = base
+    
+    def partes(self):
+        """Nada en memoria: las tablas viven en la base"""
+        return {}, {}
+    
+    def congelar(self):
+        return self
+    
+    def pacientes_actividad(self, id_actividad, fecha_desde=None, fecha_hasta=None, top_n=None):
+        """
+        Atenciones de una actividad con los datos del paciente, por fecha descendente
+        
+        Los filtros de fecha y el límite se aplican en la base, así que solo
+        se traen las filas del resultado.
+        """
+        filtros, parametros = '', [int(id_actividad)]
+        if fecha_desde is not None:
+            filtros += f" AND {FECHA_ATENCION} >= ?"
+            parametros.append(_parametro_fecha(fecha_desde, self.base.motor))
+        if fecha_hasta is not None:
+            filtros += f" AND {FECHA_ATENCION} <= ?"
+            parametros.append(_parametro_fecha(fecha_hasta, self.base.motor))
+        limite = ''
+        if top_n is not None:
+            limite = ' LIMIT ?'
+            parametros.append(int(top_n))
+        return self.base.consultar(SQL_ACTIVIDAD.format(filtros=filtros, limite=limite), parametros)
+
+
+class ConjuntoSQL:
+    """
+    Versión de los datos respaldada por una base SQL
+    
+    Misma interfaz que ConjuntoDatos. Solo el catálogo, DAT_PER (para el
+    índice de nombres por trigramas) y las celdas del cubo de actividades
+    están en memoria; el histórico y las facturas se consultan en la base.
+    """
+    
+    __slots__ = ('_actividades', 'indice_pacientes', 'indice_actividades', 'indice_nombres',
+                 'cubo_actividades', 'version', 'cargado_en', 'base')
+    
+    def __init__(self, base, version, cargado_en, filas_cubo):
+        asignar = super().__setattr__
+        asignar('base', base)
+        asignar('_actividades', base.consultar("SELECT * FROM actividades"))
+        pacientes = base.consultar("SELECT * FROM pacientes ORDER BY POSICION").drop(columns='POSICION')
+        asignar('indice_pacientes', IndicePacientesSQL(base))
+        asignar('indice_actividades', IndiceActividadesSQL(base))
+        asignar('indice_nombres', IndiceNombres(pacientes).congelar())
+        asignar('cubo_actividades', _leer_cubo(base, filas_cubo).congelar())
+        asignar('version', version)
+        asignar('cargado_en', cargado_en)
+    
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("ConjuntoSQL es de solo lectura; publique una nueva versión")
+    
+    @property
+    def actividades(self):
+        """Catálogo de actividades (vista sin copia)"""
+        return self._actividades.copy(deep=False)
+    
+    def antiguedad(self):
+        """Tiempo transcurrido desde que se construyó esta versión"""
+        return datetime.now() - self.cargado_en
+
+
+class AlmacenSQL(AlmacenVersiones):
+    """
+    Versiones de datos como archivos de base de datos en un directorio compartido
+    
+    Comparte con el almacén Arrow el archivo puntero, la reserva de
+    construcción entre procesos y la espera (AlmacenVersiones); cada versión
+    es un único archivo que se escribe con otro nombre y se renombra al
+    terminar. Se ingiere desde los archivos, así que no publica un
+    ConjuntoDatos ya construido en memoria.
+    """
+    
+    def __init__(self, directorio=None, motor=None):
+        super().__init__(directorio or config.BACKEND_SQL_DIRECTORIO)
+        self.motor = motor or motor_sql()
+    
+    def _version_path(self, version):
+        return os.path.join(self.directorio, f"{version}-f{FORMATO}.{self.motor}")
+    
+    def construir(self, loader, version, anterior=None):
+        """
+        Ingerir los archivos en una base nueva, publicarla y abrirla
+        
+        La base se ingiere completa en cada versión (anterior no se usa)
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        destino = self._version_path(version)
+        tmp_path = f"{destino}.tmp{os.getpid()}"
+        for path in (tmp_path, f"{tmp_path}.wal"):
+            if os.path.exists(path):
+                os.remove(path)
+        
+        try:
+            with instrumentacion.fase('almacen_publicar', self.motor) as medida:
+                construir_base_sql(loader, tmp_path, version, self.motor)
+                medida['bytes'] = os.path.getsize(tmp_path)
+            os.replace(tmp_path, destino)
+        finally:
+            # Una ingesta fallida (p. ej. descarga incompleta) no deja la base a medio escribir
+            for path in (tmp_path, f"{tmp_path}.wal"):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        self._apuntar(version)
+        print(f"🗄️ Versión {version} publicada en {destino}")
+        self._limpiar(version)
+        return self.abrir(version)
+    
+    def abrir(self, version):
+        """Abrir una versión publicada (None si no existe)"""
+        path = self._version_path(version)
+        if not os.path.exists(path):
+            return None
+        
+        with instrumentacion.fase('almacen_abrir', self.motor):
+            base = BaseSQL(path, self.motor)
+            metadatos = dict(base.conexion().execute("SELECT clave, valor FROM metadatos").fetchall())
+            conjunto = ConjuntoSQL(base, version, datetime.fromisoformat(metadatos['cargado_en']),
+                                   int(metadatos['cubo_filas']))
+        
+        print(f"🗄️ Versión {version} abierta desde {path} ({self.motor})")
+        return conjunto
+    
+    def _limpiar(self, version_actual):
+        """Eliminar bases de versiones antiguas, conservando las más recientes"""
+        sufijo = f"-f{FORMATO}.{self.motor}"
+        versiones = [nombre for nombre in os.listdir(self.directorio) if nombre.endswith(sufijo)]
+        versiones.sort(key=lambda nombre: os.path.getmtime(os.path.join(self.directorio, nombre)), reverse=True)
+        
+        actual = os.path.basename(self._version_path(version_actual))
+        for nombre in versiones[config.BACKEND_SQL_VERSIONES_CONSERVAR:]:
+            if nombre == actual:
+                continue
+            # Los procesos que aún la tengan abierta siguen leyendo en Linux
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError as e:
+                print(f"⚠️ No se pudo eliminar {nombre}: {e}", file=sys.stderr)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Base de los almacenes compartidos de versiones de datos
+Lo común al almacén Arrow (almacen_arrow.py) y al backend SQL
+(almacen_sql.py): un archivo puntero (ACTUAL.json) que indica la versión
+vigente y se reemplaza de forma atómica, la reserva de construcción de una
+versión entre procesos y la espera a que otro proceso la publique
+"""
+
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+
+import config_sharepoint as config
+
+
+PUNTERO = 'ACTUAL.json'
+
+
+def _propietario_reserva(path):
+    """Pid (como texto) del proceso dueño de una reserva de construcción (None si no existe)"""
+    try:
+        with open(path, 'r', encoding='ascii') as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+class AlmacenVersiones(ABC):
+    """
+    Versiones de datos en un directorio compartido entre procesos
+    
+    Cada almacén define dónde queda una versión (_version_path), cómo se
+    construye y publica (construir), cómo se abre (abrir) y qué versiones
+    antiguas se eliminan (_limpiar). Son métodos abstractos: un almacén que
+    no los define falla al crearse y no a mitad de una actualización.
+    """
+    
+    def __init__(self, directorio):
+        self.directorio = directorio
+    
+    @abstractmethod
+    def _version_path(self, version):
+        """Ruta de una versión en el directorio (también nombra su reserva)"""
+    
+    @abstractmethod
+    def construir(self, loader, version, anterior=None):
+        """Construir una versión, publicarla y abrirla"""
+    
+    @abstractmethod
+    def abrir(self, version):
+        """Abrir una versión publicada (None si no existe)"""
+    
+    @abstractmethod
+    def _limpiar(self, version_actual):
+        """Eliminar versiones antiguas, conservando las más recientes"""
+    
+    def version_actual(self):
+        """Versión indicada por el archivo puntero (None si no hay ninguna publicada)"""
+        try:
+            with open(os.path.join(self.directorio, PUNTERO), 'r', encoding='utf-8') as f:
+                return json.load(f).get('version')
+        except (OSError, ValueError):
+            return None
+    
+    def _apuntar(self, version):
+        """Reemplazar de forma atómica el puntero para que indique la versión"""
+        puntero_tmp = os.path.join(self.directorio, f"{PUNTERO}.tmp{os.getpid()}")
+        with open(puntero_tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'publicado_en': datetime.now().isoformat()}, f)
+        os.replace(puntero_tmp, os.path.join(self.directorio, PUNTERO))
+    
+    def abrir_actual(self):
+        """Abrir la versión indicada por el puntero (None si no hay ninguna)"""
+        version = self.version_actual()
+        return self.abrir(version) if version else None
+    
+    @contextmanager
+    def construccion(self, version):
+        """
+        Reservar la construcción de una versión entre procesos
+        
+        Entrega True si este proceso debe construirla, o False si otro proceso
+        ya la está construyendo. Mientras dura la construcción, un hilo
+        actualiza la fecha de la reserva cada config.ALMACEN_ARROW_LATIDO_SEGUNDOS;
+        una reserva sin latidos durante config.ALMACEN_ARROW_RESERVA_ABANDONADA_SEGUNDOS
+        es de un proceso que terminó y se puede tomar. Al salir, la reserva
+        solo se elimina si sigue siendo de este proceso (pid).
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        reserva = self._version_path(version) + '.lock'
+        propietario = str(os.getpid())
+        
+        try:
+            fd = os.open(reserva, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                antiguedad = time.time() - os.path.getmtime(reserva)
+            except OSError:
+                antiguedad = 0
+            if antiguedad < config.ALMACEN_ARROW_RESERVA_ABANDONADA_SEGUNDOS:
+                yield False
+                return
+            # Reserva abandonada por un proceso que terminó: tomarla
+            fd = os.open(reserva, os.O_WRONLY | os.O_TRUNC)
+        
+        os.write(fd, propietario.encode('ascii'))
+        os.close(fd)
+        if _propietario_reserva(reserva) != propietario:
+            # Otro proceso tomó la misma reserva abandonada al mismo tiempo
+            yield False
+            return
+        
+        detener = threading.Event()
+        
+        def latir():
+            while not detener.wait(config.ALMACEN_ARROW_LATIDO_SEGUNDOS):
+                if _propietario_reserva(reserva) != propietario:
+                    return
+                try:
+                    os.utime(reserva)
+                except OSError:
+                    return
+        
+        latido = threading.Thread(target=latir, name='reserva_almacen', daemon=True)
+        latido.start()
+        try:
+            yield True
+        finally:
+            detener.set()
+            latido.join()
+            if _propietario_reserva(reserva) == propietario:
+                os.remove(reserva)
+    
+    def esperar(self, version, timeout=None):
+        """Esperar a que otro proceso publique una versión y abrirla (None si no llega)"""
+        limite = time.time() + (timeout or config.ALMACEN_ARROW_ESPERA_SEGUNDOS)
+        while time.time() < limite:
+            conjunto = self.abrir(version)
+            if conjunto is not None:
+                return conjunto
+            time.sleep(1)
+        return None
+
@@ -10,52 +10,26 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import re
+import os
+import hmac
+import config_sharepoint as config
 from sharepoint_loader import sharepoint_loader
+from motor_consultas import (
+    obtener_motor,
+    buscar_paciente_por_documento,
+    buscar_atenciones_paciente,
+    leer_documentos,
+    buscar_pacientes_por_documentos,
+    buscar_pacientes_por_nombre,
+    buscar_pacientes_por_actividad,
+    buscar_indicadores_actividad,
+)
+from exportacion import ordenar, paginar, clave_exportacion, huella_archivo, exportar_csv
+from instrumentacion import instrumentacion, memoria_proceso
+from conjunto_datos import activar_copy_on_write
 
-# Función para normalizar textos con caracteres especiales
-def normalizar_texto(texto):
-    """Corrige caracteres mal codificados en español"""
-    if pd.isna(texto) or texto == '':
-        return texto
-    
-    texto = str(texto)
-    
-    # Reemplazos literales de patrones específicos más comunes
-    # El patrón más común es "ï¿½" que representa caracteres con tilde
-    reemplazos_literales = [
-        ('ATENCIï¿½N', 'ATENCION'),
-        ('APLICACIï¿½N', 'APLICACION'),
-        ('FLï¿½OR', 'FLUOR'),
-        ('Aï¿½OS', 'AÑOS'),
-        ('Aï¿½O', 'AÑO'),
-        ('NIï¿½OS', 'NIÑOS'),
-        ('NIï¿½O', 'NIÑO'),
-        ('ODONTOLOGï¿½A', 'ODONTOLOGIA'),
-        ('Mï¿½DICO', 'MEDICO'),
-        ('ENFERMERï¿½A', 'ENFERMERIA'),
-        ('BIOLï¿½GICO', 'BIOLOGICO'),
-        ('QUï¿½MICO', 'QUIMICO'),
-        ('Fï¿½SICO', 'FISICO'),
-        ('CLï¿½NICO', 'CLINICO'),
-        ('Bï¿½SICO', 'BASICO'),
-        ('EVALUACIï¿½N', 'EVALUACION'),
-        ('VACUNACIï¿½N', 'VACUNACION'),
-        ('NUTRICIï¿½N', 'NUTRICION'),
-        ('PREVENCIï¿½N', 'PREVENCION'),
-        ('PROMOCIï¿½N', 'PROMOCION'),
-        ('GESTACIï¿½N', 'GESTACION'),
-        ('NUTRICIï¿½N', 'NUTRICION'),
-        ('ORIENTACIï¿½N', 'ORIENTACION'),
-    ]
-    
-    for mal, bien in reemplazos_literales:
-        texto = texto.replace(mal, bien)
-    
-    # Reemplazar el caracter problemático individual
-    texto = texto.replace('ï¿½', 'O')
-    texto = texto.replace('\ufffd', 'n')
-    
-    return texto
+# Las tablas publicadas se comparten entre sesiones: los resultados son vistas Copy-on-Write
+activar_copy_on_write()
 
 # Configuración de la página
 st.set_page_config(
@@ -64,150 +38,171 @@ st.set_page_config(
     layout="wide"
 )
 
-# Función para cargar datos con caché
-@st.cache_data
-def cargar_actividades():
-    """Carga el catálogo de actividades filtradas"""
-    df = sharepoint_loader.load_csv('ACTXPROG_FILTRADO', encoding='utf-8')
-    # Normalizar descripciones
-    df['DES_ACTXPROG'] = df['DES_ACTXPROG'].apply(normalizar_texto)
-    return df
+# Columnas a mostrar (y nombres para el usuario) de cada tipo de resultado
+COLUMNAS_ACTIVIDAD = {
+    'IDE_PAC': 'Documento',
+    'COD_TID': 'Tipo Doc',
+    'NOMBRE_COMPLETO': 'Nombre Paciente',
+    'SEX_PAC': 'Sexo',
+    'FECHA_ATENCION': 'Fecha Atención',
+    'IDCAB_FAC': 'ID Factura'
+}
 
-@st.cache_data
-def cargar_datos_pacientes():
-    """Carga los datos de pacientes"""
-    df = sharepoint_loader.load_csv('DAT_PER', encoding='utf-8')
-    # Convertir IDE_PAC a string para búsqueda
-    df['IDE_PAC'] = df['IDE_PAC'].astype(str)
-    
-    # Normalizar nombres
-    df['NM1_PAC'] = df['NM1_PAC'].apply(normalizar_texto)
-    df['NM2_PAC'] = df['NM2_PAC'].apply(normalizar_texto)
-    df['AP1_PAC'] = df['AP1_PAC'].apply(normalizar_texto)
-    df['AP2_PAC'] = df['AP2_PAC'].apply(normalizar_texto)
-    
-    # Concatenar nombre completo
-    df['NOMBRE_COMPLETO'] = (
-        df['NM1_PAC'].fillna('').astype(str) + ' ' +
-        df['NM2_PAC'].fillna('').astype(str) + ' ' +
-        df['AP1_PAC'].fillna('').astype(str) + ' ' +
-        df['AP2_PAC'].fillna('').astype(str)
-    ).str.strip().str.replace(r'\s+', ' ', regex=True)
-    
-    return df
+@st.cache_resource(max_entries=32)
+def orden_resultado(version, consulta, columna, ascendente, _df):
+    """Permutación de orden de un resultado (una vez por consulta, columna y versión de datos)"""
+    return ordenar(_df, columna, ascendente)
 
-@st.cache_data
-def cargar_historico_pyp():
-    """Carga el histórico de PyP"""
-    df = sharepoint_loader.load_csv('HISTORICO_PYP', encoding='utf-8')
-    return df
+# Medidas del cubo de actividades (y nombres para el usuario)
+MEDIDAS_CUBO = {
+    'ATENCIONES': 'Atenciones',
+    'PACIENTES': 'Pacientes únicos'
+}
 
-@st.cache_data
-def cargar_cab_fac():
-    """Carga las facturas (cabecera)"""
-    # Cargar solo las columnas necesarias para optimizar memoria
-    df = sharepoint_loader.load_csv('CAB_FAC', encoding='utf-8', usecols=['IDCAB_FAC', 'FAC_FEC'])
-    return df
-
-def buscar_paciente_por_documento(documento, df_pacientes):
-    """Busca un paciente por su documento de identidad"""
-    resultado = df_pacientes[df_pacientes['IDE_PAC'] == str(documento)]
-    if not resultado.empty:
-        return resultado.iloc[0]
-    return None
-
-def buscar_atenciones_paciente(id_paciente, df_historico, df_cab_fac, df_actividades):
-    """Busca todas las atenciones de un paciente"""
-    # Obtener lista de códigos de actividades válidas
-    codigos_validos = df_actividades['ID_ACTXPROG'].tolist()
+def mostrar_resultado_paginado(df, version, consulta, columnas, clave):
+    """
+    Muestra una página del resultado con controles de orden y paginación
     
-    # Filtrar atenciones del paciente SOLO con actividades mapeadas
-    atenciones = df_historico[
-        (df_historico['ID_PACIENTE'] == id_paciente) & 
-        (df_historico['ID_ACTPYP'].isin(codigos_validos))
-    ].copy()
+    Solo se renderizan las filas de la página; el orden se calcula en el
+    servidor una vez por consulta y se reutiliza al cambiar de página.
     
-    if atenciones.empty:
-        return pd.DataFrame()
+    Returns:
+        (permutación de orden elegida o None si se usa el orden del índice,
+        descripción del criterio de orden)
+    """
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        opciones_orden = ['Orden por defecto'] + list(columnas.values())
+        orden_elegido = st.selectbox("Ordenar por:", options=opciones_orden, key=f"orden_{clave}")
+    with col2:
+        ascendente = st.radio("Dirección:", ["Ascendente", "Descendente"],
+                              key=f"direccion_{clave}", horizontal=True) == "Ascendente"
+    with col3:
+        filas_por_pagina = st.selectbox(
+            "Filas por página:",
+            options=config.FILAS_POR_PAGINA_OPCIONES,
+            index=config.FILAS_POR_PAGINA_OPCIONES.index(config.FILAS_POR_PAGINA),
+            key=f"filas_{clave}"
+        )
     
-    # Obtener fechas de las facturas
-    atenciones = atenciones.merge(
-        df_cab_fac[['IDCAB_FAC', 'FAC_FEC']], 
-        on='IDCAB_FAC', 
-        how='left'
+    orden = None
+    criterio = 'defecto'
+    if orden_elegido != 'Orden por defecto':
+        columna = next(original for original, nombre in columnas.items() if nombre == orden_elegido)
+        orden = orden_resultado(version, consulta, columna, ascendente, df)
+        criterio = f"{columna}:{'asc' if ascendente else 'desc'}"
+    
+    total_paginas = max(1, -(-len(df) // filas_por_pagina))
+    pagina = st.number_input(
+        f"Página (de {total_paginas}):",
+        min_value=1, max_value=total_paginas,
+        value=min(st.session_state.get(f'pagina_{clave}', 1), total_paginas),
+        step=1
     )
+    st.session_state[f'pagina_{clave}'] = pagina
     
-    # Agregar descripción de actividades
-    atenciones = atenciones.merge(
-        df_actividades[['ID_ACTXPROG', 'DES_ACTXPROG']], 
-        left_on='ID_ACTPYP', 
-        right_on='ID_ACTXPROG', 
-        how='inner'
+    pagina_df, _ = paginar(df, pagina, filas_por_pagina, orden=orden)
+    st.dataframe(
+        pagina_df[list(columnas)].rename(columns=columnas),
+        use_container_width=True,
+        hide_index=True
     )
+    return orden, criterio
+
+def boton_exportacion(df, version, consulta, nombre_archivo, clave, orden=None, criterio='defecto', columnas=None):
+    """
+    Exportación CSV generada solo al solicitarla y reutilizada por consulta y versión
     
-    # Usar FAC_FEC como fecha principal, si no existe usar FECHA del histórico
-    atenciones['FECHA_ATENCION'] = atenciones['FAC_FEC'].fillna(atenciones['FECHA'])
-    
-    # Seleccionar y ordenar columnas
-    columnas_mostrar = [
-        'ID_ACTPYP', 
-        'DES_ACTXPROG', 
-        'FECHA_ATENCION', 
-        'IDCAB_FAC'
-    ]
+    El archivo se escribe por bloques en disco (opcionalmente comprimido) y el
+    botón de descarga lo entrega desde ahí, sin serializar el resultado en
+    cada ejecución de la app.
+    """
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        comprimir = st.checkbox("Comprimir (gzip)", key=f"comprimir_{clave}")
     
-    atenciones_final = atenciones[columnas_mostrar].copy()
+    clave_archivo = clave_exportacion(version, consulta, criterio, comprimir)
     
-    # Ordenar por fecha descendente
-    atenciones_final = atenciones_final.sort_values('FECHA_ATENCION', ascending=False)
+    def preparar():
+        with st.spinner('Generando archivo...'):
+            st.session_state[f'exportacion_ruta_{clave}'] = exportar_csv(
+                df, clave_archivo, nombre_archivo, comprimir=comprimir,
+                orden=orden, columnas=columnas
+            )
+        st.session_state[f'exportacion_{clave}'] = clave_archivo
     
-    return atenciones_final
+    with col2:
+        if st.session_state.get(f'exportacion_{clave}') != clave_archivo:
+            if st.button("📄 Preparar archivo CSV", key=f"preparar_{clave}"):
+                preparar()
+                st.rerun()
+        else:
+            # La limpieza de exportaciones antiguas (de cualquier sesión) pudo
+            # eliminar el archivo preparado: se genera de nuevo
+            if not os.path.exists(st.session_state[f'exportacion_ruta_{clave}']):
+                preparar()
+            ruta = st.session_state[f'exportacion_ruta_{clave}']
+            with open(ruta, 'rb') as archivo:
+                st.download_button(
+                    label="📥 Descargar CSV" + (" (gzip)" if comprimir else ""),
+                    data=archivo,
+                    file_name=os.path.basename(ruta),
+                    mime="application/gzip" if comprimir else "text/csv",
+                    key=f"descargar_{clave}"
+                )
 
-def buscar_pacientes_por_actividad(id_actividad, df_historico, df_pacientes, df_cab_fac, df_actividades):
-    """Busca todos los pacientes que han recibido una actividad específica"""
-    # Verificar que la actividad esté en el catálogo válido
-    if id_actividad not in df_actividades['ID_ACTXPROG'].values:
-        return pd.DataFrame()
-    
-    # Filtrar por actividad
-    atenciones = df_historico[df_historico['ID_ACTPYP'] == id_actividad].copy()
-    
-    if atenciones.empty:
+def serie_mensual(por_mes, medida):
+    """
+    Medida del cubo por mes (filas) y sexo (columnas), con los meses sin
+    atenciones en cero, lista para st.line_chart
+    """
+    con_fecha = por_mes.dropna(subset=['MES'])
+    if con_fecha.empty:
         return pd.DataFrame()
     
-    # Obtener fechas de las facturas
-    atenciones = atenciones.merge(
-        df_cab_fac[['IDCAB_FAC', 'FAC_FEC']], 
-        on='IDCAB_FAC', 
-        how='left'
-    )
-    
-    # Agregar datos del paciente
-    atenciones = atenciones.merge(
-        df_pacientes[['ID_PACIENTE', 'IDE_PAC', 'COD_TID', 'NOMBRE_COMPLETO', 'SEX_PAC']], 
-        on='ID_PACIENTE', 
-        how='left'
+    tabla = con_fecha.assign(SEX_PAC=con_fecha['SEX_PAC'].astype(object).fillna('Sin dato')).pivot_table(
+        index='MES', columns='SEX_PAC', values=medida, aggfunc='sum', fill_value=0
     )
-    
-    # Usar FAC_FEC como fecha principal
-    atenciones['FECHA_ATENCION'] = atenciones['FAC_FEC'].fillna(atenciones['FECHA'])
-    
-    # Seleccionar columnas
-    columnas_mostrar = [
-        'IDE_PAC',
-        'COD_TID',
-        'NOMBRE_COMPLETO',
-        'SEX_PAC',
-        'FECHA_ATENCION',
-        'IDCAB_FAC'
-    ]
-    
-    atenciones_final = atenciones[columnas_mostrar].copy()
-    
-    # Ordenar por fecha descendente
-    atenciones_final = atenciones_final.sort_values('FECHA_ATENCION', ascending=False)
-    
-    return atenciones_final
+    meses = pd.date_range(tabla.index.min(), tabla.index.max(), freq='MS')
+    return tabla.reindex(meses, fill_value=0)
+
+def mostrar_panel_administracion(datos):
+    """Métricas de operación en la barra lateral (solo con la clave de administrador)"""
+    if not config.ADMIN_CLAVE:
+        return
+    
+    with st.sidebar.expander("🔧 Administración"):
+        clave = st.text_input("Clave de administrador", type="password", key="admin_clave")
+        if not clave:
+            return
+        if not hmac.compare_digest(clave.encode('utf-8'), config.ADMIN_CLAVE.encode('utf-8')):
+            st.error("Clave incorrecta")
+            return
+        
+        ventana = st.selectbox(
+            "Ventana",
+            [5, 15, 60, None],
+            format_func=lambda minutos: f"Últimos {minutos} min" if minutos else "Todo el registro",
+            key="admin_ventana"
+        )
+        st.markdown("**Latencia por fase (ms)**")
+        st.dataframe(
+            instrumentacion.percentiles(ventana * 60 if ventana else None).round(1),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        rss = memoria_proceso()
+        st.metric("Memoria del proceso", f"{rss / 1024 / 1024:,.0f} MB" if rss is not None else "n/d")
+        
+        # Se mide una vez por versión de datos
+        instrumentacion.registrar_datos(datos)
+        memoria = instrumentacion.datos.assign(MB=lambda df: (df['bytes'] / 1024 / 1024).round(1))
+        st.markdown(f"**Memoria por dataset** (versión {instrumentacion.version_datos})")
+        st.dataframe(memoria[['filas', 'MB']], use_container_width=True)
+        
+        st.markdown("**Transporte HTTP (última carga)**")
+        st.dataframe(sharepoint_loader.transport_report(), use_container_width=True)
 
 # ============= INTERFAZ PRINCIPAL =============
 
@@ -217,17 +212,26 @@ st.markdown("---")
 # Cargar datos
 with st.spinner('Cargando datos...'):
     try:
-        df_actividades = cargar_actividades()
-        df_pacientes = cargar_datos_pacientes()
-        df_historico = cargar_historico_pyp()
-        df_cab_fac = cargar_cab_fac()
+        # Tomar la versión vigente una sola vez: si el refresco publica otra
+        # versión durante esta ejecución, esta consulta sigue con la misma
+        datos = obtener_motor().datos()
+        df_actividades = datos.actividades
+        indice_pacientes = datos.indice_pacientes
+        indice_actividades = datos.indice_actividades
+        indice_nombres = datos.indice_nombres
+        cubo_actividades = datos.cubo_actividades
         st.success(f"✅ Datos cargados correctamente")
+        minutos = int(datos.antiguedad().total_seconds() // 60)
+        st.caption(f"Versión de datos {datos.version} · cargada hace {minutos} min "
+                   f"({datos.cargado_en:%Y-%m-%d %H:%M})")
     except Exception as e:
         st.error(f"❌ Error al cargar datos: {str(e)}")
         st.stop()
 
+mostrar_panel_administracion(datos)
+
 # Tabs para diferentes tipos de búsqueda
-tab1, tab2 = st.tabs(["🔍 Buscar por Paciente", "📊 Buscar por Actividad"])
+tab1, tab2, tab3 = st.tabs(["🔍 Buscar por Paciente", "📊 Buscar por Actividad", "📈 Indicadores"])
 
 # ============= TAB 1: BÚSQUEDA POR PACIENTE =============
 with tab1:
@@ -264,7 +268,7 @@ with tab1:
         st.markdown("---")
         
         with st.spinner('Buscando paciente...'):
-            paciente = buscar_paciente_por_documento(documento_buscar, df_pacientes)
+            paciente = buscar_paciente_por_documento(documento_buscar, indice_pacientes)
             
             if paciente is not None:
                 # Mostrar información del paciente
@@ -284,9 +288,7 @@ with tab1:
                 with st.spinner('Buscando atenciones...'):
                     atenciones = buscar_atenciones_paciente(
                         paciente['ID_PACIENTE'], 
-                        df_historico, 
-                        df_cab_fac,
-                        df_actividades
+                        indice_pacientes
                     )
                     
                     if not atenciones.empty:
@@ -360,6 +362,94 @@ with tab1:
             else:
                 st.error("❌ No se encontró ningún paciente con ese documento")
                 st.session_state['busqueda_activa'] = False
+    
+    # Búsqueda por nombre (aproximada): permite abrir el historial del paciente elegido
+    st.markdown("---")
+    st.subheader("🔤 Búsqueda por Nombre")
+    
+    nombre_buscar = st.text_input(
+        "Ingrese el nombre completo o parcial del paciente:",
+        placeholder="Ej: MARIA PEREZ",
+        key="nombre_buscar"
+    )
+    
+    if nombre_buscar.strip():
+        candidatos = buscar_pacientes_por_nombre(nombre_buscar, indice_nombres)
+        
+        if candidatos.empty:
+            st.warning("⚠️ No se encontraron pacientes con un nombre parecido")
+        else:
+            st.dataframe(
+                candidatos[['IDE_PAC', 'COD_TID', 'NOMBRE_COMPLETO', 'SEX_PAC', 'SIMILITUD']].rename(columns={
+                    'IDE_PAC': 'Documento',
+                    'COD_TID': 'Tipo Documento',
+                    'NOMBRE_COMPLETO': 'Nombre Completo',
+                    'SEX_PAC': 'Sexo',
+                    'SIMILITUD': 'Similitud'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            opciones_candidatos = [
+                f"{documento} - {nombre}"
+                for documento, nombre in zip(candidatos['IDE_PAC'], candidatos['NOMBRE_COMPLETO'])
+            ]
+            candidato = st.selectbox("Seleccione el paciente:", options=opciones_candidatos, key="candidato_nombre")
+            
+            if st.button("📋 Ver atenciones", key="ver_atenciones_nombre"):
+                st.session_state['documento_buscado'] = candidato.split(' - ')[0]
+                st.session_state['busqueda_activa'] = True
+                st.rerun()
+    
+    # Búsqueda masiva: lista de documentos en un archivo CSV
+    st.markdown("---")
+    st.subheader("📤 Búsqueda Masiva por Documentos")
+    
+    archivo_documentos = st.file_uploader(
+        "Cargue un CSV con los documentos (columna IDE_PAC o la primera columna):",
+        type=['csv', 'txt'],
+        key="archivo_documentos"
+    )
+    
+    if archivo_documentos is not None:
+        # La clave de la exportación se calcula una vez por archivo cargado (no en cada rerun)
+        if st.session_state.get('archivo_documentos_id') != archivo_documentos.file_id:
+            st.session_state['archivo_documentos_id'] = archivo_documentos.file_id
+            st.session_state['archivo_documentos_huella'] = huella_archivo(archivo_documentos.getvalue())
+        
+        try:
+            documentos = leer_documentos(archivo_documentos)
+        except Exception as e:
+            st.error(f"❌ No se pudo leer el archivo: {str(e)}")
+            documentos = None
+        
+        if documentos:
+            with st.spinner(f'Buscando {len(documentos)} documentos...'):
+                resultado_masivo = buscar_pacientes_por_documentos(documentos, indice_pacientes)
+            
+            estados = resultado_masivo.drop_duplicates('DOCUMENTO_BUSCADO')['ESTADO'].value_counts()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Documentos", len(documentos))
+            with col2:
+                st.metric("Con atenciones", int(estados.get('Encontrado', 0)))
+            with col3:
+                st.metric("Sin atenciones", int(estados.get('Sin atenciones', 0)))
+            with col4:
+                st.metric("No encontrados", int(estados.get('No encontrado', 0)))
+            
+            st.dataframe(resultado_masivo.head(1000), use_container_width=True, hide_index=True)
+            if len(resultado_masivo) > 1000:
+                st.caption(f"Mostrando 1.000 de {len(resultado_masivo)} registros; descargue el archivo para verlos todos")
+            
+            # Exportación del resultado combinado, generada solo al solicitarla
+            boton_exportacion(
+                resultado_masivo, datos.version, st.session_state['archivo_documentos_huella'],
+                "atenciones_busqueda_masiva", clave="masiva"
+            )
+        elif documentos is not None:
+            st.warning("⚠️ El archivo no contiene documentos")
 
 # ============= TAB 2: BÚSQUEDA POR ACTIVIDAD =============
 with tab2:
@@ -367,7 +457,7 @@ with tab2:
     
     # Selector de actividad
     actividades_dict = dict(zip(
-        df_actividades['ID_ACTXPROG'].astype(str) + " - " + df_actividades['DES_ACTXPROG'],
+        df_actividades['ID_ACTXPROG'].astype(str) + " - " + df_actividades['DES_ACTXPROG'].astype(str),
         df_actividades['ID_ACTXPROG']
     ))
     
@@ -378,57 +468,100 @@ with tab2:
     )
     
     if st.button("🔍 Buscar Pacientes", type="primary"):
-        id_actividad = actividades_dict[actividad_seleccionada]
+        st.session_state['actividad_buscada'] = actividad_seleccionada
+        st.session_state['pagina_actividad'] = 1
+    
+    # La búsqueda se conserva entre ejecuciones para poder paginar y ordenar
+    actividad_buscada = st.session_state.get('actividad_buscada')
+    if actividad_buscada in actividades_dict:
+        id_actividad = actividades_dict[actividad_buscada]
         
-        with st.spinner('Buscando pacientes con esta actividad...'):
-            pacientes_actividad = buscar_pacientes_por_actividad(
-                id_actividad,
-                df_historico,
-                df_pacientes,
-                df_cab_fac,
-                df_actividades
+        # Rango ya ordenado del índice: no copia ni recorre la tabla
+        pacientes_actividad = buscar_pacientes_por_actividad(
+            id_actividad,
+            indice_actividades
+        )
+        
+        if not pacientes_actividad.empty:
+            st.success(f"✅ Se encontraron {len(pacientes_actividad)} atenciones")
+            
+            st.subheader(f"📊 Actividad: {actividad_buscada}")
+            
+            consulta = f"actividad={id_actividad}"
+            orden, criterio = mostrar_resultado_paginado(
+                pacientes_actividad, datos.version, consulta, COLUMNAS_ACTIVIDAD, clave="actividad"
             )
             
-            if not pacientes_actividad.empty:
-                st.success(f"✅ Se encontraron {len(pacientes_actividad)} atenciones")
-                
-                st.subheader(f"📊 Actividad: {actividad_seleccionada}")
-                
-                # Renombrar columnas
-                pacientes_display = pacientes_actividad.rename(columns={
-                    'IDE_PAC': 'Documento',
-                    'COD_TID': 'Tipo Doc',
-                    'NOMBRE_COMPLETO': 'Nombre Paciente',
-                    'SEX_PAC': 'Sexo',
-                    'FECHA_ATENCION': 'Fecha Atención',
-                    'IDCAB_FAC': 'ID Factura'
-                })
-                
-                # Mostrar tabla
-                st.dataframe(
-                    pacientes_display,
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-                # Estadísticas
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Total de Registros", len(pacientes_actividad))
-                with col2:
-                    pacientes_unicos = pacientes_actividad['IDE_PAC'].nunique()
-                    st.metric("Pacientes Únicos", pacientes_unicos)
-                
-                # Botón de descarga
-                csv = pacientes_display.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="📥 Descargar CSV",
-                    data=csv,
-                    file_name=f"pacientes_actividad_{id_actividad}.csv",
-                    mime="text/csv",
-                )
-            else:
-                st.warning("⚠️ No se encontraron pacientes con esta actividad")
+            # Estadísticas desde el cubo precalculado (no recorren el resultado)
+            totales = cubo_actividades.resumen(id_actividad)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Total de Registros", totales['atenciones'])
+            with col2:
+                st.metric("Pacientes Únicos", totales['pacientes'])
+            
+            with st.expander("📈 Atenciones por mes"):
+                por_mes = buscar_indicadores_actividad(id_actividad, cubo_actividades)
+                st.line_chart(serie_mensual(por_mes, 'ATENCIONES'))
+            
+            # Exportación bajo demanda (respeta el orden elegido)
+            boton_exportacion(
+                pacientes_actividad, datos.version, consulta,
+                f"pacientes_actividad_{id_actividad}", clave="actividad",
+                orden=orden, criterio=criterio, columnas=COLUMNAS_ACTIVIDAD
+            )
+        else:
+            st.warning("⚠️ No se encontraron pacientes con esta actividad")
+
+# ============= TAB 3: INDICADORES POR ACTIVIDAD =============
+with tab3:
+    st.header("Indicadores por Actividad")
+    st.caption("Atenciones y pacientes únicos por actividad, mes y sexo, "
+               "precalculados una vez por versión de los datos")
+    
+    opciones_indicadores = {"Todas las actividades": None, **actividades_dict}
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        seleccion = st.selectbox("Actividad:", options=list(opciones_indicadores), key="indicadores_actividad")
+    with col2:
+        medida = st.radio("Medida:", options=list(MEDIDAS_CUBO), format_func=MEDIDAS_CUBO.get,
+                          key="indicadores_medida", horizontal=True)
+    id_indicadores = opciones_indicadores[seleccion]
+    
+    totales = cubo_actividades.resumen(id_indicadores)
+    if totales['atenciones'] == 0:
+        st.warning("⚠️ No hay atenciones registradas para esta actividad")
+    else:
+        por_sexo = cubo_actividades.por_sexo(id_indicadores)
+        por_mes = buscar_indicadores_actividad(id_indicadores, cubo_actividades)
+        
+        columnas = st.columns(2 + len(por_sexo))
+        columnas[0].metric("Atenciones", f"{totales['atenciones']:,}")
+        columnas[1].metric("Pacientes únicos", f"{totales['pacientes']:,}")
+        for columna, fila in zip(columnas[2:], por_sexo.itertuples(index=False)):
+            sexo = 'Sin dato' if pd.isna(fila.SEX_PAC) else fila.SEX_PAC
+            columna.metric(f"{MEDIDAS_CUBO[medida]} · {sexo}", f"{getattr(fila, medida):,}")
+        
+        st.subheader(f"📈 {MEDIDAS_CUBO[medida]} por mes")
+        st.line_chart(serie_mensual(por_mes, medida))
+        sin_fecha = int(por_mes.loc[por_mes['MES'].isna(), 'ATENCIONES'].sum())
+        if sin_fecha:
+            st.caption(f"{sin_fecha:,} atenciones sin fecha no aparecen en la gráfica")
+        
+        with st.expander("📋 Tabla por año-mes y sexo"):
+            tabla = serie_mensual(por_mes, medida)
+            tabla.index = tabla.index.strftime('%Y-%m')
+            st.dataframe(tabla.sort_index(ascending=False), use_container_width=True)
+        
+        if id_indicadores is None:
+            st.subheader(f"🏆 Actividades con más {MEDIDAS_CUBO[medida].lower()}")
+            ranking = cubo_actividades.por_actividad().sort_values(medida, ascending=False, kind='stable').head(20)
+            ranking = ranking.merge(
+                df_actividades[['ID_ACTXPROG', 'DES_ACTXPROG']].drop_duplicates('ID_ACTXPROG'),
+                left_on='ID_ACTPYP', right_on='ID_ACTXPROG', how='left'
+            )
+            ranking['Actividad'] = ranking['ID_ACTPYP'].astype(str) + " - " + ranking['DES_ACTXPROG'].astype(str)
+            st.bar_chart(ranking.set_index('Actividad')[medida])
 
 # Footer
 st.markdown("---")
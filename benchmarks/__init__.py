@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de carga y consulta sobre datos sintéticos
+Los archivos reales contienen datos de pacientes y no pueden estar en el
+repositorio; datos_sinteticos.py genera archivos con los mismos esquemas y
+distribuciones parecidas, ejecutar.py mide la carga y las consultas y
+comparar.py compara los resultados de dos ejecuciones
+"""
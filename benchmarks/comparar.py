@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparación de dos ejecuciones de la suite de benchmarks
+Muestra, para cada benchmark, la mediana de tiempo y la memoria pico de la
+ejecución base y de la nueva, y termina con código 1 si alguna empeoró más
+que el umbral (útil para revisar un commit antes de integrarlo)
+
+Uso:
+    python -m benchmarks.comparar base.json nuevo.json --umbral 0.15
+"""
+
+import sys
+import json
+import argparse
+
+
+# Diferencias menores a esto se consideran ruido aunque superen el umbral relativo
+MINIMO_SEGUNDOS = 0.001
+MINIMO_MB = 1.0
+
+
+def cargar(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparar(base, nuevo, umbral=0.15):
+    """
+    Comparar los benchmarks comunes a dos ejecuciones
+    
+    Args:
+        base: Resultado de referencia (JSON de ejecutar.py)
+        nuevo: Resultado a evaluar
+        umbral: Aumento relativo a partir del cual se considera una regresión
+    
+    Returns:
+        Lista de filas (nombre, segundos base, segundos nuevo, MB base, MB nuevo, regresión)
+    """
+    filas = []
+    for nombre, resultado in nuevo['resultados'].items():
+        anterior = base['resultados'].get(nombre)
+        if anterior is None:
+            continue
+        
+        segundos_base = anterior['segundos']['mediana']
+        segundos_nuevo = resultado['segundos']['mediana']
+        mb_base = anterior['memoria_pico_mb']
+        mb_nuevo = resultado['memoria_pico_mb']
+        
+        regresion = (
+            (segundos_nuevo > segundos_base * (1 + umbral) and segundos_nuevo - segundos_base > MINIMO_SEGUNDOS)
+            or (mb_nuevo > mb_base * (1 + umbral) and mb_nuevo - mb_base > MINIMO_MB)
+        )
+        filas.append((nombre, segundos_base, segundos_nuevo, mb_base, mb_nuevo, regresion))
+    return filas
+
+
+def _variacion(antes, despues):
+    return f"{(despues / antes - 1) * 100:+.0f}%" if antes else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparar dos resultados de benchmarks')
+    parser.add_argument('base')
+    parser.add_argument('nuevo')
+    parser.add_argument('--umbral', type=float, default=0.15,
+                        help='Aumento relativo de tiempo o memoria considerado regresión')
+    args = parser.parse_args()
+    
+    base, nuevo = cargar(args.base), cargar(args.nuevo)
+    if base.get('parametros', {}).get('escala') != nuevo.get('parametros', {}).get('escala') \
+            or base.get('parametros', {}).get('semilla') != nuevo.get('parametros', {}).get('semilla'):
+        print("⚠️ Las ejecuciones usan datos distintos (escala o semilla); la comparación no es válida")
+    if base.get('entorno') != nuevo.get('entorno'):
+        print("⚠️ Las ejecuciones se hicieron en entornos distintos (versiones o máquina)")
+    
+    print(f"Base:  {(base.get('commit') or '?')[:10]}  {base.get('fecha')}")
+    print(f"Nuevo: {(nuevo.get('commit') or '?')[:10]}  {nuevo.get('fecha')}")
+    print()
+    print(f"{'benchmark':<45} {'seg base':>10} {'seg nuevo':>10} {'var':>6} {'MB base':>9} {'MB nuevo':>9} {'var':>6}")
+    
+    filas = comparar(base, nuevo, args.umbral)
+    for nombre, segundos_base, segundos_nuevo, mb_base, mb_nuevo, regresion in filas:
+        marca = '  ❌' if regresion else ''
+        print(f"{nombre:<45} {segundos_base:>10.4f} {segundos_nuevo:>10.4f} "
+              f"{_variacion(segundos_base, segundos_nuevo):>6} {mb_base:>9.1f} {mb_nuevo:>9.1f} "
+              f"{_variacion(mb_base, mb_nuevo):>6}{marca}")
+    
+    regresiones = [fila[0] for fila in filas if fila[5]]
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} benchmarks empeoraron más de {args.umbral:.0%}")
+        sys.exit(1)
+    print("\n✅ Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
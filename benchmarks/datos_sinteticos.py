@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador de datos sintéticos con los esquemas de los archivos de SITIS
+Produce DAT_PER.csv, HISTORICO_PYP.csv, CAB_FAC.csv, ACTXPROG.csv y
+ACTXPROG_filtrado.csv con las columnas que usa la app y distribuciones
+parecidas a las reales: nombres repetidos con una cola de nombres raros,
+textos con la "ñ" y las tildes mal codificadas ("ï¿½"), pacientes con
+muchas atenciones, actividades muy frecuentes y muy raras, facturas sin
+fecha y atenciones sin factura.
+
+Con escala=1 los tamaños son cercanos a los de producción (~13 MB, ~40 MB y
+~560 MB). La misma semilla y escala producen siempre los mismos archivos.
+
+Uso:
+    python -m benchmarks.datos_sinteticos --escala 0.1 --directorio ./datos_benchmark
+"""
+
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+# Filas de cada archivo con escala=1
+FILAS_ESCALA_1 = {
+    'DAT_PER': 190_000,
+    'HISTORICO_PYP': 1_600_000,
+    'CAB_FAC': 5_100_000,
+}
+
+# Tamaño del catálogo (no depende de la escala)
+ACTIVIDADES_CATALOGO = 320
+ACTIVIDADES_FILTRADAS = 120
+
+# Filas por bloque al escribir los archivos grandes
+FILAS_BLOQUE = 500_000
+
+# Periodo cubierto por las atenciones y facturas
+FECHA_INICIO = pd.Timestamp('2015-01-01')
+FECHA_FIN = pd.Timestamp('2025-12-31')
+
+# Fracción de textos con caracteres especiales que llegan mal codificados, y
+# de esos, cuántos con el caracter de reemplazo Unicode en lugar de "ï¿½"
+FRACCION_MAL_CODIFICADA = 0.95
+FRACCION_REEMPLAZO_UNICODE = 0.02
+
+# Archivo con los parámetros con que se generó un directorio
+MANIFIESTO = 'datos_sinteticos.json'
+
+NOMBRES = [
+    'MARIA', 'JOSE', 'LUIS', 'ANA', 'JUAN', 'CARLOS', 'LUZ', 'JORGE', 'CARMEN', 'ANDRES',
+    'SOFIA', 'VALENTINA', 'SANTIAGO', 'SEBASTIAN', 'CAMILA', 'DANIEL', 'ALEJANDRO', 'PAULA',
+    'DIANA', 'SANDRA', 'MARTHA', 'GLORIA', 'CLAUDIA', 'PEDRO', 'JESUS', 'FERNANDO', 'ISABELLA',
+    'NICOLAS', 'SAMUEL', 'GABRIELA', 'MATEO', 'ANGELA', 'MONICA', 'DAVID', 'JULIAN', 'DIEGO',
+    'LAURA', 'NATALIA', 'ESTEBAN', 'MIGUEL', 'ROSA', 'BLANCA', 'OSCAR', 'EDGAR', 'YOLANDA',
+    'JOSÉ', 'MARÍA', 'JESÚS', 'ÁNGEL', 'MATÍAS', 'SIMÓN', 'MARTÍN', 'RAMÓN', 'INÉS', 'LUCÍA',
+    'SALOMÉ', 'NOÉ', 'ADRIÁN', 'IVÁN', 'HERNÁN', 'ÓSCAR', 'BELÉN', 'MUÑOZ', 'ÍNGRID', 'AÍDA',
+]
+
+APELLIDOS = [
+    'RODRIGUEZ', 'GOMEZ', 'GONZALEZ', 'MARTINEZ', 'GARCIA', 'LOPEZ', 'HERNANDEZ', 'SANCHEZ',
+    'RAMIREZ', 'PEREZ', 'DIAZ', 'TORRES', 'ROJAS', 'VARGAS', 'MORENO', 'GUTIERREZ', 'JIMENEZ',
+    'CASTRO', 'ORTIZ', 'RUIZ', 'ALVAREZ', 'SUAREZ', 'ROMERO', 'HERRERA', 'VALENCIA', 'QUINTERO',
+    'RESTREPO', 'CARDONA', 'OSORIO', 'GIRALDO', 'MEJIA', 'ARIAS', 'CASTAÑO', 'PEÑA', 'MUÑOZ',
+    'IBAÑEZ', 'NUÑEZ', 'ZUÑIGA', 'BOLAÑOS', 'CASTAÑEDA', 'PATIÑO', 'OCAMPO', 'AGUDELO', 'SALAZAR',
+    'RAMÍREZ', 'PÉREZ', 'DÍAZ', 'GÓMEZ', 'GONZÁLEZ', 'RODRÍGUEZ', 'MARTÍNEZ', 'GARCÍA', 'LÓPEZ',
+    'HERNÁNDEZ', 'SÁNCHEZ', 'JIMÉNEZ', 'GUTIÉRREZ', 'ÁLVAREZ', 'SUÁREZ', 'MEJÍA', 'ARÉVALO',
+]
+
+# Sílabas para la cola de nombres poco frecuentes
+SILABAS = ['BA', 'DE', 'LI', 'MO', 'RU', 'SA', 'TE', 'NI', 'GO', 'LU', 'VE', 'YA', 'ÑA',
+           'CÍ', 'RÓ', 'MAR', 'TÍN', 'DRÉS', 'LEN', 'QUE', 'ZA', 'FE', 'HUA', 'XI']
+
+# Descripciones de actividades de promoción y prevención
+ACTIVIDADES = [
+    'VACUNACIÓN {}', 'APLICACIÓN DE FLÚOR {}', 'CONSULTA DE ENFERMERÍA {}', 'ATENCIÓN DEL RECIÉN NACIDO {}',
+    'CONTROL PRENATAL {}', 'EVALUACIÓN NUTRICIÓN NIÑOS {}', 'ODONTOLOGÍA PREVENTIVA {}',
+    'PROMOCIÓN Y PREVENCIÓN {}', 'CONSULTA MÉDICO GENERAL {}', 'TAMIZAJE CÁNCER DE CUELLO {}',
+    'PLANIFICACIÓN FAMILIAR {}', 'CONTROL CRECIMIENTO Y DESARROLLO {}', 'ORIENTACIÓN GESTACIÓN {}',
+    'EXAMEN FÍSICO ADULTO {}', 'LABORATORIO CLÍNICO BÁSICO {}', 'VALORACIÓN AÑOS DORADOS {}',
+]
+GRUPOS_EDAD = ['MENORES DE 1 AÑO', '1 A 5 AÑOS', '6 A 11 AÑOS', 'ADOLESCENTES', 'ADULTOS',
+               'MAYORES DE 60 AÑOS', 'GESTANTES', 'NIÑOS ESCOLARES', 'PRIMERA VEZ', 'CONTROL']
+
+OBSERVACIONES = [
+    'FACTURA GENERADA AUTOMÁTICAMENTE', 'ATENCIÓN AMBULATORIA', 'SERVICIO DE URGENCIAS',
+    'PROGRAMA DE PROMOCIÓN Y PREVENCIÓN', 'HOSPITALIZACIÓN', 'CONSULTA EXTERNA', 'ODONTOLOGÍA',
+    'LABORATORIO CLÍNICO', 'IMÁGENES DIAGNÓSTICAS', 'TERAPIA FÍSICA', 'NUTRICIÓN Y DIETÉTICA',
+    'CONTRATO CAPITADO RÉGIMEN SUBSIDIADO', 'EVENTO NO CUBIERTO', 'PACIENTE PARTICULAR',
+]
+
+CONTRATOS = 180
+USUARIOS = ['ADMIN', 'FACTURA1', 'FACTURA2', 'FACTURA3', 'CAJA01', 'CAJA02', 'URGENCIAS', 'PYP01', 'PYP02']
+
+
+def mal_codificar(textos, rng):
+    """
+    Reproducir la codificación errónea de los archivos de SITIS
+    
+    Las letras con tilde y la "ñ" se reemplazan por "ï¿½" (UTF-8 leído como
+    latin-1 y guardado de nuevo), salvo una pequeña fracción que se conserva
+    bien escrita o que trae el caracter de reemplazo Unicode.
+    """
+    especiales = str.maketrans({c: '\x00' for c in 'ÁÉÍÓÚÑáéíóúñ'})
+    resultado = []
+    for texto in textos:
+        marcado = texto.translate(especiales)
+        if marcado == texto:
+            resultado.append(texto)
+            continue
+        sorteo = rng.random()
+        if sorteo < FRACCION_MAL_CODIFICADA * FRACCION_REEMPLAZO_UNICODE:
+            resultado.append(marcado.replace('\x00', '\ufffd'))
+        elif sorteo < FRACCION_MAL_CODIFICADA:
+            resultado.append(marcado.replace('\x00', 'ï¿½'))
+        else:
+            resultado.append(texto)
+    return np.array(resultado, dtype=object)
+
+
+def _pesos_zipf(n, exponente, rng):
+    """Pesos de una distribución Zipf sobre n valores en orden aleatorio"""
+    pesos = 1.0 / np.arange(1, n + 1) ** exponente
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def _vocabulario(base, filas_cola, rng):
+    """
+    Valores posibles de un campo de nombre y sus probabilidades
+    
+    Los valores de la lista base siguen una distribución Zipf; además se
+    inventan nombres poco frecuentes combinando sílabas (la cola larga de los
+    datos reales), cuyo número crece con la escala.
+    """
+    cola = {
+        ''.join(rng.choice(SILABAS, size=rng.integers(2, 5)))
+        for _ in range(filas_cola)
+    }
+    cola = sorted(cola - set(base))
+    valores = np.array(list(base) + cola, dtype=object)
+    pesos = np.concatenate([_pesos_zipf(len(base), 1.0, rng) * 0.96,
+                            np.full(len(cola), 0.04 / max(len(cola), 1))])
+    return mal_codificar(valores, rng), pesos / pesos.sum()
+
+
+def _fechas(rng, n, tendencia=1.6):
+    """Fechas entre FECHA_INICIO y FECHA_FIN, más frecuentes hacia el final del periodo"""
+    dias = (FECHA_FIN - FECHA_INICIO).days
+    posicion = rng.random(n) ** (1 / tendencia)
+    return FECHA_INICIO + pd.to_timedelta((posicion * dias).astype(np.int64), unit='D')
+
+
+def generar_actividades(directorio, rng):
+    """Catálogo completo (ACTXPROG.csv) y catálogo filtrado (ACTXPROG_filtrado.csv)"""
+    ids = np.arange(1, ACTIVIDADES_CATALOGO + 1, dtype=np.int64)
+    descripciones = [
+        ACTIVIDADES[i % len(ACTIVIDADES)].format(GRUPOS_EDAD[(i // len(ACTIVIDADES)) % len(GRUPOS_EDAD)])
+        + (f' {i // (len(ACTIVIDADES) * len(GRUPOS_EDAD)) + 1}' if i >= len(ACTIVIDADES) * len(GRUPOS_EDAD) else '')
+        for i in range(ACTIVIDADES_CATALOGO)
+    ]
+    catalogo = pd.DataFrame({
+        'ID_ACTXPROG': ids,
+        'DES_ACTXPROG': mal_codificar(descripciones, rng),
+        'COD_PROG': rng.integers(1, 25, ACTIVIDADES_CATALOGO),
+        'EST_ACT': rng.choice(['A', 'I'], ACTIVIDADES_CATALOGO, p=[0.85, 0.15]),
+    })
+    catalogo.to_csv(os.path.join(directorio, 'ACTXPROG.csv'), index=False)
+    
+    filtradas = np.sort(rng.choice(ids, ACTIVIDADES_FILTRADAS, replace=False))
+    catalogo[catalogo['ID_ACTXPROG'].isin(filtradas)][['ID_ACTXPROG', 'DES_ACTXPROG']].to_csv(
+        os.path.join(directorio, 'ACTXPROG_filtrado.csv'), index=False)
+
+
+def generar_pacientes(directorio, filas, rng):
+    """DAT_PER.csv: un registro por paciente"""
+    nombres, pesos_nombres = _vocabulario(NOMBRES, max(50, filas // 40), rng)
+    apellidos, pesos_apellidos = _vocabulario(APELLIDOS, max(50, filas // 25), rng)
+    
+    def campo(valores, pesos, vacios):
+        resultado = rng.choice(valores, size=filas, p=pesos)
+        resultado[rng.random(filas) < vacios] = None
+        return resultado
+    
+    tipos = rng.choice(['CC', 'TI', 'RC', 'CE', 'PA', 'MS'], size=filas,
+                       p=[0.58, 0.2, 0.16, 0.03, 0.02, 0.01])
+    documentos = rng.choice(np.int64(1_100_000_000), size=filas, replace=False) + 1_000_000
+    # Las cédulas antiguas tienen 7 u 8 dígitos
+    cortos = (tipos == 'CC') & (rng.random(filas) < 0.35)
+    documentos[cortos] //= 100
+    
+    nacimiento = FECHA_FIN - pd.to_timedelta(rng.gamma(2.2, 12.0, filas) * 365.25, unit='D').floor('D')
+    
+    df = pd.DataFrame({
+        'ID_PACIENTE': np.arange(1, filas + 1, dtype=np.int64),
+        'IDE_PAC': documentos,
+        'COD_TID': tipos,
+        'NM1_PAC': campo(nombres, pesos_nombres, 0.002),
+        'NM2_PAC': campo(nombres, pesos_nombres, 0.35),
+        'AP1_PAC': campo(apellidos, pesos_apellidos, 0.001),
+        'AP2_PAC': campo(apellidos, pesos_apellidos, 0.08),
+        'SEX_PAC': rng.choice(['F', 'M'], size=filas, p=[0.54, 0.46]),
+        'FEC_NAC': nacimiento,
+        'TEL_PAC': rng.integers(3_000_000_000, 3_250_000_000, filas),
+    })
+    df.to_csv(os.path.join(directorio, 'DAT_PER.csv'), index=False, date_format='%Y-%m-%d')
+
+
+def generar_historico_y_facturas(directorio, filas_historico, filas_facturas, pacientes, rng):
+    """
+    HISTORICO_PYP.csv (atenciones) y CAB_FAC.csv (cabecera de facturas)
+    
+    Las facturas se numeran en orden de fecha, así que cada atención apunta a
+    una factura de una fecha cercana. Solo parte de las facturas corresponde
+    a atenciones de promoción y prevención (el resto son de otros servicios).
+    Ambos archivos se ordenan por fecha, como un archivo que solo crece.
+    """
+    # Atenciones: pocos pacientes concentran muchas atenciones
+    pesos_pacientes = rng.lognormal(0.0, 1.1, pacientes)
+    pesos_pacientes /= pesos_pacientes.sum()
+    pesos_actividades = _pesos_zipf(ACTIVIDADES_CATALOGO, 1.1, rng)
+    
+    fechas_historico = np.sort(_fechas(rng, filas_historico).values)
+    posicion = (fechas_historico - FECHA_INICIO.to_datetime64()) / (FECHA_FIN - FECHA_INICIO)
+    facturas = (posicion * filas_facturas + rng.normal(0, 50, filas_historico)).astype(np.int64)
+    facturas = np.clip(facturas, 0, filas_facturas - 1) + 1
+    
+    historico = pd.DataFrame({
+        'ID_PACIENTE': rng.choice(np.arange(1, pacientes + 1), size=filas_historico, p=pesos_pacientes),
+        'ID_ACTPYP': rng.choice(np.arange(1, ACTIVIDADES_CATALOGO + 1), size=filas_historico,
+                                p=pesos_actividades),
+        'IDCAB_FAC': pd.array(facturas, dtype='Int64'),
+        'FECHA': fechas_historico,
+    })
+    historico.loc[rng.random(filas_historico) < 0.03, 'IDCAB_FAC'] = pd.NA
+    
+    path = os.path.join(directorio, 'HISTORICO_PYP.csv')
+    for inicio in range(0, filas_historico, FILAS_BLOQUE):
+        historico.iloc[inicio:inicio + FILAS_BLOQUE].to_csv(
+            path, index=False, header=inicio == 0, mode='w' if inicio == 0 else 'a', date_format='%Y-%m-%d')
+    del historico
+    
+    # Facturas: una fila por factura, con columnas que la app no usa pero que
+    # dan al archivo el ancho real (la carga solo pide IDCAB_FAC y FAC_FEC)
+    observaciones = mal_codificar(OBSERVACIONES, rng)
+    fechas_facturas = np.sort(_fechas(rng, filas_facturas).values)
+    path = os.path.join(directorio, 'CAB_FAC.csv')
+    for inicio in range(0, filas_facturas, FILAS_BLOQUE):
+        fin = min(inicio + FILAS_BLOQUE, filas_facturas)
+        n = fin - inicio
+        fechas = pd.DatetimeIndex(fechas_facturas[inicio:fin]) + pd.to_timedelta(
+            rng.integers(6 * 3600, 20 * 3600, n), unit='s')
+        valor = np.round(rng.lognormal(11.0, 1.2, n), -2).astype(np.int64)
+        bloque = pd.DataFrame({
+            'IDCAB_FAC': np.arange(inicio + 1, fin + 1, dtype=np.int64),
+            'NUM_FAC': [f'FE{numero:09d}' for numero in range(inicio + 1, fin + 1)],
+            'FAC_FEC': fechas,
+            'ID_PACIENTE': rng.integers(1, pacientes + 1, n),
+            'ID_CONTRATO': rng.integers(1, CONTRATOS + 1, n),
+            'VAL_FAC': valor,
+            'VAL_COPAGO': valor // 1000 * rng.choice([0, 100, 200], n, p=[0.6, 0.3, 0.1]),
+            'VAL_DESC': np.where(rng.random(n) < 0.05, valor // 1000 * 100, 0),
+            'COD_EST': rng.choice(['A', 'F', 'R', 'N'], n, p=[0.05, 0.85, 0.07, 0.03]),
+            'USR_CRE': rng.choice(USUARIOS, n),
+            'FEC_CRE': fechas,
+            'OBS_FAC': rng.choice(observaciones, n),
+        })
+        # Facturas anuladas o en borrador sin fecha
+        bloque.loc[rng.random(n) < 0.002, 'FAC_FEC'] = pd.NaT
+        bloque.to_csv(path, index=False, header=inicio == 0, mode='w' if inicio == 0 else 'a',
+                      date_format='%Y-%m-%d %H:%M:%S')
+
+
+def generar(directorio, escala=1.0, semilla=0):
+    """
+    Generar todos los archivos en un directorio
+    
+    Si el directorio ya tiene archivos generados con la misma escala y
+    semilla no se vuelven a generar.
+    
+    Args:
+        directorio: Carpeta de destino
+        escala: Factor sobre FILAS_ESCALA_1 (1 ≈ tamaño de producción)
+        semilla: Semilla del generador aleatorio
+    
+    Returns:
+        Diccionario {archivo: tamaño en bytes}
+    """
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto_path = os.path.join(directorio, MANIFIESTO)
+    parametros = {'escala': escala, 'semilla': semilla}
+    
+    try:
+        with open(manifiesto_path, 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        if manifiesto.get('parametros') == parametros:
+            return manifiesto['archivos']
+    except (OSError, ValueError):
+        pass
+    
+    rng = np.random.default_rng(semilla)
+    filas = {clave: max(1000, int(n * escala)) for clave, n in FILAS_ESCALA_1.items()}
+    
+    print(f"🧪 Generando datos sintéticos (escala {escala}, semilla {semilla}) en {directorio}...")
+    generar_actividades(directorio, rng)
+    generar_pacientes(directorio, filas['DAT_PER'], rng)
+    generar_historico_y_facturas(directorio, filas['HISTORICO_PYP'], filas['CAB_FAC'], filas['DAT_PER'], rng)
+    
+    archivos = {
+        nombre: os.path.getsize(os.path.join(directorio, nombre))
+        for nombre in sorted(os.listdir(directorio)) if nombre.endswith('.csv')
+    }
+    with open(manifiesto_path, 'w', encoding='utf-8') as f:
+        json.dump({'parametros': parametros, 'filas': filas, 'archivos': archivos}, f, indent=2)
+    
+    for nombre, tamano in archivos.items():
+        print(f"   {nombre}: {tamano / 1024 / 1024:.1f} MB")
+    return archivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generar datos sintéticos con los esquemas de SITIS')
+    parser.add_argument('--escala', type=float, default=1.0, help='1 ≈ tamaño de producción')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--directorio', default='./datos_benchmark')
+    args = parser.parse_args()
+    generar(args.directorio, args.escala, args.semilla)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks de carga y consulta
+Genera (o reutiliza) los datos sintéticos, mide el tiempo y la memoria pico
+de la carga de cada archivo, la normalización de nombres y las búsquedas, y
+guarda los resultados en un JSON con el commit y el entorno, para compararlos
+entre commits con comparar.py
+
+Uso:
+    python -m benchmarks.ejecutar --escala 0.1 --repeticiones 5
+"""
+
+import io
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import config_sharepoint as config
+from benchmarks.datos_sinteticos import generar
+
+
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ_REPOSITORIO, 'benchmarks', 'resultados')
+
+# Consultas por repetición en los benchmarks de búsqueda
+CONSULTAS_POR_REPETICION = 500
+
+COLUMNAS_NOMBRE = ['NM1_PAC', 'NM2_PAC', 'AP1_PAC', 'AP2_PAC']
+
+
+def medir(funcion, repeticiones, preparar=None, operaciones=1):
+    """
+    Tiempo y memoria pico de una función
+    
+    La función se ejecuta `repeticiones` veces para medir el tiempo y una vez
+    más con tracemalloc para la memoria pico (tracemalloc la hace más lenta,
+    por eso esa ejecución no cuenta en los tiempos). tracemalloc ve las
+    asignaciones de Python, numpy y pandas, pero no las de Arrow.
+    
+    Args:
+        funcion: Función sin argumentos a medir
+        repeticiones: Número de ejecuciones cronometradas
+        preparar: Función opcional que se llama antes de cada ejecución, fuera
+            del tiempo medido (por ejemplo, para vaciar un cache)
+        operaciones: Consultas que hace cada ejecución (para el tiempo por consulta)
+    
+    Returns:
+        Diccionario con los tiempos en segundos y la memoria pico en MB
+    """
+    def ejecutar():
+        if preparar:
+            preparar()
+        gc.collect()
+        # Los mensajes de progreso del loader no forman parte de la medición
+        with redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcion()
+            return time.perf_counter() - inicio
+    
+    tiempos = [ejecutar() for _ in range(repeticiones)]
+    
+    tracemalloc.start()
+    try:
+        ejecutar()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    mediana = statistics.median(tiempos)
+    return {
+        'repeticiones': repeticiones,
+        'operaciones': operaciones,
+        'segundos': {
+            'min': min(tiempos),
+            'mediana': mediana,
+            'media': statistics.fmean(tiempos),
+            'max': max(tiempos),
+        },
+        'ms_por_operacion': mediana / operaciones * 1000,
+        'memoria_pico_mb': pico / 1024 / 1024,
+    }
+
+
+def _commit():
+    """Commit actual del repositorio y si hay cambios sin confirmar"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=RAIZ_REPOSITORIO,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                 cwd=RAIZ_REPOSITORIO, capture_output=True, text=True, check=True).stdout
+        return {'commit': commit, 'cambios_sin_confirmar': bool(cambios.strip())}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'cambios_sin_confirmar': None}
+
+
+def _entorno():
+    """Versiones y máquina en que se ejecutó la suite"""
+    entorno = {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+    try:
+        import pyarrow
+        entorno['pyarrow'] = pyarrow.__version__
+    except ImportError:
+        entorno['pyarrow'] = None
+    return entorno
+
+
+def _rss_pico_mb():
+    """Memoria residente máxima del proceso (None si la plataforma no la informa)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def ejecutar_suite(directorio_datos, escala, semilla, repeticiones, solo=None):
+    """
+    Ejecutar todos los benchmarks
+    
+    Args:
+        directorio_datos: Carpeta de los datos sintéticos (se generan si no existen)
+        escala: Escala de los datos (1 ≈ producción)
+        semilla: Semilla de los datos y de las consultas
+        repeticiones: Ejecuciones cronometradas por benchmark
+        solo: Prefijos opcionales de los benchmarks a ejecutar
+    
+    Returns:
+        Diccionario con los resultados, listo para guardar como JSON
+    """
+    directorio_datos = os.path.abspath(directorio_datos)
+    archivos = generar(directorio_datos, escala, semilla)
+    
+    # El loader lee los CSV locales del directorio de datos, con su propio cache
+    config.USE_SHAREPOINT = False
+    config.CACHE_DIRECTORY = os.path.join(directorio_datos, 'cache')
+    config.MEDIR_MEMORIA_CARGA = False
+    
+    from sharepoint_loader import SharePointLoader
+    from normalizacion import normalizar_texto, normalizar_serie, _MEMO
+    from conjunto_datos import facturas_referenciadas, construir_conjunto_datos, activar_copy_on_write
+    from cubo_actividades import CuboActividades, atenciones_cubo
+    from motor_consultas import (
+        buscar_paciente_por_documento,
+        buscar_atenciones_paciente,
+        buscar_pacientes_por_actividad,
+        buscar_indicadores_actividad,
+    )
+    activar_copy_on_write()
+    
+    directorio_anterior = os.getcwd()
+    os.chdir(directorio_datos)
+    loader = SharePointLoader()
+    resultados = {}
+    
+    def incluido(nombre):
+        return not solo or any(nombre.startswith(prefijo) for prefijo in solo)
+    
+    def registrar(nombre, *args, **kwargs):
+        if not incluido(nombre):
+            return
+        print(f"⏱️ {nombre}...")
+        resultados[nombre] = medir(*args, **kwargs)
+        r = resultados[nombre]
+        print(f"   mediana {r['segundos']['mediana']:.4f}s, "
+              f"{r['ms_por_operacion']:.3f} ms/op, pico {r['memoria_pico_mb']:.1f} MB")
+    
+    try:
+        with redirect_stdout(io.StringIO()):
+            df_actividades = loader.load_csv('ACTXPROG_FILTRADO')
+            df_historico = loader.load_csv('HISTORICO_PYP')
+        facturas = facturas_referenciadas(df_historico, df_actividades)
+        
+        # load_csv con los mismos argumentos que usa construir_conjunto_datos,
+        # parseando el CSV (cache columnar vacío) y desde el cache columnar
+        cargas = {
+            'ACTXPROG_FILTRADO': {},
+            'HISTORICO_PYP': {},
+            'DAT_PER': {},
+            'CAB_FAC': {'usecols': ['IDCAB_FAC', 'FAC_FEC'], 'row_filter': ('IDCAB_FAC', facturas)},
+        }
+        for csv_key, kwargs in cargas.items():
+            columnar_path = loader._columnar_path(config.ARCHIVOS_CSV[csv_key])
+            
+            def sin_cache_columnar():
+                if os.path.exists(columnar_path):
+                    os.remove(columnar_path)
+            
+            def cargar():
+                return loader.load_csv(csv_key, **kwargs)
+            
+            registrar(f'load_csv.{csv_key}.csv', cargar, repeticiones, preparar=sin_cache_columnar)
+            with redirect_stdout(io.StringIO()):
+                cargar()
+            registrar(f'load_csv.{csv_key}.columnar', cargar, repeticiones)
+        
+        # Normalización de las columnas de nombre, con la memoria de valores vacía
+        with redirect_stdout(io.StringIO()):
+            df_pacientes = loader.load_csv('DAT_PER')
+        nombres = {columna: df_pacientes[columna].astype(object) for columna in COLUMNAS_NOMBRE}
+        filas_nombres = sum(len(serie) for serie in nombres.values())
+        
+        registrar('normalizar_texto.nombres',
+                  lambda: [serie.map(normalizar_texto) for serie in nombres.values()],
+                  repeticiones, preparar=_MEMO.clear, operaciones=filas_nombres)
+        registrar('normalizar_serie.nombres',
+                  lambda: [normalizar_serie(df_pacientes[columna]) for columna in COLUMNAS_NOMBRE],
+                  repeticiones, preparar=_MEMO.clear, operaciones=filas_nombres)
+        
+        # Versión completa de los datos (carga desde el cache columnar + índices)
+        registrar('construir_conjunto_datos', lambda: construir_conjunto_datos(loader, version='benchmark'),
+                  repeticiones)
+        with redirect_stdout(io.StringIO()):
+            datos = construir_conjunto_datos(loader, version='benchmark')
+        
+        # Cubo de actividades: completo y con el 1% final del histórico como
+        # filas nuevas sobre el cubo de la versión anterior
+        with redirect_stdout(io.StringIO()):
+            df_cab_fac = loader.load_csv('CAB_FAC', **cargas['CAB_FAC'])
+        atenciones = atenciones_cubo(df_historico, df_cab_fac, df_actividades, df_pacientes)
+        anterior = CuboActividades(atenciones.iloc[:len(atenciones) - len(atenciones) // 100])
+        registrar('cubo_actividades.completo', lambda: CuboActividades(atenciones), repeticiones)
+        registrar('cubo_actividades.incremental', lambda: CuboActividades(atenciones, anterior=anterior),
+                  repeticiones)
+        
+        # Consultas: las mismas funciones que usan la app, la CLI y la API
+        rng = np.random.default_rng(semilla)
+        pacientes = datos.indice_pacientes.pacientes
+        muestra = rng.choice(len(pacientes), size=min(CONSULTAS_POR_REPETICION, len(pacientes)), replace=False)
+        documentos = pacientes['IDE_PAC'].iloc[muestra].astype(str).tolist()
+        # Una parte de las consultas es de documentos que no existen
+        documentos[::10] = [f'X{documento}' for documento in documentos[::10]]
+        ids_pacientes = pacientes['ID_PACIENTE'].iloc[muestra].tolist()
+        actividades = datos.actividades['ID_ACTXPROG'].tolist()
+        fecha_hasta = datos.indice_actividades.tabla['FECHA_ATENCION'].max()
+        fecha_desde = fecha_hasta - pd.DateOffset(years=1)
+        
+        def registrar_consultas(prefijo, datos):
+            def buscar_documentos():
+                for documento in documentos:
+                    buscar_paciente_por_documento(documento, datos.indice_pacientes)
+            
+            def buscar_atenciones():
+                for id_paciente in ids_pacientes:
+                    buscar_atenciones_paciente(id_paciente, datos.indice_pacientes)
+            
+            def buscar_actividades(**filtros):
+                def consulta():
+                    for id_actividad in actividades:
+                        buscar_pacientes_por_actividad(id_actividad, datos.indice_actividades, **filtros)
+                return consulta
+            
+            def buscar_indicadores():
+                for id_actividad in actividades:
+                    buscar_indicadores_actividad(id_actividad, datos.cubo_actividades)
+            
+            registrar(f'{prefijo}buscar_paciente_por_documento', buscar_documentos, repeticiones,
+                      operaciones=len(documentos))
+            registrar(f'{prefijo}buscar_atenciones_paciente', buscar_atenciones, repeticiones,
+                      operaciones=len(ids_pacientes))
+            registrar(f'{prefijo}buscar_pacientes_por_actividad', buscar_actividades(), repeticiones,
+                      operaciones=len(actividades))
+            registrar(f'{prefijo}buscar_pacientes_por_actividad.ultimo_anio',
+                      buscar_actividades(fecha_desde=fecha_desde, fecha_hasta=fecha_hasta),
+                      repeticiones, operaciones=len(actividades))
+            registrar(f'{prefijo}buscar_indicadores_actividad', buscar_indicadores, repeticiones,
+                      operaciones=len(actividades))
+        
+        registrar_consultas('', datos)
+        
+        # Backend SQL fuera de memoria: ingesta por bloques y las mismas consultas
+        if incluido('sql.'):
+            from almacen_sql import AlmacenSQL
+            almacen_sql = AlmacenSQL(directorio=os.path.join(directorio_datos, 'base_sql'))
+            registrar('sql.construir_base', lambda: almacen_sql.construir(loader, 'benchmark'), repeticiones)
+            with redirect_stdout(io.StringIO()):
+                datos_sql = almacen_sql.construir(loader, 'benchmark')
+            registrar_consultas('sql.', datos_sql)
+    finally:
+        os.chdir(directorio_anterior)
+    
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        **_commit(),
+        'entorno': _entorno(),
+        'parametros': {'escala': escala, 'semilla': semilla, 'repeticiones': repeticiones},
+        'archivos': archivos,
+        'rss_pico_mb': _rss_pico_mb(),
+        'resultados': resultados,
+    }
+
+
+def guardar(resultado, salida=None):
+    """Guardar el resultado como JSON (por defecto en benchmarks/resultados/) y devolver la ruta"""
+    if salida is None:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        fecha = datetime.now().strftime('%Y%m%d-%H%M%S')
+        commit = (resultado.get('commit') or 'sin-commit')[:10]
+        salida = os.path.join(DIRECTORIO_RESULTADOS, f"{fecha}_{commit}.json")
+    
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False, default=str)
+    return salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de carga y consulta sobre datos sintéticos')
+    parser.add_argument('--escala', type=float, default=0.1, help='1 ≈ tamaño de producción')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--datos', default=None,
+                        help='Carpeta de los datos sintéticos (por defecto ./datos_benchmark/escala-<escala>)')
+    parser.add_argument('--solo', nargs='*', help='Ejecutar solo los benchmarks con estos prefijos')
+    parser.add_argument('--salida', default=None, help='Archivo JSON de resultados')
+    args = parser.parse_args()
+    
+    datos = args.datos or os.path.join('datos_benchmark', f'escala-{args.escala:g}-semilla-{args.semilla}')
+    resultado = ejecutar_suite(datos, args.escala, args.semilla, args.repeticiones, args.solo)
+    print(f"💾 Resultados guardados en {guardar(resultado, args.salida)}")
+
+
+if __name__ == '__main__':
+    main()
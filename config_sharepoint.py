@@ -40,6 +40,14 @@ SHAREPOINT_CLIENT_ID = os.getenv('SHAREPOINT_CLIENT_ID', '')
 SHAREPOINT_CLIENT_SECRET = os.getenv('SHAREPOINT_CLIENT_SECRET', '')
 SHAREPOINT_TENANT_ID = os.getenv('SHAREPOINT_TENANT_ID', '')
 
+# El token de acceso se reutiliza hasta este número de segundos antes de que
+# expire; solo entonces se solicita uno nuevo
+TOKEN_MARGEN_EXPIRACION_SEGUNDOS = 5 * 60
+
+# Archivo (dentro de CACHE_DIRECTORY) donde se guardan el site_id y drive_id
+# para no consultarlos de nuevo en cada arranque
+SHAREPOINT_IDS_ARCHIVO = 'sharepoint_ids.json'
+
 # ============= MODO DE OPERACIÓN =============
 
 # Si True, intenta leer desde SharePoint. Si False, lee archivos locales
@@ -49,3 +57,215 @@ USE_SHAREPOINT = True  # Activado para usar SharePoint
 CACHE_LOCAL = True
 CACHE_DIRECTORY = './cache_sharepoint'
 
+# Sufijo del archivo de metadatos (eTag, cTag, tamaño, fecha de modificación)
+# que se guarda junto a cada archivo del cache para evitar descargas innecesarias
+CACHE_METADATA_SUFFIX = '.meta.json'
+
+# Cache columnar (Parquet) con el resultado ya parseado de cada CSV.
+# Requiere pyarrow; permite leer solo las columnas solicitadas con usecols y
+# se invalida automáticamente cuando cambia el CSV de origen
+CACHE_COLUMNAR = True
+CACHE_COLUMNAR_SUFFIX = '.parquet'
+
+# Archivos que se descargan y parsean por bloques directamente desde la
+# respuesta HTTP (memoria acotada al tamaño del bloque + resultado proyectado)
+ARCHIVOS_STREAMING = ['CAB_FAC']
+STREAMING_CHUNK_ROWS = 200_000
+STREAMING_BUFFER_BYTES = 1024 * 1024
+
+# Archivos que solo crecen agregando filas: si el inicio no cambió, se
+# descargan solo los bytes nuevos con un header Range. La cola del cache
+# (INCREMENTAL_TAIL_BYTES) se compara con el remoto para validar el prefijo
+ARCHIVOS_INCREMENTALES = ['HISTORICO_PYP']
+INCREMENTAL_TAIL_BYTES = 64 * 1024
+
+# Archivos de este tamaño o más se descargan por rangos de bytes en paralelo,
+# escribiendo en un archivo preasignado y con reanudación si se interrumpen
+DESCARGA_RANGOS_UMBRAL = 100 * 1024 * 1024
+DESCARGA_RANGOS_TAMANO = 16 * 1024 * 1024
+DESCARGA_RANGOS_HILOS = 4
+# Reintentos de un rango cuyo cuerpo se corta o llega incompleto; los errores
+# de la solicitud ya los reintenta el transporte (HTTP_REINTENTOS)
+DESCARGA_RANGOS_REINTENTOS = 3
+DESCARGA_RANGOS_TIMEOUT = (10, 60)  # (conexión, lectura) en segundos
+VERIFICAR_HASH_DESCARGA = True  # Comparar el QuickXorHash publicado por SharePoint
+
+# ============= CARGA EN PARALELO =============
+
+# Número de archivos que se descargan/parsean simultáneamente en load_many
+MAX_CARGAS_PARALELAS = 4
+
+# Pool de conexiones HTTP (keep-alive) compartido por todas las descargas
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 8
+
+# ============= REINTENTOS HTTP =============
+
+# Timeout por solicitud (conexión, lectura) en segundos
+HTTP_TIMEOUT = (10, 60)
+
+# Reintentos ante errores temporales (throttling 429, errores 5xx, conexión o
+# timeout) con espera exponencial: BASE * 2^intento, sin pasar de MAX
+HTTP_REINTENTOS = 5
+HTTP_ESTADOS_REINTENTO = (429, 500, 502, 503, 504)
+HTTP_BACKOFF_BASE_SEGUNDOS = 1
+HTTP_BACKOFF_MAX_SEGUNDOS = 60
+
+# Si el servidor envía Retry-After se respeta, hasta este máximo
+HTTP_RETRY_AFTER_MAX_SEGUNDOS = 300
+
+# ============= ESQUEMAS DE DATOS =============
+
+# Tipos que se aplican a cada archivo al parsearlo (solo a las columnas presentes).
+# IDs como enteros de 32 bits ('Int32' nullable en las columnas que pueden
+# venir vacías, para que todos los bloques tengan el mismo tipo), columnas de
+# baja cardinalidad como categorías, fechas como (datetime64, formato exacto
+# del archivo) y textos largos como string[pyarrow]. Las fechas que no tienen
+# el formato se interpretan como ISO 8601; las que tampoco lo son quedan
+# vacías y se informan al cargar
+ESQUEMAS = {
+    'ACTXPROG_FILTRADO': {
+        'ID_ACTXPROG': 'int32',
+        'DES_ACTXPROG': 'category',
+    },
+    'DAT_PER': {
+        'ID_PACIENTE': 'int32',
+        'IDE_PAC': 'string[pyarrow]',
+        'COD_TID': 'category',
+        'SEX_PAC': 'category',
+        'NM1_PAC': 'category',
+        'NM2_PAC': 'category',
+        'AP1_PAC': 'category',
+        'AP2_PAC': 'category',
+        'TEL_PAC': 'Int64',
+    },
+    'HISTORICO_PYP': {
+        'ID_PACIENTE': 'int32',
+        'ID_ACTPYP': 'int32',
+        'IDCAB_FAC': 'Int32',
+        'FECHA': ('datetime64[ns]', '%Y-%m-%d'),
+    },
+    'CAB_FAC': {
+        'IDCAB_FAC': 'int32',
+        'FAC_FEC': ('datetime64[ns]', '%Y-%m-%d %H:%M:%S'),
+    },
+}
+
+# Medir la memoria por columna antes/después de aplicar el esquema
+# (SharePointLoader.memory_report); tiene un costo pequeño durante el parseo
+MEDIR_MEMORIA_CARGA = True
+
+# ============= ACTUALIZACIÓN DE DATOS =============
+
+# Cada cuántos segundos se revisa en segundo plano si cambiaron los archivos
+# (solo metadatos); si cambiaron, se construye la nueva versión sin bloquear
+# las consultas y se publica al terminar
+REFRESCO_INTERVALO_SEGUNDOS = 15 * 60
+
+# Mientras no haya ninguna versión cargada (falló la primera carga), se
+# reintenta a los pocos segundos, duplicando la espera hasta llegar al
+# intervalo normal
+REFRESCO_REINTENTO_SEGUNDOS = 5
+
+# Almacén Arrow compartido entre procesos de la app (requiere pyarrow).
+# Cada versión de los datos se publica una vez en este directorio y los demás
+# procesos la abren con memory-map en lugar de cargar su propia copia
+ALMACEN_ARROW = True
+ALMACEN_ARROW_DIRECTORIO = './almacen_arrow'
+
+# Versiones publicadas que se conservan en el directorio
+ALMACEN_ARROW_VERSIONES_CONSERVAR = 2
+
+# Tiempo máximo de espera a que otro proceso termine de publicar una versión
+ALMACEN_ARROW_ESPERA_SEGUNDOS = 10 * 60
+
+# Mientras un proceso construye una versión actualiza la fecha de su reserva
+# (.lock) cada LATIDO segundos; una reserva sin actualizar durante
+# RESERVA_ABANDONADA segundos es de un proceso que terminó y otro la toma
+ALMACEN_ARROW_LATIDO_SEGUNDOS = 30
+ALMACEN_ARROW_RESERVA_ABANDONADA_SEGUNDOS = 2 * 60
+
+# Cubo de actividades (cubo_actividades.py): conservar los pares (celda,
+# paciente) ya contados para que la siguiente versión solo sume las filas
+# nuevas del histórico. Ocupan ~8 bytes por par (del orden de 3 por atención);
+# con False el cubo se recalcula completo en cada versión
+CUBO_ACTIVIDADES_INCREMENTAL = True
+
+# ============= RESULTADOS Y EXPORTACIÓN =============
+
+# Filas por página al mostrar resultados (opciones y valor por defecto)
+FILAS_POR_PAGINA_OPCIONES = [50, 100, 500, 1000]
+FILAS_POR_PAGINA = 100
+
+# Las exportaciones CSV se generan al solicitarlas, por bloques de filas, y se
+# reutilizan mientras no cambien la consulta ni la versión de los datos
+EXPORTACION_DIRECTORIO = './exportaciones'
+EXPORTACION_FILAS_BLOQUE = 100_000
+EXPORTACION_HORAS_CONSERVAR = 24
+
+# ============= INSTRUMENTACIÓN =============
+
+# Registrar duración, bytes y filas de cada fase de carga y consulta
+# (instrumentacion.py): líneas JSON, archivo de métricas de Prometheus y
+# panel de administración en la barra lateral
+INSTRUMENTACION = True
+INSTRUMENTACION_DIRECTORIO = './metricas'
+
+# Log de fases en líneas JSON, con rotación por tamaño
+INSTRUMENTACION_LOG_JSON = 'fases.jsonl'
+INSTRUMENTACION_LOG_MAX_BYTES = 20 * 1024 * 1024
+INSTRUMENTACION_LOG_ARCHIVOS = 5
+
+# Archivo de texto para el textfile collector de node_exporter (uno por
+# proceso) y cada cuántos segundos como máximo se reescribe
+INSTRUMENTACION_PROMETHEUS = 'sitis_{pid}.prom'
+INSTRUMENTACION_PROMETHEUS_INTERVALO_SEGUNDOS = 15
+
+# Límites de los buckets del histograma de duración (segundos)
+INSTRUMENTACION_BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Registros recientes que se conservan en memoria para los percentiles del panel
+INSTRUMENTACION_REGISTROS_RECIENTES = 5000
+
+# Clave para ver el panel de administración (vacía = panel desactivado)
+ADMIN_CLAVE = os.getenv('SITIS_ADMIN_CLAVE', '')
+
+# ============= MOTOR DE CONSULTAS (CLI Y API HTTP) =============
+
+# Dirección de la API JSON (python -m motor_consultas servir); por defecto
+# solo acepta conexiones locales
+MOTOR_API_HOST = os.getenv('SITIS_API_HOST', '127.0.0.1')
+MOTOR_API_PUERTO = int(os.getenv('SITIS_API_PUERTO', '8765'))
+
+# Clave que los clientes envían en el header X-API-Key; es obligatoria para
+# escuchar en una dirección que no sea local
+MOTOR_API_CLAVE = os.getenv('SITIS_API_CLAVE', '')
+
+# Segundos que una solicitud espera la primera carga de datos antes de responder 503
+MOTOR_API_ESPERA_DATOS_SEGUNDOS = 5
+
+# Límites por solicitud: filas por página, documentos de la búsqueda masiva y tamaño del cuerpo
+MOTOR_API_FILAS_MAX = 10_000
+MOTOR_API_DOCUMENTOS_MAX = 100_000
+MOTOR_API_CUERPO_MAX_BYTES = 10 * 1024 * 1024
+
+# ============= BACKEND SQL (FUERA DE MEMORIA) =============
+
+# Dónde viven las tablas grandes de cada versión de los datos:
+# 'memoria' - índices de pandas/numpy en RAM (y almacén Arrow compartido)
+# 'sql'     - base de datos embebida en disco (almacen_sql.py): la memoria no
+#             crece con el histórico, a cambio de consultas algo más lentas
+BACKEND_DATOS = os.getenv('SITIS_BACKEND_DATOS', 'memoria')
+
+# Motor de la base: 'duckdb' (columnar, pip install duckdb), 'sqlite'
+# (incluido en Python) o 'auto' (DuckDB si está instalado)
+BACKEND_SQL_MOTOR = 'auto'
+BACKEND_SQL_DIRECTORIO = './base_sql'
+BACKEND_SQL_VERSIONES_CONSERVAR = 2
+
+# Filas por bloque al ingerir los CSV en la base
+BACKEND_SQL_FILAS_BLOQUE = 200_000
+
+# Límite de memoria de DuckDB y cache de páginas de cada conexión SQLite
+BACKEND_SQL_MEMORIA_MB = 1024
+BACKEND_SQL_SQLITE_CACHE_MB = 64
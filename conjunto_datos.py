@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construcción de una versión completa de los datos de consulta
+(catálogo de actividades, índice de pacientes e índice de actividades)
+a partir de los archivos de SharePoint
+"""
+
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+
+from indices import construir_atenciones, IndicePacientes, IndiceActividades, IndiceNombres
+from cubo_actividades import CuboActividades, atenciones_cubo
+from normalizacion import normalizar_serie
+from instrumentacion import instrumentacion
+
+
+# Archivos de los que depende una versión de los datos
+ARCHIVOS_FUENTE = ['ACTXPROG_FILTRADO', 'HISTORICO_PYP', 'DAT_PER', 'CAB_FAC']
+
+
+def activar_copy_on_write():
+    """
+    Activar Copy-on-Write de pandas (desde pandas 3.0 siempre está activo)
+    
+    Los resultados de las consultas (filtros, columnas, slices) comparten
+    memoria con los datos publicados sin copiarlos, y escribir en ellos crea
+    una copia en lugar de modificar los datos compartidos. Es una opción
+    global del proceso: la activan los puntos de entrada (app, motor de
+    consultas, benchmarks), no la importación de este módulo.
+    """
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+
+class ConjuntoDatos:
+    """
+    Versión completa de los datos de consulta, construida de una sola vez
+    
+    Es inmutable: se comparte por referencia entre todas las sesiones y
+    ejecuciones de la app, sin copiarla. Los atributos no se pueden
+    reasignar, los arreglos de los índices son de solo lectura y las tablas
+    se entregan como vistas Copy-on-Write.
+    """
+    
+    __slots__ = ('_actividades', 'indice_pacientes', 'indice_actividades', 'indice_nombres',
+                 'cubo_actividades', 'version', 'cargado_en')
+    
+    def __init__(self, actividades, indice_pacientes, indice_actividades, indice_nombres, cubo_actividades,
+                 version, cargado_en=None):
+        asignar = super().__setattr__
+        asignar('_actividades', actividades)
+        asignar('indice_pacientes', indice_pacientes.congelar())
+        asignar('indice_actividades', indice_actividades.congelar())
+        asignar('indice_nombres', indice_nombres.congelar())
+        asignar('cubo_actividades', cubo_actividades.congelar())
+        asignar('version', version)
+        asignar('cargado_en', cargado_en or datetime.now())
+    
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("ConjuntoDatos es de solo lectura; publique una nueva versión")
+    
+    @property
+    def actividades(self):
+        """Catálogo de actividades (vista sin copia: modificarla no afecta los datos compartidos)"""
+        return self._actividades.copy(deep=False)
+    
+    def antiguedad(self):
+        """Tiempo transcurrido desde que se construyó esta versión"""
+        return datetime.now() - self.cargado_en
+
+
+# Funciones para preparar los datos cargados
+def preparar_actividades(df):
+    """Prepara el catálogo de actividades filtradas"""
+    # Normalizar descripciones
+    with instrumentacion.fase('normalizacion', 'ACTXPROG_FILTRADO') as medida:
+        df['DES_ACTXPROG'] = normalizar_serie(df['DES_ACTXPROG'])
+        medida['filas'] = len(df)
+    return df
+
+def preparar_datos_pacientes(df):
+    """Prepara los datos de pacientes"""
+    # Convertir IDE_PAC a string para búsqueda (si el esquema no lo cargó ya como texto)
+    if not pd.api.types.is_string_dtype(df['IDE_PAC']):
+        df['IDE_PAC'] = df['IDE_PAC'].astype(str)
+    
+    # Normalizar nombres
+    with instrumentacion.fase('normalizacion', 'DAT_PER') as medida:
+        df['NM1_PAC'] = normalizar_serie(df['NM1_PAC'])
+        df['NM2_PAC'] = normalizar_serie(df['NM2_PAC'])
+        df['AP1_PAC'] = normalizar_serie(df['AP1_PAC'])
+        df['AP2_PAC'] = normalizar_serie(df['AP2_PAC'])
+        medida['filas'] = len(df)
+    
+    # Concatenar nombre completo (astype(object) permite rellenar columnas categóricas)
+    df['NOMBRE_COMPLETO'] = (
+        df['NM1_PAC'].astype(object).fillna('').astype(str) + ' ' +
+        df['NM2_PAC'].astype(object).fillna('').astype(str) + ' ' +
+        df['AP1_PAC'].astype(object).fillna('').astype(str) + ' ' +
+        df['AP2_PAC'].astype(object).fillna('').astype(str)
+    ).str.strip().str.replace(r'\s+', ' ', regex=True)
+    
+    return df
+
+def facturas_referenciadas(df_historico, df_actividades):
+    """IDs de factura usados por atenciones de actividades del catálogo"""
+    codigos_validos = df_actividades['ID_ACTXPROG']
+    atenciones = df_historico[df_historico['ID_ACTPYP'].isin(codigos_validos)]
+    return atenciones['IDCAB_FAC'].dropna().unique()
+
+def version_fuentes(loader):
+    """
+    Identificador corto de la versión actual de todos los archivos fuente
+    
+    Solo consulta metadatos (eTag en SharePoint, tamaño y fecha en local),
+    así que es barato llamarlo periódicamente para detectar cambios.
+    """
+    versiones = [f"{csv_key}={loader.get_version(csv_key)}" for csv_key in ARCHIVOS_FUENTE]
+    return hashlib.sha1('|'.join(versiones).encode('utf-8')).hexdigest()[:12]
+
+def construir_conjunto_datos(loader, version=None, anterior=None):
+    """
+    Carga todos los archivos y construye una versión completa de los datos
+    
+    Args:
+        loader: SharePointLoader usado para leer los archivos
+        version: Versión de las fuentes ya calculada (se calcula si no se indica)
+        anterior: Versión vigente, opcional; si el histórico solo creció, el
+            cubo de actividades suma a su cubo solo las filas nuevas
+    
+    Returns:
+        ConjuntoDatos listo para consultar
+    """
+    if version is None:
+        version = version_fuentes(loader)
+    
+    # Etapa 1: catálogo e histórico, necesarios para saber qué facturas se usan
+    datos = loader.load_many([
+        'ACTXPROG_FILTRADO',
+        'HISTORICO_PYP',
+    ], encoding='utf-8')
+    df_actividades = preparar_actividades(datos['ACTXPROG_FILTRADO'])
+    df_historico = datos['HISTORICO_PYP']
+    
+    # Etapa 2: pacientes y facturas. De CAB_FAC solo se conservan las columnas
+    # necesarias y las facturas referenciadas por el histórico (semi-join)
+    facturas = facturas_referenciadas(df_historico, df_actividades)
+    datos = loader.load_many([
+        'DAT_PER',
+        ('CAB_FAC', {
+            'usecols': ['IDCAB_FAC', 'FAC_FEC'],
+            'row_filter': ('IDCAB_FAC', facturas),
+        }),
+    ], encoding='utf-8')
+    
+    df_pacientes = preparar_datos_pacientes(datos['DAT_PER'])
+    
+    # Tabla de atenciones ya unida con facturas y catálogo, construida una sola vez
+    with instrumentacion.fase('indices', 'atenciones') as medida:
+        df_atenciones = construir_atenciones(df_historico, datos['CAB_FAC'], df_actividades)
+        medida['filas'] = len(df_atenciones)
+    with instrumentacion.fase('indices', 'pacientes'):
+        indice_pacientes = IndicePacientes(df_pacientes, df_atenciones)
+    with instrumentacion.fase('indices', 'actividades') as medida:
+        indice_actividades = IndiceActividades(df_atenciones, df_pacientes)
+        medida['filas'] = len(indice_actividades.tabla)
+    with instrumentacion.fase('indices', 'nombres'):
+        indice_nombres = IndiceNombres(df_pacientes)
+    with instrumentacion.fase('indices', 'cubo') as medida:
+        cubo_actividades = CuboActividades(
+            atenciones_cubo(df_historico, datos['CAB_FAC'], df_actividades, df_pacientes),
+            anterior=getattr(anterior, 'cubo_actividades', None)
+        )
+        medida['filas'] = cubo_actividades.filas_nuevas
+    if cubo_actividades.filas_nuevas < cubo_actividades.filas:
+        print(f"📊 Cubo de actividades: {cubo_actividades.filas_nuevas} atenciones nuevas "
+              f"sumadas a la versión anterior")
+    
+    return ConjuntoDatos(df_actividades, indice_pacientes, indice_actividades, indice_nombres, cubo_actividades,
+                         version)
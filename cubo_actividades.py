@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cubo precalculado de atenciones por actividad × mes × sexo
+Se construye una vez por versión de los datos: cuenta las atenciones y los
+pacientes distintos de cada actividad del catálogo por año-mes y SEX_PAC,
+con los totales de todos los meses y de todas las actividades. Los
+tableros consultan solo las celdas de una actividad (búsqueda binaria), sin
+recorrer el histórico.
+
+Cuando el histórico solo creció (filas nuevas al final, como en la
+sincronización incremental), la nueva versión suma al cubo anterior solo las
+filas nuevas. Una huella de las filas ya contadas garantiza que no cambiaron
+(actividad, fecha de atención, sexo y paciente); si cambiaron, el cubo se
+recalcula completo.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import config_sharepoint as config
+
+
+# Columnas de las atenciones con las que se construye el cubo
+COLUMNAS_CUBO = ['ID_ACTPYP', 'FECHA_ATENCION', 'ID_PACIENTE', 'SEX_PAC']
+
+# Clave de una celda en un int64: actividad (desplazada a no negativa, 33
+# bits), mes (16 bits) y sexo (8 bits)
+_BITS_MES = 16
+_BITS_SEXO = 8
+_DESPLAZAMIENTO_ACTIVIDAD = 2 ** 31
+ACTIVIDAD_TODAS = 2 ** 32
+TODOS_LOS_MESES = 2 ** _BITS_MES - 1
+SIN_FECHA = 0
+SIN_SEXO = 0
+
+# Mes 1 = primer mes representable en datetime64[ns] (1677-09)
+_MES_MINIMO = int(np.datetime64(pd.Timestamp.min, 'M').astype(np.int64))
+
+_MASCARA_MES = (2 ** _BITS_MES - 1) << _BITS_SEXO
+_MASCARA_SEXO_MES = 2 ** (_BITS_MES + _BITS_SEXO) - 1
+
+
+def _clave_actividad(id_actividad):
+    """Actividad desplazada de la clave (None si no puede estar en el cubo)"""
+    if id_actividad is None:
+        return ACTIVIDAD_TODAS
+    id_actividad = int(id_actividad)
+    if not -_DESPLAZAMIENTO_ACTIVIDAD <= id_actividad < _DESPLAZAMIENTO_ACTIVIDAD:
+        return None
+    return id_actividad + _DESPLAZAMIENTO_ACTIVIDAD
+
+
+def sexo_pacientes(df_pacientes):
+    """SEX_PAC por ID_PACIENTE (el primer registro de cada paciente en DAT_PER)"""
+    return df_pacientes.drop_duplicates('ID_PACIENTE').set_index('ID_PACIENTE')['SEX_PAC']
+
+
+def con_sexo(df_atenciones, sexos):
+    """
+    Agregar SEX_PAC a las atenciones (ID_ACTPYP, FECHA_ATENCION, ID_PACIENTE)
+    
+    Los pacientes que no están en DAT_PER quedan sin ID_PACIENTE: sus
+    atenciones se cuentan pero ellos no, igual que en la búsqueda por
+    actividad, donde no tienen IDE_PAC.
+    """
+    pacientes = df_atenciones['ID_PACIENTE']
+    return pd.DataFrame({
+        'ID_ACTPYP': df_atenciones['ID_ACTPYP'],
+        'FECHA_ATENCION': df_atenciones['FECHA_ATENCION'],
+        'ID_PACIENTE': pacientes.astype('Int64').where(pacientes.isin(sexos.index)),
+        'SEX_PAC': pacientes.map(sexos),
+    })
+
+
+def atenciones_cubo(df_historico, df_cab_fac, df_actividades, df_pacientes):
+    """
+    Atenciones del catálogo en el orden del histórico, con las columnas del cubo
+    
+    Misma FECHA_ATENCION que construir_atenciones (FAC_FEC y, si la factura
+    no la tiene, FECHA). El orden del histórico es el que permite reconocer
+    las filas agregadas al final en la siguiente versión.
+    
+    Returns:
+        DataFrame con ID_ACTPYP, FECHA_ATENCION, ID_PACIENTE y SEX_PAC
+    """
+    atenciones = df_historico.loc[
+        df_historico['ID_ACTPYP'].isin(df_actividades['ID_ACTXPROG']),
+        ['ID_ACTPYP', 'ID_PACIENTE', 'IDCAB_FAC', 'FECHA']
+    ]
+    fechas_factura = df_cab_fac.drop_duplicates('IDCAB_FAC').set_index('IDCAB_FAC')['FAC_FEC']
+    atenciones = atenciones.assign(
+        FECHA_ATENCION=atenciones['IDCAB_FAC'].map(fechas_factura).fillna(atenciones['FECHA'])
+    )
+    return con_sexo(atenciones, sexo_pacientes(df_pacientes))
+
+
+def _codificar(df_atenciones, sexos):
+    """
+    Clave de celda (actividad, mes, sexo) y paciente de cada atención
+    
+    Los sexos nuevos se agregan al final de la lista sexos, para que los
+    códigos de un cubo anterior sigan siendo válidos. Los pacientes vacíos
+    quedan como -1.
+    """
+    actividades = df_atenciones['ID_ACTPYP'].to_numpy(dtype=np.int64) + _DESPLAZAMIENTO_ACTIVIDAD
+    
+    meses = df_atenciones['FECHA_ATENCION'].to_numpy(dtype='datetime64[M]')
+    meses = np.where(np.isnat(meses), SIN_FECHA, meses.astype(np.int64) - _MES_MINIMO + 1)
+    
+    codigos, valores = pd.factorize(df_atenciones['SEX_PAC'])
+    for valor in valores:
+        if valor not in sexos:
+            sexos.append(valor)
+    # El código -1 de factorize (vacío) toma el último elemento: SIN_SEXO
+    traduccion = np.array([sexos.index(valor) + 1 for valor in valores] + [SIN_SEXO], dtype=np.int64)
+    sexo = traduccion[codigos]
+    
+    claves = (actividades << (_BITS_MES + _BITS_SEXO)) | (meses << _BITS_SEXO) | sexo
+    pacientes = df_atenciones['ID_PACIENTE'].to_numpy(dtype=np.int64, na_value=-1)
+    return np.ascontiguousarray(claves), np.ascontiguousarray(pacientes)
+
+
+def _buscar(ordenados, valores):
+    """Posición de inserción de cada valor en un arreglo ordenado y si ya estaba"""
+    posicion = np.searchsorted(ordenados, valores)
+    encontrado = np.zeros(len(valores), dtype=bool)
+    dentro = posicion < len(ordenados)
+    encontrado[dentro] = ordenados[posicion[dentro]] == valores[dentro]
+    return posicion, encontrado
+
+
+class CuboActividades:
+    """
+    Atenciones y pacientes distintos por actividad × mes × sexo
+    
+    Cada atención suma en cuatro celdas: (actividad, mes), (actividad, todos
+    los meses), (todas las actividades, mes) y (todas, todos), cada una por
+    sexo. Los totales sobre los sexos son sumas, porque cada paciente tiene
+    un solo sexo; los pacientes de varios meses o actividades no se pueden
+    sumar, por eso se precalculan los totales.
+    
+    - claves, atenciones, pacientes: celdas en orden de creación (las de
+      versiones anteriores conservan su posición)
+    - vistos: pares (celda, paciente) ya contados, ordenados, para sumar
+      solo los pacientes nuevos en una actualización incremental
+    """
+    
+    def __init__(self, df_atenciones, anterior=None, incremental=None):
+        """
+        Args:
+            df_atenciones: Atenciones en el orden del histórico (atenciones_cubo)
+            anterior: Cubo de la versión anterior; si las primeras filas son
+                las mismas que contó, solo se suman las nuevas
+            incremental: Conservar los pares ya contados para poder sumar
+                filas nuevas (por defecto config.CUBO_ACTIVIDADES_INCREMENTAL)
+        """
+        self.sexos = list(anterior.sexos) if anterior is not None else []
+        claves, pacientes = _codificar(df_atenciones, self.sexos)
+        
+        base, inicio = None, 0
+        huella_claves, huella_pacientes = hashlib.sha1(), hashlib.sha1()
+        if anterior is not None and anterior.vistos is not None and anterior.filas <= len(claves):
+            huella_claves.update(claves[:anterior.filas])
+            huella_pacientes.update(pacientes[:anterior.filas])
+            if huella_claves.digest() + huella_pacientes.digest() == anterior.huella:
+                base, inicio = anterior, anterior.filas
+            else:
+                huella_claves, huella_pacientes = hashlib.sha1(), hashlib.sha1()
+        
+        huella_claves.update(claves[inicio:])
+        huella_pacientes.update(pacientes[inicio:])
+        self._acumular(base, claves[inicio:], pacientes[inicio:])
+        self.filas = len(claves)
+        self.filas_nuevas = len(claves) - inicio
+        self.huella = huella_claves.digest() + huella_pacientes.digest()
+        if not (config.CUBO_ACTIVIDADES_INCREMENTAL if incremental is None else incremental):
+            self.vistos = None
+        self._ordenar()
+    
+    @classmethod
+    def desde_partes(cls, tablas, arreglos):
+        """Reconstruir el cubo a partir de partes() sin volver a contar"""
+        cubo = cls.__new__(cls)
+        cubo.sexos = tablas['sexos']['SEX_PAC'].tolist()
+        cubo.claves = arreglos['claves']
+        cubo.atenciones = arreglos['atenciones']
+        cubo.pacientes = arreglos['pacientes']
+        cubo.vistos = arreglos.get('vistos')
+        cubo.filas = int(arreglos['filas'][0])
+        cubo.filas_nuevas = 0
+        cubo.huella = bytes(arreglos['huella']) if 'huella' in arreglos else b''
+        cubo._ordenar()
+        return cubo
+    
+    @classmethod
+    def desde_celdas(cls, df_celdas, sexos):
+        """
+        Cubo a partir de celdas ya contadas (p. ej. con GROUP BY en la base SQL)
+        
+        Args:
+            df_celdas: DataFrame con ACTIVIDAD (ID_ACTPYP; vacío en los totales
+                de todas las actividades), MES (meses desde 1970-01; vacío para las
+                atenciones sin fecha), TODOS_LOS_MESES (1 en los totales de
+                todos los meses), SEXO (posición en sexos + 1; 0 sin sexo),
+                ATENCIONES y PACIENTES
+            sexos: Valores de SEX_PAC de los códigos de sexo 1, 2, ...
+        
+        El cubo no conserva los pares contados: la siguiente versión se
+        calcula completa.
+        """
+        actividades = df_celdas['ACTIVIDAD'].astype('Int64')
+        actividades = (actividades + _DESPLAZAMIENTO_ACTIVIDAD).to_numpy(dtype=np.int64, na_value=ACTIVIDAD_TODAS)
+        meses = df_celdas['MES'].astype('Int64')
+        meses = (meses - _MES_MINIMO + 1).to_numpy(dtype=np.int64, na_value=SIN_FECHA)
+        meses[df_celdas['TODOS_LOS_MESES'].to_numpy(dtype=bool)] = TODOS_LOS_MESES
+        sexo = df_celdas['SEXO'].to_numpy(dtype=np.int64)
+        
+        cubo = cls.__new__(cls)
+        cubo.sexos = list(sexos)
+        cubo.claves = (actividades << (_BITS_MES + _BITS_SEXO)) | (meses << _BITS_SEXO) | sexo
+        cubo.atenciones = df_celdas['ATENCIONES'].to_numpy(dtype=np.int64)
+        cubo.pacientes = df_celdas['PACIENTES'].to_numpy(dtype=np.int64)
+        cubo.vistos = None
+        # Cada atención está una vez en las celdas (todas, todos) de su sexo
+        cubo.filas = int(cubo.atenciones[(actividades == ACTIVIDAD_TODAS) & (meses == TODOS_LOS_MESES)].sum())
+        cubo.filas_nuevas = cubo.filas
+        cubo.huella = b''
+        cubo._ordenar()
+        return cubo
+    
+    def partes(self):
+        """Tablas y arreglos que definen el cubo (para publicarlo en el almacén compartido)"""
+        tablas = {'sexos': pd.DataFrame({'SEX_PAC': pd.Series(self.sexos, dtype=object)})}
+        arreglos = {
+            'claves': self.claves,
+            'atenciones': self.atenciones,
+            'pacientes': self.pacientes,
+            'filas': np.array([self.filas], dtype=np.int64),
+            'huella': np.frombuffer(self.huella, dtype=np.uint8),
+        }
+        if self.vistos is not None:
+            arreglos['vistos'] = self.vistos
+        return tablas, arreglos
+    
+    def congelar(self):
+        """Impedir modificaciones al cubo una vez publicado (compartido entre sesiones)"""
+        for arreglo in (self.claves, self.atenciones, self.pacientes, self.orden, self.claves_ordenadas,
+                        self.vistos):
+            if arreglo is not None:
+                arreglo.flags.writeable = False
+        return self
+    
+    def _acumular(self, base, claves, pacientes):
+        """Sumar atenciones (claves de celda y pacientes) a las celdas de base"""
+        if base is None:
+            claves_base = np.empty(0, dtype=np.int64)
+            atenciones = pacientes_celda = vistos = np.empty(0, dtype=np.int64)
+            orden = np.empty(0, dtype=np.intp)
+        else:
+            claves_base, atenciones, pacientes_celda = base.claves, base.atenciones, base.pacientes
+            vistos, orden = base.vistos, base.orden
+            if vistos is None:
+                raise ValueError("El cubo no conserva los pacientes contados: no admite filas nuevas")
+        
+        # Cada atención en sus cuatro celdas (el mes y la actividad también como "todos")
+        todas_actividades = (ACTIVIDAD_TODAS << (_BITS_MES + _BITS_SEXO)) | (claves & _MASCARA_SEXO_MES)
+        expandidas = np.concatenate([claves, todas_actividades])
+        expandidas = np.concatenate([expandidas, (expandidas & ~_MASCARA_MES) | (TODOS_LOS_MESES << _BITS_SEXO)])
+        pacientes = np.tile(pacientes, 4)
+        unicas, inversa, conteos = np.unique(expandidas, return_inverse=True, return_counts=True)
+        
+        # Celda de cada clave: las existentes conservan su posición, las nuevas van al final
+        posicion, existe = _buscar(claves_base[orden], unicas)
+        celdas = np.empty(len(unicas), dtype=np.int64)
+        celdas[existe] = orden[posicion[existe]]
+        celdas[~existe] = len(claves_base) + np.arange((~existe).sum())
+        
+        self.claves = np.concatenate([claves_base, unicas[~existe]])
+        self.atenciones = np.concatenate([atenciones, np.zeros((~existe).sum(), dtype=np.int64)])
+        self.atenciones[celdas] += conteos
+        
+        # Pacientes distintos: solo los pares (celda, paciente) que no se habían contado
+        conocidos = pacientes >= 0
+        pares = np.unique(
+            (celdas[inversa.ravel()[conocidos]] << 32) | (pacientes[conocidos] + _DESPLAZAMIENTO_ACTIVIDAD)
+        )
+        posicion, contados = _buscar(vistos, pares)
+        nuevos = ~contados
+        self.pacientes = np.concatenate([pacientes_celda, np.zeros((~existe).sum(), dtype=np.int64)])
+        self.pacientes += np.bincount(pares[nuevos] >> 32, minlength=len(self.claves))
+        self.vistos = np.insert(vistos, posicion[nuevos], pares[nuevos])
+    
+    def _ordenar(self):
+        self.orden = np.argsort(self.claves, kind='stable')
+        self.claves_ordenadas = self.claves[self.orden]
+    
+    def _rango(self, desde, hasta):
+        """Posiciones de las celdas con clave en [desde, hasta), en orden de clave"""
+        inicio, fin = np.searchsorted(self.claves_ordenadas, [desde, hasta])
+        return self.claves_ordenadas[inicio:fin], self.orden[inicio:fin]
+    
+    def _celdas(self, id_actividad, por_mes):
+        """Claves y posiciones de las celdas de una actividad (None: todas), por mes o del total"""
+        actividad = _clave_actividad(id_actividad)
+        if actividad is None:
+            return self._rango(0, 0)
+        desde = actividad << (_BITS_MES + _BITS_SEXO)
+        todos_los_meses = desde | (TODOS_LOS_MESES << _BITS_SEXO)
+        if por_mes:
+            return self._rango(desde, todos_los_meses)
+        return self._rango(todos_los_meses, (actividad + 1) << (_BITS_MES + _BITS_SEXO))
+    
+    def _sexo(self, claves):
+        return pd.Categorical.from_codes((claves & (2 ** _BITS_SEXO - 1)) - 1, categories=self.sexos)
+    
+    def por_mes(self, id_actividad=None):
+        """
+        Atenciones y pacientes distintos por mes y sexo
+        
+        Args:
+            id_actividad: Código de la actividad (ID_ACTXPROG); None para
+                todas las actividades
+        
+        Returns:
+            DataFrame con MES (primer día del mes; vacío para las atenciones
+            sin fecha), SEX_PAC, ATENCIONES y PACIENTES, por mes ascendente
+        """
+        claves, posiciones = self._celdas(id_actividad, por_mes=True)
+        meses = (claves & _MASCARA_MES) >> _BITS_SEXO
+        fechas = (meses - 1 + _MES_MINIMO).astype('datetime64[M]').astype('datetime64[ns]')
+        return pd.DataFrame({
+            'MES': np.where(meses == SIN_FECHA, np.datetime64('NaT', 'ns'), fechas),
+            'SEX_PAC': self._sexo(claves),
+            'ATENCIONES': self.atenciones[posiciones],
+            'PACIENTES': self.pacientes[posiciones],
+        })
+    
+    def por_sexo(self, id_actividad=None):
+        """Atenciones y pacientes distintos de todos los meses, por sexo (SEX_PAC, ATENCIONES, PACIENTES)"""
+        claves, posiciones = self._celdas(id_actividad, por_mes=False)
+        return pd.DataFrame({
+            'SEX_PAC': self._sexo(claves),
+            'ATENCIONES': self.atenciones[posiciones],
+            'PACIENTES': self.pacientes[posiciones],
+        })
+    
+    def resumen(self, id_actividad=None):
+        """Total de atenciones y de pacientes distintos de una actividad (None: todas)"""
+        claves, posiciones = self._celdas(id_actividad, por_mes=False)
+        return {
+            'atenciones': int(self.atenciones[posiciones].sum()),
+            'pacientes': int(self.pacientes[posiciones].sum()),
+        }
+    
+    def por_actividad(self):
+        """Totales de cada actividad (ID_ACTPYP, ATENCIONES, PACIENTES), de mayor a menor número de atenciones"""
+        totales = ((self.claves & _MASCARA_MES) >> _BITS_SEXO == TODOS_LOS_MESES) & (
+            self.claves >> (_BITS_MES + _BITS_SEXO) != ACTIVIDAD_TODAS)
+        df = pd.DataFrame({
+            'ID_ACTPYP': (self.claves[totales] >> (_BITS_MES + _BITS_SEXO)) - _DESPLAZAMIENTO_ACTIVIDAD,
+            'ATENCIONES': self.atenciones[totales],
+            'PACIENTES': self.pacientes[totales],
+        })
+        df = df.groupby('ID_ACTPYP', as_index=False, sort=True).sum()
+        return df.sort_values('ATENCIONES', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de descarga de archivos grandes por rangos de bytes
+Divide el archivo en rangos que se descargan en paralelo sobre el transporte
+HTTP compartido, escribe cada rango directamente en su posición de un
+archivo preasignado y registra los rangos terminados para poder reanudar
+una descarga interrumpida
+"""
+
+import os
+import json
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import requests
+
+import config_sharepoint as config
+
+
+# Parámetros de QuickXorHash (hash que publica OneDrive/SharePoint en file.hashes)
+QUICKXOR_WIDTH_BITS = 160
+QUICKXOR_SHIFT = 11
+
+
+def quick_xor_hash(path, block_size=16 * 1024 * 1024):
+    """
+    Calcular el QuickXorHash de un archivo (en base64, como lo devuelve Graph)
+    
+    Cada byte n del archivo se combina con XOR en la posición de bit
+    (n * 11) mod 160 de un valor circular de 160 bits. Como la posición se
+    repite cada 160 bytes, primero se reducen con XOR todos los bytes que
+    caen en la misma columna (n mod 160) de forma vectorizada y luego se
+    rotan las 160 columnas a su posición.
+    """
+    width_bytes = QUICKXOR_WIDTH_BITS // 8
+    block_size -= block_size % QUICKXOR_WIDTH_BITS
+    columnas = np.zeros(QUICKXOR_WIDTH_BITS, dtype=np.uint8)
+    length = 0
+    
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            length += len(block)
+            
+            # Rellenar con ceros (neutros en XOR) hasta un múltiplo de 160
+            data = np.frombuffer(block, dtype=np.uint8)
+            resto = len(data) % QUICKXOR_WIDTH_BITS
+            if resto:
+                data = np.concatenate([data, np.zeros(QUICKXOR_WIDTH_BITS - resto, dtype=np.uint8)])
+            columnas ^= np.bitwise_xor.reduce(data.reshape(-1, QUICKXOR_WIDTH_BITS), axis=0)
+    
+    mascara = (1 << QUICKXOR_WIDTH_BITS) - 1
+    valor = 0
+    for columna, byte in enumerate(columnas.tolist()):
+        if byte:
+            shift = (columna * QUICKXOR_SHIFT) % QUICKXOR_WIDTH_BITS
+            rotado = (byte << shift) | (byte >> (QUICKXOR_WIDTH_BITS - shift))
+            valor ^= rotado & mascara
+    
+    resultado = bytearray(valor.to_bytes(width_bytes, 'little'))
+    for i, byte in enumerate(length.to_bytes(8, 'little')):
+        resultado[width_bytes - 8 + i] ^= byte
+    
+    return base64.b64encode(bytes(resultado)).decode('ascii')
+
+
+class ArchivoDistinto(IOError):
+    """El servidor entrega un archivo de otro tamaño que el esperado (cambió o los metadatos no coinciden)"""
+
+
+class CuerpoIncompleto(IOError):
+    """La respuesta de un rango terminó antes de entregar todos sus bytes"""
+
+
+class DescargaPorRangos:
+    """
+    Descarga paralela y reanudable de un archivo por rangos de bytes
+    
+    El archivo se descarga en destino + '.rangos.part' y el avance se guarda
+    en destino + '.rangos.json' (versión, tamaño y rangos terminados). Si una
+    descarga se interrumpe, la siguiente con la misma versión solo pide los
+    rangos que faltan. El tamaño total de cada respuesta (Content-Range) debe
+    ser el esperado y al terminar se verifica el QuickXorHash si se conoce;
+    si algo no coincide, la descarga se descarta sin reemplazar el destino.
+    """
+    
+    def __init__(self, transporte, url, destino, size, version=None, headers=None,
+                 quick_xor=None, range_size=None, max_workers=None):
+        self.transporte = transporte
+        self.url = url
+        self.destino = destino
+        self.size = size
+        self.version = version
+        self.headers = headers or {}
+        self.quick_xor = quick_xor
+        self.range_size = range_size or config.DESCARGA_RANGOS_TAMANO
+        self.max_workers = max_workers or config.DESCARGA_RANGOS_HILOS
+        
+        self.part_path = destino + '.rangos.part'
+        self.progress_path = destino + '.rangos.json'
+        self._lock = threading.Lock()
+        self._completed = set()
+        self._cancelada = threading.Event()
+    
+    def _ranges(self):
+        """Lista de rangos (índice, inicio, fin inclusive) que cubren el archivo"""
+        return [
+            (indice, inicio, min(inicio + self.range_size, self.size) - 1)
+            for indice, inicio in enumerate(range(0, self.size, self.range_size))
+        ]
+    
+    def _load_progress(self):
+        """Recuperar los rangos terminados de una descarga anterior de la misma versión"""
+        if not os.path.exists(self.progress_path) or not os.path.exists(self.part_path):
+            return False
+        
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        if (progress.get('version') != self.version or progress.get('size') != self.size
+                or progress.get('range_size') != self.range_size
+                or os.path.getsize(self.part_path) != self.size):
+            return False
+        
+        self._completed = set(progress.get('completed', []))
+        return True
+    
+    def _save_progress(self):
+        """Guardar los rangos terminados (se llama con el lock tomado)"""
+        tmp_path = self.progress_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.version,
+                'size': self.size,
+                'range_size': self.range_size,
+                'completed': sorted(self._completed),
+            }, f)
+        os.replace(tmp_path, self.progress_path)
+    
+    def _preallocate(self):
+        """Crear el archivo parcial con el tamaño final"""
+        with open(self.part_path, 'wb') as f:
+            f.truncate(self.size)
+        self._completed = set()
+        with self._lock:
+            self._save_progress()
+    
+    def _download_range(self, indice, inicio, fin):
+        """
+        Descargar un rango y escribirlo en su posición del archivo parcial
+        
+        Los errores de la solicitud (conexión, timeout, estados 429/5xx) ya
+        los reintenta el transporte con config.HTTP_REINTENTOS y se propagan
+        sin repetirlos aquí. Este ciclo solo reintenta, hasta
+        config.DESCARGA_RANGOS_REINTENTOS veces, lo que el transporte no ve:
+        un corte mientras se lee el cuerpo o un cuerpo incompleto. Si otro
+        rango ya falló, el rango se abandona sin marcarlo como terminado.
+        """
+        expected = fin - inicio + 1
+        headers = dict(self.headers)
+        headers['Range'] = f'bytes={inicio}-{fin}'
+        
+        for intento in range(1, config.DESCARGA_RANGOS_REINTENTOS + 1):
+            if self._cancelada.is_set():
+                return
+            response = self.transporte.get(self.url, headers=headers, stream=True,
+                                           timeout=config.DESCARGA_RANGOS_TIMEOUT)
+            if response.status_code != 206:
+                raise IOError(f"el servidor respondió {response.status_code} en lugar de 206")
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit() and int(total) != self.size:
+                raise ArchivoDistinto(f"el archivo remoto tiene {total} bytes y se esperaban {self.size}")
+            
+            try:
+                written = 0
+                with open(self.part_path, 'r+b') as f:
+                    f.seek(inicio)
+                    for chunk in response.iter_content(chunk_size=config.STREAMING_BUFFER_BYTES):
+                        if self._cancelada.is_set():
+                            return
+                        if chunk:
+                            f.write(chunk[:expected - written])
+                            written += len(chunk)
+                
+                if written != expected:
+                    raise CuerpoIncompleto(f"se recibieron {written} de {expected} bytes")
+            
+            except (CuerpoIncompleto, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                print(f"⚠️ Rango {indice} ({inicio}-{fin}) falló (intento {intento}): {e}")
+                if intento == config.DESCARGA_RANGOS_REINTENTOS:
+                    raise
+                continue
+            finally:
+                response.close()
+            
+            with self._lock:
+                self._completed.add(indice)
+                self._save_progress()
+            return
+    
+    def discard(self):
+        """Eliminar el archivo parcial y el registro de avance"""
+        for path in (self.part_path, self.progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def run(self):
+        """
+        Ejecutar (o reanudar) la descarga
+        
+        Returns:
+            True si el destino quedó reemplazado por el archivo completo y
+            verificado. Si la descarga se interrumpe, el avance queda guardado
+            para la próxima vez; si la verificación falla, se descarta.
+        """
+        if self._load_progress():
+            print(f"⏯️ Reanudando descarga: {len(self._completed)} rangos ya descargados")
+        else:
+            self._preallocate()
+        
+        pending = [r for r in self._ranges() if r[0] not in self._completed]
+        self._cancelada.clear()
+        
+        # Las métricas de reintentos de los hilos de rangos se suman a la carga que los lanzó
+        etiqueta = self.transporte.etiqueta_actual()
+        
+        def descargar(rango):
+            try:
+                with self.transporte.continuar(etiqueta):
+                    self._download_range(*rango)
+            except BaseException:
+                # Error permanente: los demás rangos no se piden (la descarga ya falló)
+                self._cancelada.set()
+                raise
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='rango') as executor:
+                futures = [executor.submit(descargar, r) for r in pending]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    self._cancelada.set()
+                    executor.shutdown(cancel_futures=True)
+                    raise
+        except ArchivoDistinto as e:
+            print(f"❌ {e}, se descarta la descarga")
+            self.discard()
+            return False
+        except Exception as e:
+            print(f"❌ Descarga por rangos interrumpida ({len(self._completed)}/{len(self._ranges())} rangos): {e}")
+            return False
+        
+        # Verificar antes de reemplazar el archivo del cache
+        if os.path.getsize(self.part_path) != self.size:
+            print("❌ El tamaño del archivo descargado no coincide, se descarta")
+            self.discard()
+            return False
+        
+        if self.quick_xor and config.VERIFICAR_HASH_DESCARGA:
+            calculado = quick_xor_hash(self.part_path)
+            if calculado != self.quick_xor:
+                print(f"❌ QuickXorHash no coincide ({calculado} != {self.quick_xor}), se descarta")
+                self.discard()
+                return False
+        
+        os.replace(self.part_path, self.destino)
+        os.remove(self.progress_path)
+        return True
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Paginación, ordenamiento y exportación de resultados grandes
+Los resultados se muestran por páginas y las exportaciones CSV se generan
+solo cuando se solicitan, escribiendo por bloques (memoria acotada) en un
+archivo que se reutiliza mientras no cambien la consulta ni la versión de
+los datos
+"""
+
+import os
+import gzip
+import time
+import hashlib
+
+import pandas as pd
+
+import config_sharepoint as config
+from instrumentacion import instrumentacion
+
+
+def ordenar(df, columna, ascendente=True):
+    """
+    Permutación que ordena df por una columna (orden estable, nulos al final)
+    
+    Las columnas categóricas se ordenan por su texto y no por el orden de
+    sus categorías.
+    
+    Returns:
+        Arreglo de posiciones para usar con df.take()
+    """
+    serie = df[columna].reset_index(drop=True)
+    key = (lambda s: s.astype(str)) if isinstance(serie.dtype, pd.CategoricalDtype) else None
+    return serie.sort_values(ascending=ascendente, kind='stable', na_position='last',
+                             key=key).index.to_numpy()
+
+
+def paginar(df, pagina, filas_por_pagina, orden=None):
+    """
+    Filas de una página del resultado
+    
+    Args:
+        df: Resultado completo
+        pagina: Número de página (desde 1)
+        filas_por_pagina: Filas por página
+        orden: Permutación opcional de ordenar(); solo se toman sus filas de la página
+    
+    Returns:
+        (DataFrame de la página, total de páginas)
+    """
+    total_paginas = max(1, -(-len(df) // filas_por_pagina))
+    pagina = min(max(1, pagina), total_paginas)
+    inicio = (pagina - 1) * filas_por_pagina
+    fin = inicio + filas_por_pagina
+    
+    if orden is None:
+        return df.iloc[inicio:fin], total_paginas
+    return df.take(orden[inicio:fin]), total_paginas
+
+
+def clave_exportacion(*partes):
+    """Identificador de una exportación (versión de datos, consulta, orden, formato...)"""
+    return hashlib.sha1('|'.join(map(str, partes)).encode('utf-8')).hexdigest()[:16]
+
+
+def huella_archivo(contenido):
+    """Identificador de un archivo cargado a partir de sus bytes (para la clave de su exportación)"""
+    return hashlib.sha1(contenido).hexdigest()[:16]
+
+
+def _limpiar_exportaciones():
+    """Eliminar exportaciones más antiguas que config.EXPORTACION_HORAS_CONSERVAR"""
+    limite = time.time() - config.EXPORTACION_HORAS_CONSERVAR * 3600
+    for nombre in os.listdir(config.EXPORTACION_DIRECTORIO):
+        path = os.path.join(config.EXPORTACION_DIRECTORIO, nombre)
+        try:
+            if os.path.getmtime(path) < limite:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def exportar_csv(df, clave, nombre_archivo, comprimir=False, orden=None, columnas=None):
+    """
+    Escribir el resultado como CSV (o CSV.gz) por bloques y devolver la ruta
+    
+    Si ya existe la exportación con la misma clave se reutiliza sin volver a
+    generarla. El archivo se escribe en un temporal y se renombra al
+    terminar, así que nunca se entrega un archivo a medio escribir.
+    
+    Args:
+        df: Resultado a exportar
+        clave: clave_exportacion() de la consulta
+        nombre_archivo: Nombre base del archivo (sin extensión)
+        comprimir: Comprimir con gzip
+        orden: Permutación opcional de ordenar()
+        columnas: Diccionario opcional para renombrar columnas en el archivo
+    
+    Returns:
+        Ruta del archivo generado
+    """
+    os.makedirs(config.EXPORTACION_DIRECTORIO, exist_ok=True)
+    extension = '.csv.gz' if comprimir else '.csv'
+    path = os.path.join(config.EXPORTACION_DIRECTORIO, f"{nombre_archivo}_{clave}{extension}")
+    if os.path.exists(path):
+        # Reutilizada: renovar la fecha para que la limpieza no la elimine mientras se usa
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+    
+    _limpiar_exportaciones()
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    abrir = gzip.open if comprimir else open
+    filas_bloque = config.EXPORTACION_FILAS_BLOQUE
+    
+    try:
+        with instrumentacion.fase('exportacion', 'csv.gz' if comprimir else 'csv') as medida:
+            with abrir(tmp_path, 'wt', encoding='utf-8', newline='') as f:
+                for inicio in range(0, max(len(df), 1), filas_bloque):
+                    if orden is None:
+                        bloque = df.iloc[inicio:inicio + filas_bloque]
+                    else:
+                        bloque = df.take(orden[inicio:inicio + filas_bloque])
+                    if columnas:
+                        bloque = bloque.rename(columns=columnas)
+                    bloque.to_csv(f, index=False, header=inicio == 0)
+            medida['bytes'] = os.path.getsize(tmp_path)
+            medida['filas'] = len(df)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return path
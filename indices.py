@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tablas e índices precalculados para las búsquedas de atenciones
+Se construyen una sola vez por versión de los datos, al momento de la carga
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Columnas de la tabla de atenciones que se conservan del histórico
+COLUMNAS_HISTORICO = ['ID_PACIENTE', 'ID_ACTPYP', 'IDCAB_FAC', 'FECHA']
+
+# Datos del paciente que se adjuntan a cada atención en el índice de actividades
+COLUMNAS_PACIENTE = ['IDE_PAC', 'COD_TID', 'NOMBRE_COMPLETO', 'SEX_PAC']
+
+# Columnas de atención del resultado de la búsqueda masiva por documentos
+COLUMNAS_ATENCION = ['ID_ACTPYP', 'DES_ACTXPROG', 'FECHA_ATENCION', 'IDCAB_FAC']
+
+
+def _a_numpy(serie):
+    """Valores de la serie como arreglo numpy (los enteros nullable sin nulos quedan como enteros)"""
+    return serie.to_numpy(dtype=getattr(serie.dtype, 'numpy_dtype', None))
+
+
+def _tomar(df, posiciones):
+    """
+    Filas de df en las posiciones indicadas; las posiciones -1 quedan vacías
+    
+    Los enteros numpy se pasan al tipo nullable para no convertirlos a float
+    """
+    posiciones = np.asarray(posiciones, dtype=np.int64)
+    validas = posiciones >= 0
+    if len(df) == 0:
+        return pd.DataFrame({col: pd.Series(pd.NA, index=range(len(posiciones)), dtype=object) for col in df.columns})
+    
+    resultado = df.take(np.where(validas, posiciones, 0)).reset_index(drop=True)
+    if validas.all():
+        return resultado
+    
+    for columna in resultado.columns:
+        serie = resultado[columna]
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'iu':
+            serie = serie.astype(serie.dtype.name.capitalize())
+        resultado[columna] = serie.where(validas)
+    return resultado
+
+
+def _rangos(inicios, fines):
+    """Concatenación vectorizada de los rangos [inicio, fin) (sin bucles en Python)"""
+    longitudes = fines - inicios
+    desplazamiento = np.repeat(inicios - np.cumsum(longitudes) + longitudes, longitudes)
+    return desplazamiento + np.arange(longitudes.sum())
+
+
+def _hash_documentos(documentos):
+    """Hash de 64 bits de cada documento (texto), igual en todos los procesos"""
+    return pd.util.hash_array(np.asarray(documentos, dtype=object))
+
+
+def _solo_lectura(*arreglos):
+    """Marcar arreglos numpy como de solo lectura (escribir en ellos lanza ValueError)"""
+    for arreglo in arreglos:
+        arreglo.flags.writeable = False
+
+
+def construir_atenciones(df_historico, df_cab_fac, df_actividades):
+    """
+    Construye la tabla materializada de atenciones
+    
+    Contiene solo las atenciones de actividades del catálogo, ya unidas con la
+    fecha de la factura (FAC_FEC) y la descripción de la actividad, con la
+    FECHA_ATENCION calculada y ordenada por fecha descendente.
+    
+    Args:
+        df_historico: DataFrame de HISTORICO_PYP
+        df_cab_fac: DataFrame de CAB_FAC (IDCAB_FAC, FAC_FEC)
+        df_actividades: Catálogo de actividades filtradas
+    
+    Returns:
+        DataFrame con ID_PACIENTE, ID_ACTPYP, IDCAB_FAC, FECHA, FAC_FEC,
+        DES_ACTXPROG y FECHA_ATENCION
+    """
+    catalogo = df_actividades[['ID_ACTXPROG', 'DES_ACTXPROG']].drop_duplicates('ID_ACTXPROG')
+    
+    # Filtrar SOLO las atenciones con actividades mapeadas
+    atenciones = df_historico.loc[
+        df_historico['ID_ACTPYP'].isin(catalogo['ID_ACTXPROG']),
+        COLUMNAS_HISTORICO
+    ]
+    
+    # Obtener fechas de las facturas
+    atenciones = atenciones.merge(
+        df_cab_fac[['IDCAB_FAC', 'FAC_FEC']],
+        on='IDCAB_FAC',
+        how='left'
+    )
+    
+    # Agregar descripción de actividades
+    atenciones = atenciones.merge(
+        catalogo,
+        left_on='ID_ACTPYP',
+        right_on='ID_ACTXPROG',
+        how='inner'
+    ).drop(columns='ID_ACTXPROG')
+    
+    # Usar FAC_FEC como fecha principal, si no existe usar FECHA del histórico
+    atenciones['FECHA_ATENCION'] = atenciones['FAC_FEC'].fillna(atenciones['FECHA'])
+    
+    # Ordenar una sola vez por fecha descendente: los filtros conservan el orden
+    atenciones = atenciones.sort_values('FECHA_ATENCION', ascending=False, kind='stable')
+    return atenciones.reset_index(drop=True)
+
+
+class IndicePacientes:
+    """
+    Índice de pacientes por documento y de sus atenciones por ID_PACIENTE
+    
+    - Los documentos (IDE_PAC, primera aparición) ordenados por su hash de 64
+      bits junto con su posición en DAT_PER: cada documento se busca con
+      np.searchsorted y se confirma comparando el texto. Son arreglos numpy,
+      así que se publican y se abren con memory-map sin reconstruir nada
+    - Las atenciones ordenadas por ID_PACIENTE (como permutación de la tabla de
+      atenciones) con la posición de inicio y fin de cada paciente, de modo que
+      cada consulta solo toca las filas de ese paciente
+    
+    Las tablas se guardan privadas y se entregan como vistas sin copia
+    (pacientes, atenciones): con Copy-on-Write, escribir en ellas no
+    modifica el índice compartido.
+    """
+    
+    def __init__(self, df_pacientes, df_atenciones):
+        self._pacientes = df_pacientes
+        self._atenciones = df_atenciones
+        
+        # Primera aparición de cada documento (equivalente a resultado.iloc[0])
+        documentos = df_pacientes['IDE_PAC'].astype(str)
+        primeros = np.flatnonzero(~documentos.duplicated().to_numpy())
+        hashes = _hash_documentos(documentos.to_numpy()[primeros])
+        orden_documentos = np.argsort(hashes, kind='stable')
+        self.documentos_hash = hashes[orden_documentos]
+        self.documentos_posicion = primeros[orden_documentos]
+        
+        # Orden estable por paciente: dentro de cada paciente se conserva el
+        # orden por fecha descendente de la tabla de atenciones
+        ids = df_atenciones['ID_PACIENTE']
+        validos = np.flatnonzero(ids.notna().to_numpy())
+        ids_validos = _a_numpy(ids.iloc[validos])
+        orden = np.argsort(ids_validos, kind='stable')
+        self.orden = validos[orden]
+        
+        # Inicio y fin de cada paciente dentro de self.orden
+        self.ids_paciente, self.inicios = np.unique(ids_validos[orden], return_index=True)
+        self.fines = np.append(self.inicios[1:], len(self.orden))
+    
+    @classmethod
+    def desde_partes(cls, tablas, arreglos):
+        """Reconstruir el índice a partir de partes() sin volver a ordenar"""
+        indice = cls.__new__(cls)
+        indice._pacientes = tablas['pacientes']
+        indice._atenciones = tablas['atenciones']
+        indice.orden = arreglos['orden']
+        indice.ids_paciente = arreglos['ids_paciente']
+        indice.inicios = arreglos['inicios']
+        indice.fines = arreglos['fines']
+        indice.documentos_hash = arreglos['documentos_hash']
+        indice.documentos_posicion = arreglos['documentos_posicion']
+        return indice
+    
+    @property
+    def pacientes(self):
+        """Tabla de DAT_PER (vista sin copia: modificarla no afecta el índice)"""
+        return self._pacientes.copy(deep=False)
+    
+    @property
+    def atenciones(self):
+        """Tabla de atenciones ordenada por fecha descendente (vista sin copia)"""
+        return self._atenciones.copy(deep=False)
+    
+    def partes(self):
+        """Tablas y arreglos que definen el índice (para publicarlo en el almacén compartido)"""
+        tablas = {'pacientes': self._pacientes, 'atenciones': self._atenciones}
+        arreglos = {
+            'orden': self.orden,
+            'ids_paciente': self.ids_paciente,
+            'inicios': self.inicios,
+            'fines': self.fines,
+            'documentos_hash': self.documentos_hash,
+            'documentos_posicion': self.documentos_posicion,
+        }
+        return tablas, arreglos
+    
+    def congelar(self):
+        """Impedir modificaciones al índice una vez publicado (compartido entre sesiones)"""
+        _solo_lectura(self.orden, self.ids_paciente, self.inicios, self.fines,
+                      self.documentos_hash, self.documentos_posicion)
+        return self
+    
+    def _posiciones(self, documentos):
+        """
+        Posición en DAT_PER de cada documento (texto), o -1 si no existe
+        
+        Un searchsorted vectorizado sobre los hashes ordenados da el candidato
+        de cada documento y el texto de DAT_PER lo confirma. Si dos documentos
+        comparten hash (improbable con 64 bits), se revisan los siguientes
+        con el mismo hash.
+        """
+        documentos = np.asarray(documentos, dtype=object)
+        posiciones = np.full(len(documentos), -1, dtype=np.int64)
+        total = len(self.documentos_hash)
+        if total == 0 or len(documentos) == 0:
+            return posiciones
+        
+        hashes = _hash_documentos(documentos)
+        i = np.minimum(np.searchsorted(self.documentos_hash, hashes), total - 1)
+        con_hash = np.flatnonzero(self.documentos_hash[i] == hashes)
+        candidatas = self.documentos_posicion[i[con_hash]]
+        textos = self._pacientes['IDE_PAC'].take(candidatas).astype(str).to_numpy()
+        iguales = textos == documentos[con_hash]
+        posiciones[con_hash[iguales]] = candidatas[iguales]
+        
+        for j in con_hash[~iguales]:
+            k = i[j] + 1
+            while k < total and self.documentos_hash[k] == hashes[j]:
+                candidata = self.documentos_posicion[k]
+                if self._pacientes['IDE_PAC'].iloc[[candidata]].astype(str).iat[0] == documentos[j]:
+                    posiciones[j] = candidata
+                    break
+                k += 1
+        return posiciones
+    
+    def id_paciente(self, documento):
+        """ID_PACIENTE asociado a un documento (None si no existe)"""
+        posicion = self._posiciones([str(documento)])[0]
+        if posicion < 0:
+            return None
+        return self._pacientes['ID_PACIENTE'].iat[posicion]
+    
+    def buscar_documento(self, documento):
+        """Fila de DAT_PER del paciente con ese documento (None si no existe)"""
+        posicion = self._posiciones([str(documento)])[0]
+        if posicion < 0:
+            return None
+        return self._pacientes.iloc[posicion]
+    
+    def atenciones_paciente(self, id_paciente):
+        """Atenciones de un paciente, ordenadas por fecha descendente (búsqueda O(log n))"""
+        i = np.searchsorted(self.ids_paciente, id_paciente)
+        if i >= len(self.ids_paciente) or self.ids_paciente[i] != id_paciente:
+            return self._atenciones.iloc[0:0]
+        return self._atenciones.take(self.orden[self.inicios[i]:self.fines[i]])
+    
+    def buscar_documentos(self, documentos):
+        """
+        Resolver muchos documentos en una sola pasada (búsqueda masiva)
+        
+        Los documentos se resuelven contra el índice de DAT_PER y todas las
+        atenciones se obtienen de una vez: un searchsorted vectorizado sobre
+        los IDs de paciente y la concatenación de sus rangos en el orden por
+        paciente, sin recorrer la tabla de atenciones por cada documento.
+        
+        Args:
+            documentos: Secuencia de documentos (IDE_PAC) a buscar
+        
+        Returns:
+            DataFrame con una fila por atención (o una sola fila si el
+            documento no existe o no tiene atenciones), en el orden de la
+            lista: DOCUMENTO_BUSCADO, ESTADO, ID_PACIENTE, datos del paciente
+            y ID_ACTPYP, DES_ACTXPROG, FECHA_ATENCION, IDCAB_FAC
+        """
+        documentos = pd.Series(list(documentos), dtype=object).astype(str).str.strip()
+        posiciones = self._posiciones(documentos.to_numpy())
+        encontrados = posiciones >= 0
+        
+        # Rango de atenciones de cada paciente encontrado (vacío si no tiene)
+        inicios = np.zeros(len(documentos), dtype=np.int64)
+        fines = np.zeros(len(documentos), dtype=np.int64)
+        ids = self._pacientes['ID_PACIENTE'].take(posiciones[encontrados])
+        con_id = np.flatnonzero(encontrados)[ids.notna().to_numpy()]
+        if len(con_id) and len(self.ids_paciente):
+            ids_validos = _a_numpy(ids.dropna())
+            i = np.searchsorted(self.ids_paciente, ids_validos)
+            i_seguro = np.minimum(i, len(self.ids_paciente) - 1)
+            existe = self.ids_paciente[i_seguro] == ids_validos
+            inicios[con_id[existe]] = self.inicios[i_seguro[existe]]
+            fines[con_id[existe]] = self.fines[i_seguro[existe]]
+        
+        # Cada documento ocupa una fila por atención, o una fila vacía si no tiene
+        cantidades = fines - inicios
+        filas_por_documento = np.maximum(cantidades, 1)
+        entrada = np.repeat(np.arange(len(documentos)), filas_por_documento)
+        
+        atencion = np.full(len(entrada), -1, dtype=np.int64)
+        con_atenciones = np.repeat(cantidades > 0, filas_por_documento)
+        atencion[con_atenciones] = self.orden[_rangos(inicios, fines)]
+        
+        resultado = pd.concat([
+            pd.DataFrame({
+                'DOCUMENTO_BUSCADO': documentos.to_numpy()[entrada],
+                'ESTADO': np.where(
+                    encontrados[entrada],
+                    np.where(con_atenciones, 'Encontrado', 'Sin atenciones'),
+                    'No encontrado'
+                ),
+            }),
+            _tomar(self._pacientes[['ID_PACIENTE'] + COLUMNAS_PACIENTE], posiciones[entrada]),
+            _tomar(self._atenciones[COLUMNAS_ATENCION], atencion),
+        ], axis=1)
+        return resultado
+
+
+class IndiceActividades:
+    """
+    Índice invertido de actividades del catálogo a sus atenciones
+    
+    Las atenciones se materializan una sola vez con los datos del paciente ya
+    unidos, ordenadas por actividad y, dentro de cada actividad, por
+    FECHA_ATENCION descendente. Cada actividad queda como un rango contiguo
+    [inicio, fin) que se devuelve ya ordenado. La tabla se entrega como
+    vista sin copia (tabla).
+    """
+    
+    def __init__(self, df_atenciones, df_pacientes):
+        # Agregar datos del paciente (merge left conserva el orden por fecha)
+        tabla = df_atenciones[['ID_ACTPYP', 'ID_PACIENTE', 'FECHA_ATENCION', 'IDCAB_FAC']].merge(
+            df_pacientes[['ID_PACIENTE'] + COLUMNAS_PACIENTE],
+            on='ID_PACIENTE',
+            how='left'
+        )
+        
+        # Orden estable por actividad: conserva el orden por fecha de cada una
+        tabla = tabla.sort_values('ID_ACTPYP', kind='stable').reset_index(drop=True)
+        self._tabla = tabla[COLUMNAS_PACIENTE + ['FECHA_ATENCION', 'IDCAB_FAC']]
+        
+        actividades = _a_numpy(tabla['ID_ACTPYP'])
+        self.ids_actividad, self.inicios = np.unique(actividades, return_index=True)
+        self.fines = np.append(self.inicios[1:], len(tabla))
+    
+    @classmethod
+    def desde_partes(cls, tablas, arreglos):
+        """Reconstruir el índice a partir de partes() sin volver a unir ni ordenar"""
+        indice = cls.__new__(cls)
+        indice._tabla = tablas['tabla']
+        indice.ids_actividad = arreglos['ids_actividad']
+        indice.inicios = arreglos['inicios']
+        indice.fines = arreglos['fines']
+        return indice
+    
+    @property
+    def tabla(self):
+        """Atenciones con los datos del paciente, por actividad (vista sin copia)"""
+        return self._tabla.copy(deep=False)
+    
+    def partes(self):
+        """Tablas y arreglos que definen el índice (para publicarlo en el almacén compartido)"""
+        tablas = {'tabla': self._tabla}
+        arreglos = {
+            'ids_actividad': self.ids_actividad,
+            'inicios': self.inicios,
+            'fines': self.fines,
+        }
+        return tablas, arreglos
+    
+    def congelar(self):
+        """Impedir modificaciones al índice una vez publicado (compartido entre sesiones)"""
+        _solo_lectura(self.ids_actividad, self.inicios, self.fines)
+        return self
+    
+    def pacientes_actividad(self, id_actividad, fecha_desde=None, fecha_hasta=None, top_n=None):
+        """
+        Atenciones de una actividad con los datos del paciente, por fecha descendente
+        
+        Args:
+            id_actividad: Código de la actividad (ID_ACTXPROG)
+            fecha_desde: Fecha mínima de atención (inclusive), opcional
+            fecha_hasta: Fecha máxima de atención (inclusive), opcional
+            top_n: Número máximo de atenciones más recientes a devolver, opcional
+        
+        Returns:
+            DataFrame con IDE_PAC, COD_TID, NOMBRE_COMPLETO, SEX_PAC,
+            FECHA_ATENCION e IDCAB_FAC
+        """
+        i = np.searchsorted(self.ids_actividad, id_actividad)
+        if i >= len(self.ids_actividad) or self.ids_actividad[i] != id_actividad:
+            return self._tabla.iloc[0:0]
+        
+        resultado = self._tabla.iloc[self.inicios[i]:self.fines[i]]
+        
+        if fecha_desde is not None or fecha_hasta is not None:
+            fechas = resultado['FECHA_ATENCION']
+            mascara = pd.Series(True, index=resultado.index)
+            if fecha_desde is not None:
+                mascara &= fechas >= fecha_desde
+            if fecha_hasta is not None:
+                mascara &= fechas <= fecha_hasta
+            resultado = resultado[mascara]
+        
+        if top_n is not None:
+            resultado = resultado.head(top_n)
+        
+        return resultado
+
+
+# Alfabeto de las claves de búsqueda por nombre (el espacio también marca los bordes)
+ALFABETO_NOMBRES = ' ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+_TAMANO_ALFABETO = len(ALFABETO_NOMBRES)
+_CODIGO_CARACTER = np.zeros(128, dtype=np.int64)
+for _i, _c in enumerate(ALFABETO_NOMBRES):
+    _CODIGO_CARACTER[ord(_c)] = _i
+TOTAL_TRIGRAMAS = _TAMANO_ALFABETO ** 3
+
+
+def clave_nombre(serie):
+    """
+    Clave normalizada para buscar nombres: mayúsculas sin tildes, solo letras,
+    dígitos y espacios simples
+    """
+    return (
+        serie.astype(object).fillna('').astype(str)
+        .str.normalize('NFKD')
+        .str.replace('[\u0300-\u036f]', '', regex=True)  # marcas diacríticas
+        .str.upper()
+        .str.replace(r'[^A-Z0-9]+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def _trigramas(claves, relleno_final=True, bloque=100_000):
+    """
+    Pares únicos (posición de la clave, trigrama) de cada clave, vectorizado
+    
+    Cada clave se rellena con dos espacios al inicio (para que los prefijos
+    tengan trigramas propios) y, si relleno_final, uno al final. Los
+    trigramas se codifican como enteros en [0, TOTAL_TRIGRAMAS) sobre
+    ALFABETO_NOMBRES.
+    
+    Returns:
+        (posiciones, trigramas): arreglos del mismo largo, sin pares repetidos
+    """
+    posiciones = []
+    trigramas = []
+    claves = list(claves)
+    final = ' ' if relleno_final else ''
+    for inicio in range(0, len(claves), bloque):
+        parte = ['  ' + clave + final for clave in claves[inicio:inicio + bloque]]
+        largo = max(len(texto) for texto in parte)
+        # Matriz de códigos de carácter (relleno con ceros = espacio)
+        matriz = np.array(parte, dtype=f'U{largo}').view(np.uint32).reshape(len(parte), largo)
+        codigos = _CODIGO_CARACTER[np.minimum(matriz, 127)]
+        codigos_tri = (codigos[:, :-2] * _TAMANO_ALFABETO + codigos[:, 1:-1]) * _TAMANO_ALFABETO + codigos[:, 2:]
+        
+        largos = np.fromiter((len(texto) for texto in parte), dtype=np.int64, count=len(parte))
+        validos = np.arange(largo - 2)[None, :] < (largos - 2)[:, None]
+        validos &= codigos_tri != 0  # trigrama de solo espacios (clave vacía)
+        
+        # Quitar trigramas repetidos dentro de cada clave: ordenar por fila y
+        # conservar solo el primero de cada grupo de valores iguales
+        codigos_tri = np.where(validos, codigos_tri, -1)
+        codigos_tri.sort(axis=1)
+        unicos = codigos_tri >= 0
+        unicos[:, 1:] &= codigos_tri[:, 1:] != codigos_tri[:, :-1]
+        
+        fila, _ = np.nonzero(unicos)
+        posiciones.append(fila + inicio)
+        trigramas.append(codigos_tri[unicos])
+    
+    if not posiciones:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(posiciones), np.concatenate(trigramas)
+
+
+class IndiceNombres:
+    """
+    Índice de trigramas sobre NOMBRE_COMPLETO para búsqueda aproximada y por prefijo
+    
+    - Los nombres se reducen a claves únicas normalizadas (clave_nombre)
+    - Listas invertidas trigrama -> claves en formato CSR: como el alfabeto
+      es pequeño, el trigrama es directamente la posición en inicios/fines
+    - Cada consulta cuenta los trigramas compartidos de todas las claves con
+      un np.bincount sobre las listas de sus trigramas y ordena por similitud
+      de Jaccard; las claves que empiezan por el texto buscado van primero
+    """
+    
+    def __init__(self, df_pacientes):
+        self._pacientes = df_pacientes
+        
+        # Normalizar solo los nombres únicos y agruparlos por clave
+        codigos_nombre, nombres = pd.factorize(df_pacientes['NOMBRE_COMPLETO'], use_na_sentinel=False)
+        codigos_clave, claves = pd.factorize(clave_nombre(pd.Series(nombres)))
+        codigos = codigos_clave[codigos_nombre]
+        self.claves = pd.Series(claves, name='CLAVE', dtype=object)
+        
+        # Pacientes de cada clave (rango contiguo de una permutación)
+        self.orden_pacientes = np.argsort(codigos, kind='stable')
+        codigos_ordenados = codigos[self.orden_pacientes]
+        self.pacientes_inicios = np.searchsorted(codigos_ordenados, np.arange(len(claves)), side='left')
+        self.pacientes_fines = np.searchsorted(codigos_ordenados, np.arange(len(claves)), side='right')
+        
+        # Listas invertidas por trigrama
+        posiciones, trigramas = _trigramas(self.claves)
+        # Los trigramas caben en 16 bits: el orden estable usa radix sort
+        orden = np.argsort(trigramas.astype(np.uint16), kind='stable')
+        self.listas = posiciones[orden].astype(np.int32)
+        limites = np.searchsorted(trigramas[orden], np.arange(TOTAL_TRIGRAMAS + 1))
+        self.inicios = limites[:-1]
+        self.fines = limites[1:]
+        self.trigramas_por_clave = np.bincount(posiciones, minlength=len(claves)).astype(np.int32)
+    
+    @classmethod
+    def desde_partes(cls, tablas, arreglos, pacientes):
+        """Reconstruir el índice a partir de partes() sin volver a calcular trigramas"""
+        indice = cls.__new__(cls)
+        indice._pacientes = pacientes
+        indice.claves = tablas['claves']['CLAVE']
+        for nombre, arreglo in arreglos.items():
+            setattr(indice, nombre, arreglo)
+        return indice
+    
+    @property
+    def pacientes(self):
+        """Tabla de DAT_PER (vista sin copia: modificarla no afecta el índice)"""
+        return self._pacientes.copy(deep=False)
+    
+    def partes(self):
+        """Tablas y arreglos que definen el índice (los pacientes se publican con IndicePacientes)"""
+        tablas = {'claves': self.claves.to_frame()}
+        arreglos = {
+            nombre: getattr(self, nombre)
+            for nombre in ('orden_pacientes', 'pacientes_inicios', 'pacientes_fines',
+                           'listas', 'inicios', 'fines', 'trigramas_por_clave')
+        }
+        return tablas, arreglos
+    
+    def congelar(self):
+        """Impedir modificaciones al índice una vez publicado (compartido entre sesiones)"""
+        _solo_lectura(self.orden_pacientes, self.pacientes_inicios, self.pacientes_fines,
+                      self.listas, self.inicios, self.fines, self.trigramas_por_clave)
+        return self
+    
+    def buscar(self, texto, top_k=20):
+        """
+        Pacientes cuyo nombre se parece al texto, de más a menos similar
+        
+        Args:
+            texto: Nombre completo o parcial (sin importar tildes ni mayúsculas)
+            top_k: Número máximo de pacientes a devolver
+        
+        Returns:
+            DataFrame con los datos del paciente y SIMILITUD (0 a 1); primero
+            los nombres que empiezan por el texto buscado
+        """
+        clave = clave_nombre(pd.Series([texto])).iat[0]
+        if not clave or not len(self.claves):
+            return self._pacientes.iloc[0:0].assign(SIMILITUD=pd.Series(dtype=float))
+        
+        # Trigramas de la consulta sin el relleno final: un nombre que empieza
+        # por el texto contiene todos los trigramas de la consulta
+        _, trigramas = _trigramas([clave], relleno_final=False)
+        
+        candidatos = self.listas[_rangos(self.inicios[trigramas], self.fines[trigramas])]
+        compartidos = np.bincount(candidatos, minlength=len(self.claves))
+        similitud = compartidos / (len(trigramas) + self.trigramas_por_clave - compartidos)
+        
+        # Prefijos: tienen todos los trigramas de la consulta y empiezan por el texto
+        completos = np.flatnonzero(compartidos == len(trigramas))
+        if len(completos):
+            prefijo = self.claves.take(completos).str.startswith(clave).to_numpy(dtype=bool)
+            puntaje = similitud.copy()
+            puntaje[completos[prefijo]] += 1
+        else:
+            puntaje = similitud
+        
+        # Mejores claves (cada clave puede corresponder a varios pacientes)
+        k = min(top_k, int((compartidos > 0).sum()))
+        if k == 0:
+            return self._pacientes.iloc[0:0].assign(SIMILITUD=pd.Series(dtype=float))
+        mejores = np.argpartition(-puntaje, k - 1)[:k]
+        mejores = mejores[np.argsort(-puntaje[mejores], kind='stable')]
+        
+        filas = self.orden_pacientes[_rangos(self.pacientes_inicios[mejores], self.pacientes_fines[mejores])][:top_k]
+        cantidades = (self.pacientes_fines - self.pacientes_inicios)[mejores]
+        puntajes = np.repeat(similitud[mejores], cantidades)[:top_k]
+        return self._pacientes.take(filas).assign(SIMILITUD=np.round(puntajes, 3))
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentación de las fases de carga y consulta
+Cada fase (autenticación, transferencia desde Graph, parseo, normalización,
+construcción de índices, consultas y exportaciones) registra su duración, los
+bytes y filas que procesó y si falló. Los registros se escriben como líneas
+JSON, se agregan en histogramas que se publican como archivo de texto de
+Prometheus (textfile collector) y los más recientes quedan en memoria para
+calcular percentiles de latencia en el panel de administración
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+import pandas as pd
+
+import config_sharepoint as config
+
+
+COLUMNAS_PERCENTILES = ['fase', 'etiqueta', 'n', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'errores']
+
+
+def _escapar_etiqueta(valor):
+    """Escapar un valor de etiqueta para el formato de texto de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(fase, etiqueta, pid):
+    return f'fase="{_escapar_etiqueta(fase)}",etiqueta="{_escapar_etiqueta(etiqueta or "")}",pid="{pid}"'
+
+
+def memoria_proceso():
+    """
+    Memoria residente actual del proceso en bytes (None si no se puede medir)
+    
+    Las páginas de las versiones abiertas con memory-map cuentan en la
+    memoria residente de cada proceso que las usa, aunque estén compartidas.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def memoria_datos(conjunto):
+    """
+    Memoria de cada tabla y arreglo de una versión de los datos
+    
+    Args:
+        conjunto: ConjuntoDatos
+    
+    Returns:
+        DataFrame indexado por dataset con columnas filas y bytes
+    """
+    partes = {'actividades': (conjunto.actividades, None)}
+    for prefijo, indice in (('pacientes', conjunto.indice_pacientes),
+                            ('actividades', conjunto.indice_actividades),
+                            ('nombres', conjunto.indice_nombres),
+                            ('cubo', conjunto.cubo_actividades)):
+        tablas, arreglos = indice.partes()
+        partes.update({f'{prefijo}.{nombre}': (df, None) for nombre, df in tablas.items()})
+        partes.update({f'{prefijo}.{nombre}': (None, arreglo) for nombre, arreglo in arreglos.items()})
+    
+    filas = []
+    for nombre, (df, arreglo) in partes.items():
+        if df is not None:
+            filas.append((nombre, len(df), int(df.memory_usage(deep=True, index=False).sum())))
+        else:
+            filas.append((nombre, len(arreglo), int(arreglo.nbytes)))
+    return pd.DataFrame(filas, columns=['dataset', 'filas', 'bytes']).set_index('dataset')
+
+
+class Instrumentacion:
+    """
+    Registro de fases con duración, bytes y filas
+    
+    Uso:
+        with instrumentacion.fase('descarga', file_name) as medida:
+            ...
+            medida['bytes'] = total_bytes
+    
+    La etiqueta identifica el archivo o la variante de la fase y se usa como
+    label de Prometheus, así que no debe tener muchos valores distintos (por
+    ejemplo, nunca un documento de paciente).
+    """
+    
+    def __init__(self):
+        self.recientes = deque(maxlen=config.INSTRUMENTACION_REGISTROS_RECIENTES)
+        self.histogramas = {}
+        self.datos = None
+        self.version_datos = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._logger = None
+        self._prometheus_escrito = 0.0
+        self._prometheus_path = None
+    
+    def _log(self):
+        """Logger de líneas JSON (se crea en el primer registro)"""
+        if self._logger is None:
+            os.makedirs(config.INSTRUMENTACION_DIRECTORIO, exist_ok=True)
+            logger = logging.getLogger('sitis.instrumentacion')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            path = os.path.abspath(os.path.join(config.INSTRUMENTACION_DIRECTORIO, config.INSTRUMENTACION_LOG_JSON))
+            # Otros handlers del logger (por ejemplo, de captura de logs) no reemplazan al archivo
+            if not any(getattr(handler, 'baseFilename', None) == path for handler in logger.handlers):
+                handler = RotatingFileHandler(
+                    path,
+                    maxBytes=config.INSTRUMENTACION_LOG_MAX_BYTES,
+                    backupCount=config.INSTRUMENTACION_LOG_ARCHIVOS,
+                    encoding='utf-8',
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+    
+    @contextmanager
+    def fase(self, nombre, etiqueta=None):
+        """
+        Medir una fase
+        
+        Entrega un diccionario donde la fase puede anotar 'bytes', 'filas' y
+        'error' (si falló sin lanzar una excepción). Si la fase lanza una
+        excepción, se registra como error y la excepción continúa.
+        """
+        medida = {'bytes': None, 'filas': None, 'error': None}
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+        padre = pila[-1] if pila else None
+        pila.append(nombre)
+        
+        inicio_reloj = time.time()
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        except BaseException as e:
+            medida['error'] = medida['error'] or type(e).__name__
+            raise
+        finally:
+            pila.pop()
+            if config.INSTRUMENTACION:
+                self.registrar(nombre, time.perf_counter() - inicio, etiqueta=etiqueta, padre=padre,
+                               inicio=inicio_reloj, **medida)
+    
+    def registrar(self, nombre, segundos, etiqueta=None, bytes=None, filas=None, error=None,
+                  padre=None, inicio=None):
+        """Registrar una fase ya medida"""
+        registro = {
+            'ts': datetime.fromtimestamp(inicio or time.time() - segundos).isoformat(timespec='milliseconds'),
+            'fase': nombre,
+            'etiqueta': etiqueta,
+            'segundos': round(segundos, 6),
+            'bytes': None if bytes is None else int(bytes),
+            'filas': None if filas is None else int(filas),
+            'error': error,
+            'padre': padre,
+            'pid': os.getpid(),
+            'hilo': threading.current_thread().name,
+        }
+        
+        with self._lock:
+            self.recientes.append(registro)
+            histograma = self.histogramas.get((nombre, etiqueta))
+            if histograma is None:
+                histograma = self.histogramas[(nombre, etiqueta)] = {
+                    'buckets': [0] * len(config.INSTRUMENTACION_BUCKETS_SEGUNDOS),
+                    'n': 0, 'suma': 0.0, 'bytes': 0, 'filas': 0, 'errores': 0,
+                }
+            for i, limite in enumerate(config.INSTRUMENTACION_BUCKETS_SEGUNDOS):
+                if segundos <= limite:
+                    histograma['buckets'][i] += 1
+            histograma['n'] += 1
+            histograma['suma'] += segundos
+            histograma['bytes'] += registro['bytes'] or 0
+            histograma['filas'] += registro['filas'] or 0
+            histograma['errores'] += bool(error)
+        
+        try:
+            self._log().info(json.dumps(registro, ensure_ascii=False))
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el log de instrumentación: {e}")
+        
+        # El archivo de Prometheus se reescribe como máximo cada cierto intervalo
+        if time.time() - self._prometheus_escrito >= config.INSTRUMENTACION_PROMETHEUS_INTERVALO_SEGUNDOS:
+            self.escribir_prometheus()
+    
+    def registrar_datos(self, conjunto):
+        """Medir la memoria de la versión de datos vigente (una vez por versión)"""
+        if conjunto.version == self.version_datos:
+            return
+        with self.fase('memoria_datos'):
+            self.datos = memoria_datos(conjunto)
+        self.version_datos = conjunto.version
+        self.escribir_prometheus()
+    
+    def percentiles(self, ventana_segundos=None):
+        """
+        Percentiles de latencia de los registros recientes en memoria
+        
+        Args:
+            ventana_segundos: Solo registros de los últimos segundos indicados
+        
+        Returns:
+            DataFrame con n, p50, p90, p99 y máximo en milisegundos y errores
+            por fase y etiqueta
+        """
+        with self._lock:
+            registros = list(self.recientes)
+        if ventana_segundos is not None:
+            desde = datetime.fromtimestamp(time.time() - ventana_segundos).isoformat(timespec='milliseconds')
+            registros = [r for r in registros if r['ts'] >= desde]
+        if not registros:
+            return pd.DataFrame(columns=COLUMNAS_PERCENTILES)
+        
+        df = pd.DataFrame(registros)
+        df['etiqueta'] = df['etiqueta'].fillna('')
+        filas = []
+        for (fase, etiqueta), grupo in df.groupby(['fase', 'etiqueta'], sort=True):
+            milisegundos = grupo['segundos'].to_numpy() * 1000
+            p50, p90, p99 = np.percentile(milisegundos, [50, 90, 99])
+            filas.append((fase, etiqueta, len(grupo), p50, p90, p99, milisegundos.max(),
+                          int(grupo['error'].notna().sum())))
+        return pd.DataFrame(filas, columns=COLUMNAS_PERCENTILES)
+    
+    def texto_prometheus(self):
+        """Métricas acumuladas en el formato de texto de Prometheus"""
+        with self._lock:
+            histogramas = {clave: dict(valor, buckets=list(valor['buckets']))
+                           for clave, valor in self.histogramas.items()}
+        pid = os.getpid()
+        lineas = [
+            '# HELP sitis_fase_segundos Duración de las fases de carga y consulta',
+            '# TYPE sitis_fase_segundos histogram',
+        ]
+        for (fase, etiqueta), h in sorted(histogramas.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+            labels = _labels(fase, etiqueta, pid)
+            for limite, n in zip(config.INSTRUMENTACION_BUCKETS_SEGUNDOS, h['buckets']):
+                lineas.append(f'sitis_fase_segundos_bucket{{{labels},le="{limite}"}} {n}')
+            lineas.append(f'sitis_fase_segundos_bucket{{{labels},le="+Inf"}} {h["n"]}')
+            lineas.append(f'sitis_fase_segundos_sum{{{labels}}} {h["suma"]:.6f}')
+            lineas.append(f'sitis_fase_segundos_count{{{labels}}} {h["n"]}')
+        
+        for metrica, campo, ayuda in (
+            ('sitis_fase_bytes_total', 'bytes', 'Bytes transferidos o leídos por las fases'),
+            ('sitis_fase_filas_total', 'filas', 'Filas procesadas o devueltas por las fases'),
+            ('sitis_fase_errores_total', 'errores', 'Fases que terminaron con error'),
+        ):
+            lineas.append(f'# HELP {metrica} {ayuda}')
+            lineas.append(f'# TYPE {metrica} counter')
+            for (fase, etiqueta), h in sorted(histogramas.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                labels = _labels(fase, etiqueta, pid)
+                lineas.append(f'{metrica}{{{labels}}} {h[campo]}')
+        
+        rss = memoria_proceso()
+        if rss is not None:
+            lineas.append('# HELP sitis_memoria_proceso_bytes Memoria residente del proceso')
+            lineas.append('# TYPE sitis_memoria_proceso_bytes gauge')
+            lineas.append(f'sitis_memoria_proceso_bytes{{pid="{pid}"}} {rss}')
+        
+        if self.datos is not None:
+            lineas.append('# HELP sitis_datos_bytes Memoria de cada tabla de la versión de datos vigente')
+            lineas.append('# TYPE sitis_datos_bytes gauge')
+            for dataset, fila in self.datos.iterrows():
+                lineas.append(f'sitis_datos_bytes{{dataset="{_escapar_etiqueta(dataset)}",'
+                              f'version="{_escapar_etiqueta(self.version_datos)}",pid="{pid}"}} {fila["bytes"]}')
+        return '\n'.join(lineas) + '\n'
+    
+    def escribir_prometheus(self):
+        """
+        Escribir el archivo de métricas de este proceso (reemplazo atómico)
+        
+        Cada proceso escribe su propio archivo (el pid va en el nombre) para
+        que varias réplicas no se sobrescriban; el archivo se elimina al
+        terminar el proceso.
+        """
+        if not config.INSTRUMENTACION:
+            return
+        self._prometheus_escrito = time.time()
+        try:
+            os.makedirs(config.INSTRUMENTACION_DIRECTORIO, exist_ok=True)
+            path = os.path.join(config.INSTRUMENTACION_DIRECTORIO,
+                                config.INSTRUMENTACION_PROMETHEUS.format(pid=os.getpid()))
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.texto_prometheus())
+            os.replace(tmp_path, path)
+            if self._prometheus_path is None:
+                self._prometheus_path = path
+                atexit.register(self._eliminar_prometheus)
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir el archivo de métricas: {e}")
+    
+    def _eliminar_prometheus(self):
+        if self._prometheus_path and os.path.exists(self._prometheus_path):
+            os.remove(self._prometheus_path)
+
+
+# Instancia global compartida por todos los módulos del proceso
+instrumentacion = Instrumentacion()
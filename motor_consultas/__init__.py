@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de consultas de SITIS, sin interfaz
+Mantiene la versión vigente de los datos y sus índices en memoria y ofrece
+las búsquedas por documento, nombre y actividad y los indicadores por
+actividad, mes y sexo. Lo usan la app de
+Streamlit (app.py), la línea de comandos (python -m motor_consultas) y la
+API HTTP en JSON (servidor.py), de modo que todos los llamadores de un
+proceso comparten la misma versión de los datos
+
+Uso:
+    from motor_consultas import obtener_motor
+    
+    motor = obtener_motor()
+    paciente, atenciones = motor.paciente('1105381788')
+"""
+
+from motor_consultas.consultas import (
+    buscar_paciente_por_documento,
+    buscar_atenciones_paciente,
+    leer_documentos,
+    buscar_pacientes_por_documentos,
+    buscar_pacientes_por_nombre,
+    buscar_pacientes_por_actividad,
+    buscar_indicadores_actividad,
+)
+from motor_consultas.motor import MotorConsultas, obtener_motor
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Línea de comandos del motor de consultas
+Para procesos nocturnos y otros sistemas: los resultados se escriben en CSV
+o en líneas JSON (un objeto por fila) en un archivo o en la salida
+estándar; los mensajes de carga van a la salida de errores
+
+Uso:
+    python -m motor_consultas documentos 1105381788 52123456
+    python -m motor_consultas documentos --archivo lista.csv --salida atenciones.csv
+    python -m motor_consultas nombre "MARIA PEREZ" --top-k 20
+    python -m motor_consultas actividad 123 --desde 2024-01-01 --formato jsonl
+    python -m motor_consultas actividades
+    python -m motor_consultas indicadores --actividad 123
+    python -m motor_consultas servir --host 127.0.0.1 --puerto 8765
+"""
+
+import sys
+import argparse
+
+import pandas as pd
+
+import config_sharepoint as config
+from conjunto_datos import activar_copy_on_write
+from motor_consultas.consultas import leer_documentos
+from motor_consultas.motor import MotorConsultas
+from motor_consultas.servidor import servir
+
+
+def escribir(df, salida, formato):
+    """Escribir un resultado completo en CSV o en líneas JSON"""
+    if formato == 'jsonl':
+        if not df.empty:
+            df.to_json(salida, orient='records', lines=True, date_format='iso', force_ascii=False)
+    else:
+        df.to_csv(salida, index=False, chunksize=config.EXPORTACION_FILAS_BLOQUE)
+
+
+def main():
+    activar_copy_on_write()
+    parser = argparse.ArgumentParser(description='Consultas de atenciones SITIS sin interfaz')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    
+    def con_salida(subparser):
+        subparser.add_argument('--salida', help='Archivo de salida (por defecto la salida estándar)')
+        subparser.add_argument('--formato', choices=['csv', 'jsonl'], default='csv')
+        return subparser
+    
+    documentos = con_salida(subparsers.add_parser(
+        'documentos', help='Atenciones de uno o más documentos (búsqueda masiva)'))
+    documentos.add_argument('documentos', nargs='*', help='Documentos (IDE_PAC)')
+    documentos.add_argument('--archivo', help='CSV con los documentos (columna IDE_PAC o la primera)')
+    
+    nombre = con_salida(subparsers.add_parser('nombre', help='Pacientes con un nombre parecido'))
+    nombre.add_argument('texto')
+    nombre.add_argument('--top-k', type=int, default=20)
+    
+    actividad = con_salida(subparsers.add_parser('actividad', help='Pacientes que recibieron una actividad'))
+    actividad.add_argument('id_actividad', type=int)
+    actividad.add_argument('--desde', type=pd.Timestamp, help='Fecha mínima de atención (AAAA-MM-DD)')
+    actividad.add_argument('--hasta', type=pd.Timestamp, help='Fecha máxima de atención (AAAA-MM-DD)')
+    actividad.add_argument('--top-n', type=int, help='Solo las N atenciones más recientes')
+    
+    con_salida(subparsers.add_parser('actividades', help='Catálogo de actividades'))
+    
+    indicadores = con_salida(subparsers.add_parser(
+        'indicadores', help='Atenciones y pacientes por mes y sexo (cubo precalculado)'))
+    indicadores.add_argument('--actividad', type=int, help='Código de la actividad (por defecto todas)')
+    
+    servidor = subparsers.add_parser('servir', help='Atender la API HTTP en JSON')
+    servidor.add_argument('--host', default=config.MOTOR_API_HOST)
+    servidor.add_argument('--puerto', type=int, default=config.MOTOR_API_PUERTO)
+    
+    args = parser.parse_args()
+    
+    motor = MotorConsultas()
+    if args.comando == 'servir':
+        try:
+            servir(motor, host=args.host, puerto=args.puerto)
+        except ValueError as e:
+            parser.exit(2, f"❌ {e}\n")
+        return
+    
+    # Los mensajes de carga no deben mezclarse con el resultado en la salida estándar
+    salida_estandar = sys.stdout
+    sys.stdout = sys.stderr
+    
+    if args.comando == 'documentos':
+        lista = list(args.documentos)
+        if args.archivo:
+            lista += leer_documentos(args.archivo)
+        if not lista:
+            parser.exit(2, "❌ Indique documentos o --archivo\n")
+    
+    datos = motor.iniciar().datos()
+    if args.comando == 'documentos':
+        resultado = motor.documentos(lista, datos=datos)
+    elif args.comando == 'nombre':
+        resultado = motor.nombre(args.texto, top_k=args.top_k, datos=datos)
+    elif args.comando == 'actividad':
+        resultado = motor.actividad(
+            args.id_actividad, fecha_desde=args.desde, fecha_hasta=args.hasta, top_n=args.top_n, datos=datos
+        )
+    elif args.comando == 'indicadores':
+        resultado = motor.indicadores(args.actividad, datos=datos)[2]
+    else:
+        resultado = motor.actividades(datos=datos)
+    motor.detener()
+    
+    escribir(resultado, args.salida or salida_estandar, args.formato)
+    print(f"✅ {len(resultado)} filas (versión de datos {datos.version})")
+
+
+if __name__ == '__main__':
+    main()
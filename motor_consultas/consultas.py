@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Búsquedas sobre los índices de una versión de los datos
+Cada función recibe el índice de la versión que la consulta tomó y registra
+su duración y filas en la instrumentación (fase 'consulta')
+"""
+
+import pandas as pd
+
+from instrumentacion import instrumentacion
+
+
+# Columnas del historial de atenciones de un paciente
+COLUMNAS_ATENCIONES = ['ID_ACTPYP', 'DES_ACTXPROG', 'FECHA_ATENCION', 'IDCAB_FAC']
+
+
+def buscar_paciente_por_documento(documento, indice_pacientes):
+    """Busca un paciente por su documento de identidad"""
+    with instrumentacion.fase('consulta', 'documento') as medida:
+        paciente = indice_pacientes.buscar_documento(documento)
+        medida['filas'] = 0 if paciente is None else 1
+    return paciente
+
+
+def buscar_atenciones_paciente(id_paciente, indice_pacientes):
+    """Busca todas las atenciones de un paciente"""
+    # El índice devuelve solo las filas del paciente, ya ordenadas por fecha
+    with instrumentacion.fase('consulta', 'atenciones_paciente') as medida:
+        atenciones = indice_pacientes.atenciones_paciente(id_paciente)
+        medida['filas'] = len(atenciones)
+    
+    if atenciones.empty:
+        return pd.DataFrame()
+    
+    # Sin .copy(): con Copy-on-Write el resultado no puede modificar los datos compartidos
+    return atenciones[COLUMNAS_ATENCIONES]
+
+
+def leer_documentos(archivo):
+    """Lee la lista de documentos de un CSV (columna IDE_PAC o la primera)"""
+    df = pd.read_csv(archivo, dtype=str, sep=None, engine='python')
+    columna = 'IDE_PAC' if 'IDE_PAC' in df.columns else df.columns[0]
+    documentos = df[columna].dropna().str.strip()
+    return documentos[documentos != ''].tolist()
+
+
+def buscar_pacientes_por_documentos(documentos, indice_pacientes):
+    """Busca muchos pacientes a la vez y devuelve todas sus atenciones en una sola tabla"""
+    with instrumentacion.fase('consulta', 'documentos') as medida:
+        resultado = indice_pacientes.buscar_documentos(documentos)
+        medida['filas'] = len(resultado)
+    return resultado
+
+
+def buscar_pacientes_por_nombre(nombre, indice_nombres, top_k=20):
+    """Busca pacientes por nombre completo o parcial, tolerando errores de escritura"""
+    with instrumentacion.fase('consulta', 'nombre') as medida:
+        resultado = indice_nombres.buscar(nombre, top_k=top_k)
+        medida['filas'] = len(resultado)
+    return resultado
+
+
+def buscar_pacientes_por_actividad(id_actividad, indice_actividades, fecha_desde=None, fecha_hasta=None, top_n=None):
+    """Busca todos los pacientes que han recibido una actividad específica"""
+    # El índice solo contiene actividades del catálogo válido, con los datos
+    # del paciente ya unidos y ordenadas por fecha descendente
+    with instrumentacion.fase('consulta', 'actividad') as medida:
+        atenciones = indice_actividades.pacientes_actividad(
+            id_actividad,
+            fecha_desde=fecha_desde,
+            fecha_hasta=fecha_hasta,
+            top_n=top_n
+        )
+        medida['filas'] = len(atenciones)
+    
+    if atenciones.empty:
+        return pd.DataFrame()
+    
+    return atenciones
+
+
+def buscar_indicadores_actividad(id_actividad, cubo_actividades):
+    """
+    Atenciones y pacientes distintos por mes y sexo de una actividad (None:
+    todas), leídos del cubo precalculado sin recorrer el histórico
+    """
+    with instrumentacion.fase('consulta', 'indicadores') as medida:
+        por_mes = cubo_actividades.por_mes(id_actividad)
+        medida['filas'] = len(por_mes)
+    return por_mes
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de consultas: versión vigente de los datos y búsquedas sobre ella
+Un solo motor por proceso, creado con obtener_motor(), atiende a todos los
+llamadores (sesiones de la app, solicitudes de la API, la línea de
+comandos); la actualización en segundo plano reemplaza la versión sin
+interrumpir las consultas en curso
+"""
+
+import threading
+
+import pandas as pd
+
+import config_sharepoint as config
+from sharepoint_loader import sharepoint_loader
+from refresco import RefrescoDatos
+from motor_consultas.consultas import (
+    buscar_paciente_por_documento,
+    buscar_atenciones_paciente,
+    buscar_pacientes_por_documentos,
+    buscar_pacientes_por_nombre,
+    buscar_pacientes_por_actividad,
+    buscar_indicadores_actividad,
+)
+
+
+class MotorConsultas:
+    """
+    Datos vigentes e índices de consulta de un proceso
+    
+    Cada consulta debe tomar la versión una sola vez con datos() y pasarla a
+    los métodos (argumento datos): así una respuesta que combina varias
+    búsquedas nunca mezcla dos versiones. Sin ese argumento, cada método
+    toma la versión vigente por su cuenta.
+    """
+    
+    def __init__(self, loader=None, intervalo_segundos=None, refresco=None):
+        if refresco is None:
+            refresco = RefrescoDatos(
+                loader or sharepoint_loader,
+                intervalo_segundos or config.REFRESCO_INTERVALO_SEGUNDOS
+            )
+        self.refresco = refresco
+    
+    def iniciar(self):
+        """Iniciar la carga y la actualización en segundo plano"""
+        self.refresco.iniciar()
+        return self
+    
+    def detener(self):
+        """Detener la actualización en segundo plano"""
+        self.refresco.detener()
+    
+    def datos(self, timeout=None):
+        """
+        Versión vigente de los datos (ConjuntoDatos)
+        
+        Raises:
+            TimeoutError: Si la primera carga no terminó dentro del timeout
+            RuntimeError: Si la primera carga falló
+        """
+        return self.refresco.actual(timeout)
+    
+    def estado(self):
+        """Resumen de la versión vigente para monitoreo (no espera a la primera carga)"""
+        try:
+            datos = self.datos(timeout=0)
+        except (TimeoutError, RuntimeError) as e:
+            return {'listo': False, 'detalle': str(e)}
+        return {
+            'listo': True,
+            'version': datos.version,
+            'cargado_en': datos.cargado_en.isoformat(timespec='seconds'),
+            'antiguedad_segundos': int(datos.antiguedad().total_seconds()),
+            'ultimo_error': None if self.refresco.ultimo_error is None else str(self.refresco.ultimo_error),
+        }
+    
+    def paciente(self, documento, datos=None):
+        """
+        Datos de un paciente y su historial de atenciones
+        
+        Returns:
+            (fila del paciente o None si no existe, DataFrame de atenciones)
+        """
+        datos = datos or self.datos()
+        paciente = buscar_paciente_por_documento(documento, datos.indice_pacientes)
+        if paciente is None:
+            return None, pd.DataFrame()
+        return paciente, buscar_atenciones_paciente(paciente['ID_PACIENTE'], datos.indice_pacientes)
+    
+    def documentos(self, documentos, datos=None):
+        """Atenciones de muchos documentos en una sola tabla (ver IndicePacientes.buscar_documentos)"""
+        datos = datos or self.datos()
+        return buscar_pacientes_por_documentos(documentos, datos.indice_pacientes)
+    
+    def nombre(self, texto, top_k=20, datos=None):
+        """Pacientes con el nombre más parecido al texto"""
+        datos = datos or self.datos()
+        return buscar_pacientes_por_nombre(texto, datos.indice_nombres, top_k=top_k)
+    
+    def actividad(self, id_actividad, fecha_desde=None, fecha_hasta=None, top_n=None, datos=None):
+        """Atenciones de una actividad con los datos del paciente, por fecha descendente"""
+        datos = datos or self.datos()
+        return buscar_pacientes_por_actividad(
+            id_actividad, datos.indice_actividades,
+            fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, top_n=top_n
+        )
+    
+    def indicadores(self, id_actividad=None, datos=None):
+        """
+        Indicadores de una actividad (None: todas) desde el cubo precalculado
+        
+        Returns:
+            (totales {'atenciones', 'pacientes'}, DataFrame por sexo,
+            DataFrame por mes y sexo)
+        """
+        datos = datos or self.datos()
+        cubo = datos.cubo_actividades
+        return (
+            cubo.resumen(id_actividad),
+            cubo.por_sexo(id_actividad),
+            buscar_indicadores_actividad(id_actividad, cubo),
+        )
+    
+    def actividades(self, datos=None):
+        """Catálogo de actividades consultables"""
+        datos = datos or self.datos()
+        return datos.actividades
+
+
+_motor = None
+_bloqueo_motor = threading.Lock()
+
+
+def obtener_motor():
+    """Motor compartido del proceso (se crea e inicia la primera vez que se pide)"""
+    global _motor
+    with _bloqueo_motor:
+        if _motor is None:
+            _motor = MotorConsultas().iniciar()
+        return _motor
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API HTTP en JSON sobre el motor de consultas
+Servidor multihilo de la librería estándar (ThreadingHTTPServer): cada
+solicitud se atiende en su propio hilo sobre la misma versión de los datos
+en memoria, que el motor actualiza en segundo plano. Las conexiones son
+persistentes (HTTP/1.1) para que los clientes con muchas consultas no
+abran una conexión por cada una
+
+Rutas (todas responden JSON):
+    GET  /salud                               Estado y versión de los datos
+    GET  /pacientes/<documento>               Paciente y su historial de atenciones
+    GET  /pacientes?nombre=<texto>&top_k=20   Búsqueda aproximada por nombre
+    POST /pacientes/busqueda                  Búsqueda masiva: {"documentos": [...]}
+    GET  /actividades                         Catálogo de actividades
+    GET  /actividades/<id>/pacientes          Pacientes de una actividad; admite
+                                              desde, hasta (AAAA-MM-DD), top_n,
+                                              pagina y filas
+    GET  /actividades/<id>/indicadores        Atenciones y pacientes por mes y sexo
+    GET  /indicadores                         Lo mismo para todas las actividades
+"""
+
+import hmac
+import json
+import ipaddress
+import traceback
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import pandas as pd
+
+import config_sharepoint as config
+from exportacion import paginar
+from instrumentacion import instrumentacion
+
+
+class ErrorSolicitud(Exception):
+    """Error que se responde al cliente con su código HTTP"""
+    
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _json_tabla(df):
+    """Filas de un DataFrame como arreglo JSON (fechas ISO, nulos como null)"""
+    if df.empty:
+        return '[]'
+    return df.to_json(orient='records', date_format='iso', force_ascii=False)
+
+
+def _json_fila(fila):
+    return fila.to_json(date_format='iso', force_ascii=False)
+
+
+def _objeto(version, **campos):
+    """
+    Cuerpo de respuesta: objeto JSON con la versión de los datos
+    
+    Los campos ya serializados (tablas de pandas) se pasan como texto dentro
+    de una tupla de un elemento para insertarlos sin volver a codificarlos.
+    """
+    partes = [f'"version": {json.dumps(version)}']
+    for nombre, valor in campos.items():
+        texto = valor[0] if isinstance(valor, tuple) else json.dumps(valor, ensure_ascii=False)
+        partes.append(f'{json.dumps(nombre)}: {texto}')
+    return '{' + ', '.join(partes) + '}'
+
+
+def _entero(parametros, nombre, defecto=None, minimo=None, maximo=None):
+    valor = parametros.get(nombre, [None])[0]
+    if valor in (None, ''):
+        return defecto
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ErrorSolicitud(400, f"El parámetro {nombre} debe ser un número entero")
+    if minimo is not None and valor < minimo:
+        raise ErrorSolicitud(400, f"El parámetro {nombre} debe ser al menos {minimo}")
+    if maximo is not None and valor > maximo:
+        raise ErrorSolicitud(400, f"El parámetro {nombre} no puede ser mayor que {maximo}")
+    return valor
+
+
+def _fecha(parametros, nombre):
+    valor = parametros.get(nombre, [None])[0]
+    if valor in (None, ''):
+        return None
+    try:
+        # Formato exacto: una fecha con zona horaria u hora no se compara con FECHA_ATENCION
+        return pd.to_datetime(valor, format='%Y-%m-%d')
+    except ValueError:
+        raise ErrorSolicitud(400, f"El parámetro {nombre} debe ser una fecha AAAA-MM-DD")
+
+
+class ManejadorConsultas(BaseHTTPRequestHandler):
+    """Atiende una conexión; self.server es el ServidorConsultas"""
+    
+    protocol_version = 'HTTP/1.1'
+    server_version = 'SITIS-Consultas'
+    # Encabezados y cuerpo se escriben por separado: sin TCP_NODELAY, Nagle y
+    # el ACK retardado del cliente agregan ~40 ms a cada respuesta
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        self._atender('GET')
+    
+    def do_POST(self):
+        self._atender('POST')
+    
+    def log_message(self, format, *args):
+        # Cada solicitud ya queda en la instrumentación (fase 'api'); el log
+        # por línea de BaseHTTPRequestHandler solo agregaría ruido
+        pass
+    
+    def _atender(self, metodo):
+        url = urlsplit(self.path)
+        segmentos = [unquote(s) for s in url.path.strip('/').split('/') if s]
+        parametros = parse_qs(url.query)
+        
+        try:
+            if not segmentos or segmentos[0] != 'salud':
+                self._autorizar()
+            ruta, manejar = self._ruta(metodo, segmentos)
+            with instrumentacion.fase('api', ruta) as medida:
+                estado, cuerpo = manejar(segmentos, parametros)
+                cuerpo = cuerpo.encode('utf-8')
+                medida['bytes'] = len(cuerpo)
+        except ErrorSolicitud as e:
+            estado, cuerpo = e.estado, self._error(str(e))
+        except (TimeoutError, RuntimeError) as e:
+            # Los datos todavía se están cargando o la primera carga falló
+            estado, cuerpo = 503, self._error(str(e))
+        except Exception as e:
+            traceback.print_exc()
+            estado, cuerpo = 500, self._error(f"Error interno: {type(e).__name__}")
+        
+        # Un POST rechazado puede dejar el cuerpo sin leer en la conexión
+        if metodo == 'POST' and estado >= 400:
+            self.close_connection = True
+        
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.send_header('Cache-Control', 'no-store')
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(cuerpo)
+    
+    @staticmethod
+    def _error(mensaje):
+        return json.dumps({'error': mensaje}, ensure_ascii=False).encode('utf-8')
+    
+    def _autorizar(self):
+        clave = self.server.clave
+        # Bytes: compare_digest no acepta textos con caracteres no ASCII
+        if clave and not hmac.compare_digest(self.headers.get('X-API-Key', '').encode('utf-8'),
+                                             clave.encode('utf-8')):
+            raise ErrorSolicitud(401, "Falta la clave de la API o es incorrecta (header X-API-Key)")
+    
+    def _ruta(self, metodo, segmentos):
+        """(nombre de la ruta para la instrumentación, función que la atiende)"""
+        patron = tuple(segmentos[:1]) + tuple(
+            '*' if i % 2 else s for i, s in enumerate(segmentos[1:], start=1)
+        )
+        rutas = {
+            ('GET', ('salud',)): ('salud', self._salud),
+            ('GET', ('pacientes',)): ('nombre', self._nombre),
+            ('GET', ('pacientes', '*')): ('documento', self._paciente),
+            ('POST', ('pacientes', '*')): ('documentos', self._busqueda_masiva),
+            ('GET', ('actividades',)): ('actividades', self._actividades),
+            ('GET', ('actividades', '*', 'pacientes')): ('actividad', self._actividad),
+            ('GET', ('actividades', '*', 'indicadores')): ('indicadores', self._indicadores),
+            ('GET', ('indicadores',)): ('indicadores', self._indicadores),
+        }
+        encontrada = rutas.get((metodo, patron))
+        if encontrada is None or (encontrada[0] == 'documentos' and segmentos[1] != 'busqueda'):
+            raise ErrorSolicitud(404, f"Ruta no encontrada: {metodo} /{'/'.join(segmentos)}")
+        return encontrada
+    
+    def _datos(self):
+        return self.server.motor.datos(timeout=config.MOTOR_API_ESPERA_DATOS_SEGUNDOS)
+    
+    def _salud(self, segmentos, parametros):
+        estado = self.server.motor.estado()
+        return (200 if estado['listo'] else 503), json.dumps(estado, ensure_ascii=False)
+    
+    def _paciente(self, segmentos, parametros):
+        datos = self._datos()
+        paciente, atenciones = self.server.motor.paciente(segmentos[1], datos=datos)
+        if paciente is None:
+            raise ErrorSolicitud(404, "No se encontró ningún paciente con ese documento")
+        return 200, _objeto(
+            datos.version,
+            paciente=(_json_fila(paciente),),
+            total=len(atenciones),
+            atenciones=(_json_tabla(atenciones),)
+        )
+    
+    def _nombre(self, segmentos, parametros):
+        nombre = parametros.get('nombre', [''])[0].strip()
+        if not nombre:
+            raise ErrorSolicitud(400, "Indique el parámetro nombre")
+        top_k = _entero(parametros, 'top_k', defecto=20, minimo=1, maximo=config.MOTOR_API_FILAS_MAX)
+        datos = self._datos()
+        candidatos = self.server.motor.nombre(nombre, top_k=top_k, datos=datos)
+        return 200, _objeto(datos.version, total=len(candidatos), resultados=(_json_tabla(candidatos),))
+    
+    def _busqueda_masiva(self, segmentos, parametros):
+        longitud = self.headers.get('Content-Length')
+        if longitud is None:
+            raise ErrorSolicitud(411, "Indique el largo del cuerpo (header Content-Length)")
+        # int() acepta signos y espacios: un largo negativo haría que read() espere al cierre
+        if not longitud.strip().isdecimal():
+            raise ErrorSolicitud(400, "El header Content-Length debe ser un número entero no negativo")
+        longitud = int(longitud)
+        if longitud > config.MOTOR_API_CUERPO_MAX_BYTES:
+            raise ErrorSolicitud(413, f"El cuerpo supera {config.MOTOR_API_CUERPO_MAX_BYTES} bytes")
+        try:
+            documentos = json.loads(self.rfile.read(longitud) or b'{}').get('documentos')
+        except (ValueError, AttributeError):
+            raise ErrorSolicitud(400, 'El cuerpo debe ser un objeto JSON {"documentos": [...]}')
+        if not isinstance(documentos, list) or not documentos:
+            raise ErrorSolicitud(400, 'El cuerpo debe incluir "documentos" con al menos un documento')
+        if len(documentos) > config.MOTOR_API_DOCUMENTOS_MAX:
+            raise ErrorSolicitud(413, f"Se admiten hasta {config.MOTOR_API_DOCUMENTOS_MAX} documentos por solicitud")
+        
+        datos = self._datos()
+        resultado = self.server.motor.documentos(documentos, datos=datos)
+        return 200, _objeto(datos.version, total=len(resultado), resultados=(_json_tabla(resultado),))
+    
+    def _actividades(self, segmentos, parametros):
+        datos = self._datos()
+        actividades = self.server.motor.actividades(datos=datos)
+        return 200, _objeto(datos.version, total=len(actividades), resultados=(_json_tabla(actividades),))
+    
+    @staticmethod
+    def _id_actividad(segmentos):
+        try:
+            return int(segmentos[1])
+        except ValueError:
+            raise ErrorSolicitud(400, "El código de la actividad debe ser un número entero")
+    
+    def _actividad(self, segmentos, parametros):
+        id_actividad = self._id_actividad(segmentos)
+        fecha_desde = _fecha(parametros, 'desde')
+        fecha_hasta = _fecha(parametros, 'hasta')
+        top_n = _entero(parametros, 'top_n', minimo=1)
+        pagina = _entero(parametros, 'pagina', defecto=1, minimo=1)
+        filas = _entero(parametros, 'filas', defecto=config.FILAS_POR_PAGINA, minimo=1,
+                        maximo=config.MOTOR_API_FILAS_MAX)
+        
+        datos = self._datos()
+        resultado = self.server.motor.actividad(
+            id_actividad, fecha_desde=fecha_desde, fecha_hasta=fecha_hasta, top_n=top_n, datos=datos
+        )
+        pagina_df, total_paginas = paginar(resultado, pagina, filas)
+        return 200, _objeto(
+            datos.version,
+            total=len(resultado),
+            pagina=min(pagina, total_paginas),
+            paginas=total_paginas,
+            resultados=(_json_tabla(pagina_df),)
+        )
+    
+    def _indicadores(self, segmentos, parametros):
+        id_actividad = self._id_actividad(segmentos) if len(segmentos) > 1 else None
+        datos = self._datos()
+        totales, por_sexo, por_mes = self.server.motor.indicadores(id_actividad, datos=datos)
+        return 200, _objeto(
+            datos.version,
+            actividad=id_actividad,
+            totales=totales,
+            por_sexo=(_json_tabla(por_sexo),),
+            por_mes=(_json_tabla(por_mes),)
+        )
+
+
+class ServidorConsultas(ThreadingHTTPServer):
+    """Servidor HTTP multihilo que comparte un motor de consultas"""
+    
+    daemon_threads = True
+    
+    def __init__(self, direccion, motor, clave=''):
+        super().__init__(direccion, ManejadorConsultas)
+        self.motor = motor
+        self.clave = clave
+
+
+def _es_local(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def servir(motor, host=None, puerto=None, clave=None):
+    """
+    Atender la API hasta que se interrumpa el proceso
+    
+    Args:
+        motor: MotorConsultas (se inicia si no lo estaba)
+        host, puerto: Dirección de escucha (por defecto la de config)
+        clave: Clave requerida en el header X-API-Key (por defecto la de config)
+    """
+    host = host or config.MOTOR_API_HOST
+    puerto = config.MOTOR_API_PUERTO if puerto is None else puerto
+    clave = config.MOTOR_API_CLAVE if clave is None else clave
+    if not clave and not _es_local(host):
+        raise ValueError(
+            f"La API expone datos de pacientes: para escuchar en {host} defina SITIS_API_CLAVE"
+        )
+    
+    motor.iniciar()
+    servidor = ServidorConsultas((host, puerto), motor, clave=clave)
+    print(f"🌐 API de consultas escuchando en http://{host}:{servidor.server_address[1]}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        motor.detener()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalización de textos con caracteres mal codificados en español
+Motor vectorizado: trabaja sobre los valores únicos de cada columna, aplica
+todos los reemplazos en una sola pasada con una expresión regular compilada
+y memoriza los resultados entre columnas
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+
+# Reemplazos literales de patrones específicos más comunes
+# El patrón más común es "ï¿½" que representa caracteres con tilde
+REEMPLAZOS_LITERALES = [
+    ('ATENCIï¿½N', 'ATENCION'),
+    ('APLICACIï¿½N', 'APLICACION'),
+    ('FLï¿½OR', 'FLUOR'),
+    ('Aï¿½OS', 'AÑOS'),
+    ('Aï¿½O', 'AÑO'),
+    ('NIï¿½OS', 'NIÑOS'),
+    ('NIï¿½O', 'NIÑO'),
+    ('ODONTOLOGï¿½A', 'ODONTOLOGIA'),
+    ('Mï¿½DICO', 'MEDICO'),
+    ('ENFERMERï¿½A', 'ENFERMERIA'),
+    ('BIOLï¿½GICO', 'BIOLOGICO'),
+    ('QUï¿½MICO', 'QUIMICO'),
+    ('Fï¿½SICO', 'FISICO'),
+    ('CLï¿½NICO', 'CLINICO'),
+    ('Bï¿½SICO', 'BASICO'),
+    ('EVALUACIï¿½N', 'EVALUACION'),
+    ('VACUNACIï¿½N', 'VACUNACION'),
+    ('NUTRICIï¿½N', 'NUTRICION'),
+    ('PREVENCIï¿½N', 'PREVENCION'),
+    ('PROMOCIï¿½N', 'PROMOCION'),
+    ('GESTACIï¿½N', 'GESTACION'),
+    ('ORIENTACIï¿½N', 'ORIENTACION'),
+]
+
+# Reemplazos del caracter problemático individual (se aplican si no hubo patrón)
+REEMPLAZOS_CARACTER = [
+    ('ï¿½', 'O'),
+    ('\ufffd', 'n'),
+]
+
+# Máximo de valores memorizados antes de vaciar la memoria
+MAX_MEMO = 1_000_000
+
+
+def _compilar_reemplazos():
+    """
+    Construye una única expresión regular con todos los reemplazos
+    
+    Cada patrón literal solo cambia el caracter mal codificado, así que se
+    expresa como "ï¿½" con su contexto en lookbehind/lookahead. De esta forma
+    el contexto no se consume y, como en los reemplazos secuenciales, una
+    misma letra puede servir de contexto a dos patrones vecinos. Ante varios
+    patrones posibles gana el primero de la lista, igual que antes.
+    """
+    marcador = 'ï¿½'
+    alternativas = []
+    sustituciones = []
+    for mal, bien in REEMPLAZOS_LITERALES:
+        inicio = mal.index(marcador)
+        prefijo, sufijo = mal[:inicio], mal[inicio + len(marcador):]
+        # bien = prefijo + letra corregida + sufijo
+        sustitucion = bien[len(prefijo):len(bien) - len(sufijo)]
+        alternativa = f'(?<={re.escape(prefijo)})({re.escape(marcador)})(?={re.escape(sufijo)})'
+        if alternativa not in alternativas:
+            alternativas.append(alternativa)
+            sustituciones.append(sustitucion)
+    
+    for mal, bien in REEMPLAZOS_CARACTER:
+        alternativas.append(f'({re.escape(mal)})')
+        sustituciones.append(bien)
+    
+    # lastindex identifica la alternativa que coincidió (grupo 1..n)
+    return re.compile('|'.join(alternativas)), [None] + sustituciones
+
+
+_PATRON, _SUSTITUCIONES = _compilar_reemplazos()
+_MEMO = {}
+
+
+def _sustituir(match):
+    return _SUSTITUCIONES[match.lastindex]
+
+
+def normalizar_texto(texto):
+    """Corrige caracteres mal codificados en español"""
+    if pd.isna(texto) or texto == '':
+        return texto
+    
+    texto = str(texto)
+    
+    resultado = _MEMO.get(texto)
+    if resultado is None:
+        if len(_MEMO) >= MAX_MEMO:
+            _MEMO.clear()
+        resultado = _PATRON.sub(_sustituir, texto)
+        _MEMO[texto] = resultado
+    return resultado
+
+
+def normalizar_serie(serie):
+    """
+    Normaliza una columna completa de textos
+    
+    Solo se procesan los valores únicos de la columna (los nombres se repiten
+    mucho) y el resultado se reconstruye con los códigos de factorización.
+    Devuelve lo mismo que serie.apply(normalizar_texto); si la columna es
+    categórica, el resultado también lo es.
+    
+    Args:
+        serie: Serie de pandas con textos
+    
+    Returns:
+        Serie normalizada con el mismo índice y nombre
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    
+    # El último elemento representa los valores nulos (código -1)
+    normalizados = np.empty(len(unicos) + 1, dtype=object)
+    normalizados[:-1] = [normalizar_texto(valor) for valor in unicos]
+    normalizados[-1] = np.nan
+    
+    resultado = pd.Series(normalizados[codigos], index=serie.index, name=serie.name)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        resultado = resultado.astype('category')
+    return resultado
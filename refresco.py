@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Actualización de los datos en segundo plano
+Un hilo revisa periódicamente si cambiaron los archivos en SharePoint y, si
+es así, construye la siguiente versión completa fuera de las consultas y la
+publica con un reemplazo atómico de la referencia. Con el almacén Arrow
+compartido, solo un proceso construye cada versión y los demás la abren
+"""
+
+import threading
+import traceback
+
+import config_sharepoint as config
+from conjunto_datos import construir_conjunto_datos, version_fuentes
+from almacen_arrow import AlmacenArrow, ARROW_AVAILABLE
+from almacen_sql import AlmacenSQL
+from instrumentacion import instrumentacion
+
+
+class RefrescoDatos:
+    """Mantiene la versión vigente de los datos y la reemplaza cuando hay cambios"""
+    
+    def __init__(self, loader, intervalo_segundos, almacen=None):
+        self.loader = loader
+        self.intervalo_segundos = intervalo_segundos
+        if almacen is None:
+            if config.BACKEND_DATOS == 'sql':
+                almacen = AlmacenSQL()
+            elif config.ALMACEN_ARROW and ARROW_AVAILABLE:
+                almacen = AlmacenArrow()
+        self.almacen = almacen
+        self.ultimo_error = None
+        self._actual = None
+        self._lista = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+    
+    def iniciar(self):
+        """Iniciar el hilo de actualización (la primera carga empieza de inmediato)"""
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._ciclo, name='refresco_datos', daemon=True)
+            self._hilo.start()
+        return self
+    
+    def detener(self):
+        """Pedir al hilo que termine después del ciclo en curso"""
+        self._detener.set()
+    
+    def actual(self, timeout=None):
+        """
+        Versión vigente de los datos
+        
+        Solo espera si todavía no hay ninguna versión construida (primer
+        arranque). Cada consulta debe tomar la referencia una vez y usarla
+        completa: la siguiente versión se publica reemplazando la referencia,
+        nunca modificando la vigente.
+        """
+        if not self._lista.wait(timeout):
+            raise TimeoutError("Los datos todavía se están cargando")
+        if self._actual is None:
+            raise RuntimeError(f"No se pudieron cargar los datos: {self.ultimo_error}")
+        return self._actual
+    
+    def refrescar(self):
+        """
+        Revisar las fuentes y construir una nueva versión si cambiaron
+        
+        Returns:
+            True si se publicó una nueva versión
+        """
+        version = version_fuentes(self.loader)
+        if self._actual is not None and self._actual.version == version:
+            return False
+        
+        with instrumentacion.fase('refresco'):
+            nuevo = self._obtener(version)
+        
+        # Reemplazo atómico: las consultas en curso siguen con la versión anterior
+        self._actual = nuevo
+        print(f"✅ Versión de datos {version} publicada")
+        instrumentacion.registrar_datos(nuevo)
+        return True
+    
+    def _obtener(self, version):
+        """Abrir la versión desde el almacén compartido o construirla (y publicarla)"""
+        if self.almacen is None:
+            print(f"🔄 Construyendo versión de datos {version}...")
+            return construir_conjunto_datos(self.loader, version=version, anterior=self._actual)
+        
+        conjunto = self.almacen.abrir(version)
+        if conjunto is not None:
+            return conjunto
+        
+        with self.almacen.construccion(version) as propia:
+            if not propia:
+                print(f"⏳ Otro proceso está construyendo la versión {version}, esperando...")
+                conjunto = self.almacen.esperar(version)
+                if conjunto is not None:
+                    return conjunto
+            
+            print(f"🔄 Construyendo versión de datos {version}...")
+            return self.almacen.construir(self.loader, version, anterior=self._actual)
+    
+    def _abrir_publicada(self):
+        """Arranque rápido: usar la última versión publicada por otro proceso"""
+        try:
+            conjunto = self.almacen.abrir_actual()
+        except Exception as e:
+            print(f"⚠️ No se pudo abrir la versión publicada: {e}")
+            return
+        if conjunto is not None:
+            self._actual = conjunto
+            self._lista.set()
+            instrumentacion.registrar_datos(conjunto)
+    
+    def _espera(self, fallos):
+        """
+        Segundos hasta el siguiente ciclo
+        
+        Con una versión vigente, el intervalo normal. Si todavía no hay
+        ninguna (falló la primera carga), las consultas fallan hasta que
+        alguna termine: se reintenta pronto, con espera exponencial desde
+        config.REFRESCO_REINTENTO_SEGUNDOS y sin pasar del intervalo.
+        """
+        if self._actual is not None:
+            return self.intervalo_segundos
+        return min(self.intervalo_segundos, config.REFRESCO_REINTENTO_SEGUNDOS * 2 ** fallos)
+    
+    def _ciclo(self):
+        if self.almacen is not None:
+            self._abrir_publicada()
+        
+        fallos = 0
+        while True:
+            try:
+                self.refrescar()
+                self.ultimo_error = None
+            except Exception as e:
+                self.ultimo_error = e
+                print(f"❌ Error al actualizar los datos: {e}")
+                traceback.print_exc()
+            finally:
+                self._lista.set()
+            
+            espera = self._espera(fallos)
+            if self._actual is None:
+                fallos += 1
+                print(f"🔁 Sin datos cargados, se reintenta en {espera:.0f}s")
+            else:
+                fallos = 0
+            
+            if self._detener.wait(espera):
+                return
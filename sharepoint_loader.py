@@ -6,34 +6,267 @@ Requiere: pip install msal requests pandas
 """
 
 import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
 import os
+import sys
+import json
+import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import io
 from io import BytesIO
-import streamlit as st
 
 try:
     from msal import ConfidentialClientApplication
     SHAREPOINT_AVAILABLE = True
 except ImportError:
     SHAREPOINT_AVAILABLE = False
-    print("⚠️ MSAL no está instalado. Usando archivos locales.")
+    print("⚠️ MSAL no está instalado. Usando archivos locales.", file=sys.stderr)
+
+try:
+    import pyarrow  # noqa: F401  (motor de pd.read_parquet / DataFrame.to_parquet)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    print("⚠️ pyarrow no está instalado. Se desactiva el cache columnar.", file=sys.stderr)
 
 import config_sharepoint as config
+from descargas import DescargaPorRangos
+from transporte import TransporteHTTP
+from instrumentacion import instrumentacion
+
+# Campos del driveItem que identifican la versión de un archivo en SharePoint
+METADATA_FIELDS = ('eTag', 'cTag', 'size', 'lastModifiedDateTime')
+
+
+def _cache_columnar_activo():
+    """Si los CSV parseados se guardan en el cache columnar (Parquet)"""
+    return config.CACHE_LOCAL and config.CACHE_COLUMNAR and PARQUET_AVAILABLE
+
+
+def _filtrar_filas(df, row_filter):
+    """
+    Conservar las filas cuya columna esté en los valores de row_filter=(columna, valores)
+    
+    El cache columnar guarda el archivo sin filtrar: el filtro depende de
+    otros archivos (p. ej. las facturas que usa el histórico, que crece cada
+    día) y no debe invalidar el parseo de este. Se aplica al leerlo.
+    """
+    if row_filter is None:
+        return df
+    column, values = row_filter
+    indice = pd.Index(pd.unique(pd.Series(values).dropna()))
+    return df[indice.get_indexer(df[column]) >= 0].reset_index(drop=True)
+
+
+def _convertir_entero(serie, dtype):
+    """
+    Convertir a un entero compacto; conserva el original si no cabe o no es entero
+    
+    Un tipo nullable declarado ('Int32') se aplica siempre, haya o no vacíos
+    en el bloque, para que todos los bloques de un archivo tengan el mismo
+    tipo. Con un tipo numpy ('int32') se usa el nullable solo si hay vacíos.
+    """
+    numeros = pd.to_numeric(serie, errors='coerce')
+    if (numeros.isna() & serie.notna()).any():
+        # Hay valores no numéricos: no se convierte para no perder datos
+        return serie
+    
+    validos = numeros.dropna()
+    if (validos != validos.round()).any():
+        return numeros
+    
+    limites = np.iinfo(dtype.lower())
+    if len(validos) and (validos.min() < limites.min or validos.max() > limites.max):
+        return numeros
+    
+    if dtype[0].isupper() or numeros.isna().any():
+        return numeros.astype(dtype.capitalize())
+    return numeros.astype(dtype)
+
+
+def _convertir_fecha(serie, columna, tipo, formato):
+    """
+    Convertir a fecha con el formato declarado (sin inferirlo de cada bloque)
+    
+    El formato declarado resuelve casi todo el bloque de una vez; los valores
+    que no lo tienen (p. ej. sin hora o con fracciones de segundo) se
+    interpretan como ISO 8601. Solo los que tampoco lo son quedan vacíos: se
+    informa cuántos son y un ejemplo, para que no se pierdan sin aviso.
+    """
+    fechas = pd.to_datetime(serie, format=formato, errors='coerce')
+    restantes = fechas.isna() & serie.notna()
+    if restantes.any():
+        iso = pd.to_datetime(serie[restantes], format='ISO8601', errors='coerce', utc=True)
+        fechas = fechas.astype(tipo)
+        fechas[restantes] = iso.dt.tz_convert(None).astype(tipo)
+        invalidas = fechas.isna() & serie.notna()
+        if invalidas.any():
+            print(f"⚠️ {columna}: {invalidas.sum()} valores que no son fechas quedan vacíos "
+                  f"(p. ej. {serie[invalidas].iloc[0]!r})")
+    return fechas.astype(tipo)
+
+
+def aplicar_esquema(df, esquema):
+    """
+    Aplicar los tipos declarados en config.ESQUEMAS a las columnas presentes
+    
+    Args:
+        df: DataFrame recién parseado
+        esquema: Diccionario {columna: tipo}. Tipos soportados: enteros
+            ('int32', ... o nullable 'Int32', ...), 'category', fechas como
+            tupla ('datetime64[ns]', formato de strftime) y cualquier tipo
+            válido para astype ('string[pyarrow]' requiere pyarrow)
+    
+    Returns:
+        DataFrame con los tipos convertidos
+    """
+    for columna, tipo in esquema.items():
+        if columna not in df.columns:
+            continue
+        
+        if isinstance(tipo, tuple):
+            df[columna] = _convertir_fecha(df[columna], columna, *tipo)
+        elif tipo.lower().startswith('int'):
+            df[columna] = _convertir_entero(df[columna], tipo)
+        elif tipo == 'string[pyarrow]' and not PARQUET_AVAILABLE:
+            df[columna] = df[columna].astype('string')
+        else:
+            df[columna] = df[columna].astype(tipo)
+    return df
+
+
+def _concat_chunks(chunks):
+    """Concatenar bloques conservando las columnas categóricas (categorías unificadas)"""
+    if len(chunks) > 1:
+        for columna in chunks[0].columns:
+            if isinstance(chunks[0][columna].dtype, pd.CategoricalDtype):
+                categorias = union_categoricals([chunk[columna] for chunk in chunks]).categories
+                for chunk in chunks:
+                    chunk[columna] = chunk[columna].cat.set_categories(categorias)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def reporte_memoria(antes, despues):
+    """
+    Reporte de memoria por columna antes y después de compactar los tipos
+    
+    Args:
+        antes: DataFrame original o Serie con bytes por columna
+        despues: DataFrame compacto o Serie con bytes por columna
+    
+    Returns:
+        DataFrame con MB antes/después y porcentaje de ahorro por columna,
+        más una fila TOTAL
+    """
+    if isinstance(antes, pd.DataFrame):
+        antes = antes.memory_usage(deep=True, index=False)
+    if isinstance(despues, pd.DataFrame):
+        despues = despues.memory_usage(deep=True, index=False)
+    
+    reporte = pd.DataFrame({'mb_antes': antes, 'mb_despues': despues}) / (1024 * 1024)
+    reporte.loc['TOTAL'] = reporte.sum()
+    reporte['ahorro_pct'] = (1 - reporte['mb_despues'] / reporte['mb_antes']) * 100
+    return reporte.round(2)
+
+
+class _TeeReader(io.RawIOBase):
+    """Lector que copia en un archivo todo lo que se consume de otro stream"""
+    
+    def __init__(self, source, sink=None):
+        self._source = source
+        self._sink = sink
+        self.total_bytes = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self._source.read(len(buffer))
+        if not data:
+            return 0
+        
+        size = len(data)
+        buffer[:size] = data
+        if self._sink:
+            self._sink.write(data)
+        self.total_bytes += size
+        return size
 
 
 class SharePointLoader:
     """Clase para cargar archivos desde SharePoint usando Microsoft Graph API"""
     
     def __init__(self):
+        # La construcción no hace llamadas de red: la autenticación y la
+        # consulta del sitio/drive se hacen en la primera solicitud de datos
         self.use_sharepoint = config.USE_SHAREPOINT and SHAREPOINT_AVAILABLE
         self.access_token = None
+        self.token_expires_at = 0
         self.site_id = None
         self.drive_id = None
+        self._ids_guardados = False
+        self.session = self._create_session()
+        self.memory_reports = {}
+        self._msal_app = None
+        self._connect_lock = threading.RLock()
+        
+        # Todas las solicitudes a Graph pasan por el transporte (reintentos y métricas)
+        self.transport = TransporteHTTP(
+            self.session,
+            token_provider=lambda: self.access_token,
+            token_refresh=self._refresh_token
+        )
+    
+    def _create_session(self):
+        """Crear una sesión HTTP compartida con pool de conexiones keep-alive"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=config.HTTP_POOL_MAXSIZE
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _ensure_connected(self):
+        """
+        Preparar la conexión con SharePoint si todavía no está lista
+        
+        Se llama antes de cada solicitud de datos. Reutiliza el token mientras
+        no esté por expirar y los IDs de sitio/drive ya conocidos, así que
+        después de la primera vez normalmente no hace llamadas de red.
         
-        if self.use_sharepoint:
+        Returns:
+            True si se puede usar SharePoint en esta solicitud
+        """
+        if not self.use_sharepoint:
+            return False
+        
+        with self._connect_lock:
+            if not self._token_is_valid():
+                self._authenticate()
+                if not self._token_is_valid():
+                    return False
+            
+            if not self.site_id or not self.drive_id:
+                if not self._load_site_and_drive_ids():
+                    self._get_site_and_drive_info()
+            
+            return self.use_sharepoint and bool(self.site_id and self.drive_id)
+    
+    def _token_is_valid(self):
+        """Indica si el token actual sigue vigente (con margen antes de expirar)"""
+        return bool(self.access_token) and time.time() < self.token_expires_at - config.TOKEN_MARGEN_EXPIRACION_SEGUNDOS
+    
+    def _refresh_token(self):
+        """Descartar el token actual y obtener uno nuevo (tras un 401)"""
+        with self._connect_lock:
+            self.token_expires_at = 0
             self._authenticate()
-            if self.access_token:
-                self._get_site_and_drive_info()
     
     def _authenticate(self):
         """Autenticar con Microsoft Graph usando MSAL"""
@@ -45,31 +278,75 @@ class SharePointLoader:
                 authority = f'https://login.microsoftonline.com/{config.SHAREPOINT_TENANT_ID}'
                 scope = ['https://graph.microsoft.com/.default']
                 
-                # Crear aplicación confidencial
-                app = ConfidentialClientApplication(
-                    config.SHAREPOINT_CLIENT_ID,
-                    authority=authority,
-                    client_credential=config.SHAREPOINT_CLIENT_SECRET
-                )
+                # Crear la aplicación confidencial una sola vez (conserva su cache de tokens)
+                if self._msal_app is None:
+                    self._msal_app = ConfidentialClientApplication(
+                        config.SHAREPOINT_CLIENT_ID,
+                        authority=authority,
+                        client_credential=config.SHAREPOINT_CLIENT_SECRET
+                    )
                 
                 # Adquirir token
-                result = app.acquire_token_for_client(scopes=scope)
+                with instrumentacion.fase('auth') as medida:
+                    result = self._msal_app.acquire_token_for_client(scopes=scope)
+                    if "access_token" not in result:
+                        medida['error'] = result.get('error', 'sin_token')
                 
                 if "access_token" in result:
                     self.access_token = result['access_token']
+                    self.token_expires_at = time.time() + int(result.get('expires_in', 0))
                     print("✅ Token de acceso obtenido exitosamente")
                 else:
+                    # Puede ser un fallo temporal: se vuelve a intentar en la próxima solicitud
                     error = result.get("error_description", result.get("error", "Error desconocido"))
                     print(f"❌ Error al obtener token: {error}")
-                    self.use_sharepoint = False
+                    self.access_token = None
             else:
                 print("⚠️ No hay credenciales configuradas. Usando archivos locales.")
                 self.use_sharepoint = False
-                
+        
         except Exception as e:
             print(f"❌ Error al conectar con Microsoft Graph: {e}")
             print(f"    Detalles: {str(e)}")
-            self.use_sharepoint = False
+            self.access_token = None
+    
+    def _ids_path(self):
+        """Ruta del archivo con el site_id y drive_id guardados"""
+        return os.path.join(config.CACHE_DIRECTORY, config.SHAREPOINT_IDS_ARCHIVO)
+    
+    def _load_site_and_drive_ids(self):
+        """Recuperar el site_id y drive_id guardados para el sitio configurado"""
+        try:
+            with open(self._ids_path(), 'r', encoding='utf-8') as f:
+                ids = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        if ids.get('site_url') != config.SHAREPOINT_SITE_URL or not ids.get('site_id') or not ids.get('drive_id'):
+            return False
+        
+        self.site_id = ids['site_id']
+        self.drive_id = ids['drive_id']
+        self._ids_guardados = True
+        return True
+    
+    def _save_site_and_drive_ids(self):
+        """Guardar el site_id y drive_id en el directorio de cache"""
+        if not config.CACHE_LOCAL:
+            return
+        
+        try:
+            os.makedirs(config.CACHE_DIRECTORY, exist_ok=True)
+            tmp_path = self._ids_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'site_url': config.SHAREPOINT_SITE_URL,
+                    'site_id': self.site_id,
+                    'drive_id': self.drive_id,
+                }, f)
+            os.replace(tmp_path, self._ids_path())
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar los IDs de SharePoint: {e}")
     
     def _get_site_and_drive_info(self):
         """Obtener el site_id y drive_id del sitio de SharePoint"""
@@ -83,11 +360,9 @@ class SharePointLoader:
             print(f"📍 Obteniendo información del sitio: {hostname}:/{site_path}")
             
             # Obtener información del sitio
-            headers = {'Authorization': f'Bearer {self.access_token}'}
             site_url = f"https://graph.microsoft.com/v1.0/sites/{hostname}:/{site_path}"
             
-            response = requests.get(site_url, headers=headers)
-            response.raise_for_status()
+            response = self.transport.get(site_url)
             
             site_data = response.json()
             self.site_id = site_data['id']
@@ -96,26 +371,64 @@ class SharePointLoader:
             
             # Obtener el drive principal del sitio
             drive_url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/drive"
-            response = requests.get(drive_url, headers=headers)
-            response.raise_for_status()
+            response = self.transport.get(drive_url)
             
             drive_data = response.json()
             self.drive_id = drive_data['id']
             
             print(f"✅ Drive ID obtenido: {self.drive_id}")
+            self._ids_guardados = False
+            self._save_site_and_drive_ids()
             
         except Exception as e:
             print(f"❌ Error al obtener información del sitio/drive: {e}")
-            self.use_sharepoint = False
+    
+    def _resolver_ids_de_nuevo(self, error, usados):
+        """
+        Volver a resolver el site_id y drive_id si los guardados ya no sirven
+        
+        Los IDs de config.SHAREPOINT_IDS_ARCHIVO se usan sin consultar Graph; si
+        el sitio o el drive se recrearon, las solicitudes con esos IDs fallan con
+        404 o 400. En ese caso se borra el archivo y se resuelven una sola vez.
+        
+        Args:
+            error: HTTPError de la solicitud que falló
+            usados: Tupla (site_id, drive_id) con la que se hizo la solicitud
+        
+        Returns:
+            True si hay IDs nuevos con los que repetir la solicitud
+        """
+        if error.response is None or error.response.status_code not in (400, 404):
+            return False
+        
+        with self._connect_lock:
+            if (self.site_id, self.drive_id) != usados:
+                # Otro hilo ya los resolvió de nuevo
+                return bool(self.site_id and self.drive_id)
+            if not self._ids_guardados:
+                return False
+            
+            print(f"⚠️ Los IDs de SharePoint guardados no son válidos ({error.response.status_code}), "
+                  f"se consultan de nuevo")
+            self._ids_guardados = False
+            self.site_id = None
+            self.drive_id = None
+            try:
+                os.remove(self._ids_path())
+            except OSError:
+                pass
+            self._get_site_and_drive_info()
+            return bool(self.site_id and self.drive_id)
     
     def _list_root_folders(self):
         """Listar carpetas en la raíz del drive para debugging"""
+        if not self._ensure_connected():
+            return
+        
         try:
-            headers = {'Authorization': f'Bearer {self.access_token}'}
             list_url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/drives/{self.drive_id}/root/children"
             
-            response = requests.get(list_url, headers=headers)
-            response.raise_for_status()
+            response = self.transport.get(list_url)
             
             items = response.json().get('value', [])
             print(f"\n📂 Carpetas/archivos en la raíz del drive:")
@@ -123,10 +436,50 @@ class SharePointLoader:
                 item_type = "📁" if item.get('folder') else "📄"
                 print(f"   {item_type} {item['name']}")
             print()
-            
+        
         except Exception as e:
             print(f"⚠️ No se pudo listar carpetas: {e}")
     
+    def _file_content_url(self, file_name):
+        """URL de Graph API para descargar el contenido de un archivo de la carpeta configurada"""
+        folder_path = config.SHAREPOINT_FOLDER_PATH.strip('/')
+        file_path = f"{folder_path}/{file_name}"
+        return f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/drives/{self.drive_id}/root:/{file_path}:/content"
+    
+    def _get_item(self, file_name):
+        """Solicitud de los metadatos del driveItem de un archivo de la carpeta configurada"""
+        folder_path = config.SHAREPOINT_FOLDER_PATH.strip('/')
+        file_path = f"{folder_path}/{file_name}"
+        
+        item_url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/drives/{self.drive_id}/root:/{file_path}"
+        params = {'$select': 'eTag,cTag,size,lastModifiedDateTime,file'}
+        return self.transport.get(item_url, params=params)
+    
+    def _get_remote_metadata(self, file_name):
+        """Obtener los metadatos del driveItem (eTag, cTag, tamaño, fecha) sin descargar el contenido"""
+        if not self.use_sharepoint or not self.access_token or not self.site_id or not self.drive_id:
+            return None
+        
+        try:
+            # Es la primera solicitud de cada carga que usa los IDs del sitio/drive:
+            # si fallan por IDs obsoletos, se resuelven de nuevo y se repite
+            usados = (self.site_id, self.drive_id)
+            try:
+                response = self._get_item(file_name)
+            except requests.exceptions.HTTPError as e:
+                if not self._resolver_ids_de_nuevo(e, usados):
+                    raise
+                response = self._get_item(file_name)
+            
+            item = response.json()
+            metadata = {campo: item.get(campo) for campo in METADATA_FIELDS}
+            metadata['quickXorHash'] = (item.get('file') or {}).get('hashes', {}).get('quickXorHash')
+            return metadata
+        
+        except Exception as e:
+            print(f"⚠️ No se pudieron obtener los metadatos de {file_name}: {e}")
+            return None
+    
     def _download_file_from_sharepoint(self, file_name):
         """Descargar un archivo desde SharePoint usando Microsoft Graph API con streaming"""
         if not self.use_sharepoint or not self.access_token or not self.site_id or not self.drive_id:
@@ -140,12 +493,10 @@ class SharePointLoader:
             print(f"📡 Streaming: {file_path}")
             
             # Construir la URL de Graph API
-            headers = {'Authorization': f'Bearer {self.access_token}'}
-            file_url = f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/drives/{self.drive_id}/root:/{file_path}:/content"
+            file_url = self._file_content_url(file_name)
             
             # Descargar el archivo con streaming (no carga todo en memoria)
-            response = requests.get(file_url, headers=headers, stream=True)
-            response.raise_for_status()
+            response = self.transport.get(file_url, stream=True)
             
             # Crear BytesIO y escribir en chunks para evitar cargar todo en memoria
             file_content = BytesIO()
@@ -174,6 +525,201 @@ class SharePointLoader:
             print(f"❌ Error al leer {file_name}: {e}")
             return None
     
+    def _stream_csv_from_sharepoint(self, file_name, encoding='utf-8', row_filter=None, schema=None, **kwargs):
+        """
+        Descargar y parsear un CSV en una sola pasada, con memoria acotada
+        
+        La respuesta HTTP alimenta directamente a pd.read_csv por bloques de
+        config.STREAMING_CHUNK_ROWS filas (aplicando usecols y el esquema en cada bloque)
+        y, al mismo tiempo, se escribe en el archivo del cache. Así el pico de
+        memoria es un bloque más el resultado ya proyectado (y filtrado con
+        row_filter), en lugar de varias copias del archivo completo.
+        
+        Returns:
+            DataFrame de pandas, o None si la descarga falla
+        """
+        if not self.use_sharepoint or not self.access_token or not self.site_id or not self.drive_id:
+            return None
+        
+        cache_path = None
+        part_path = None
+        sink = None
+        
+        try:
+            folder_path = config.SHAREPOINT_FOLDER_PATH.strip('/')
+            file_path = f"{folder_path}/{file_name}"
+            
+            print(f"📡 Streaming (por bloques): {file_path}")
+            
+            file_url = self._file_content_url(file_name)
+            
+            response = self.transport.get(file_url, stream=True)
+            response.raw.decode_content = True
+            
+            # Escribir en un archivo temporal y renombrar al terminar, para que
+            # una descarga interrumpida nunca reemplace un cache válido
+            if config.CACHE_LOCAL:
+                os.makedirs(config.CACHE_DIRECTORY, exist_ok=True)
+                cache_path = os.path.join(config.CACHE_DIRECTORY, file_name)
+                part_path = cache_path + '.part'
+                sink = open(part_path, 'wb')
+            
+            tee = _TeeReader(response.raw, sink)
+            stream = io.BufferedReader(tee, buffer_size=config.STREAMING_BUFFER_BYTES)
+            
+            # Con cache columnar se parsea sin filtrar (se guarda así) y se filtra después
+            guardar_columnar = cache_path is not None and _cache_columnar_activo()
+            df = self._parse_in_chunks(stream, encoding=encoding,
+                                       row_filter=None if guardar_columnar else row_filter,
+                                       schema=schema, **kwargs)
+            
+            # Consumir lo que el parser no haya pedido para que el cache quede completo
+            while tee.read(config.STREAMING_BUFFER_BYTES):
+                pass
+            
+            if sink:
+                sink.close()
+                sink = None
+                os.replace(part_path, cache_path)
+            
+            size_mb = tee.total_bytes / (1024 * 1024)
+            print(f"✅ {file_name} leído exitosamente ({size_mb:.2f} MB)")
+            
+            if guardar_columnar:
+                self._save_columnar(file_name, cache_path, df, encoding, kwargs,
+                                    complete=kwargs.get('usecols') is None, schema=schema)
+                df = _filtrar_filas(df, row_filter)
+            df.attrs['bytes_descargados'] = tee.total_bytes
+            return df
+        
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Error HTTP al leer {file_name}: {e.response.status_code}")
+            print(f"    Respuesta: {e.response.text[:200]}")
+            return None
+        except Exception as e:
+            print(f"❌ Error al leer {file_name}: {e}")
+            return None
+        finally:
+            if sink:
+                sink.close()
+            if part_path and os.path.exists(part_path):
+                os.remove(part_path)
+    
+    def _download_in_ranges(self, file_name, remote_metadata):
+        """
+        Descargar un archivo grande al cache por rangos de bytes en paralelo
+        
+        Usa DescargaPorRangos: los rangos se piden simultáneamente sobre la
+        sesión compartida, se escriben en un archivo preasignado y el avance se
+        guarda para reanudar si la descarga se interrumpe. El cache solo se
+        reemplaza cuando el archivo está completo y verificado.
+        
+        Returns:
+            True si el archivo del cache quedó actualizado
+        """
+        os.makedirs(config.CACHE_DIRECTORY, exist_ok=True)
+        size = remote_metadata['size']
+        print(f"📡 Descarga por rangos: {file_name} ({size / (1024 * 1024):.2f} MB, "
+              f"{config.DESCARGA_RANGOS_HILOS} conexiones)")
+        
+        descarga = DescargaPorRangos(
+            self.transport,
+            self._file_content_url(file_name),
+            os.path.join(config.CACHE_DIRECTORY, file_name),
+            size,
+            version=remote_metadata.get('eTag'),
+            quick_xor=remote_metadata.get('quickXorHash'),
+        )
+        if descarga.run():
+            print(f"✅ {file_name} descargado por rangos")
+            return True
+        return False
+    
+    def _read_cache_tail(self, cache_path, tail_bytes):
+        """Leer los últimos tail_bytes bytes del archivo del cache"""
+        with open(cache_path, 'rb') as f:
+            f.seek(-tail_bytes, os.SEEK_END)
+            return f.read(tail_bytes)
+    
+    def _sync_incremental(self, file_name, remote_metadata, encoding='utf-8',
+                          row_filter=None, schema=None, **kwargs):
+        """
+        Sincronizar un CSV que solo crece agregando filas al final
+        
+        Si el archivo remoto es más grande que el del cache, se pide con un
+        header Range desde los últimos config.INCREMENTAL_TAIL_BYTES bytes
+        conocidos hasta el final. Esos bytes iniciales deben coincidir con la
+        cola del archivo cacheado (huella del prefijo); si coinciden, solo los
+        bytes nuevos se agregan al CSV del cache y solo las filas nuevas se
+        parsean y se agregan al DataFrame cacheado (y al cache columnar).
+        
+        Returns:
+            DataFrame completo actualizado, o None si hay que descargar todo
+            (sin cache previo, prefijo modificado o servidor sin soporte de Range)
+        """
+        cache_path = self._load_from_cache(file_name)
+        remote_size = (remote_metadata or {}).get('size')
+        if not cache_path or not remote_size or not self._load_cache_metadata(file_name):
+            return None
+        
+        local_size = os.path.getsize(cache_path)
+        if remote_size <= local_size or local_size == 0:
+            return None
+        
+        tail_bytes = min(config.INCREMENTAL_TAIL_BYTES, local_size)
+        local_tail = self._read_cache_tail(cache_path, tail_bytes)
+        if not local_tail.endswith(b'\n'):
+            # Las filas nuevas deben empezar en una línea nueva
+            return None
+        
+        try:
+            start = local_size - tail_bytes
+            print(f"🔁 Sincronización incremental de {file_name}: bytes {start}-{remote_size - 1}")
+            
+            headers = {'Range': f'bytes={start}-{remote_size - 1}'}
+            response = self.transport.get(self._file_content_url(file_name), headers=headers)
+            
+            if response.status_code != 206:
+                print(f"⚠️ El servidor no aceptó la descarga parcial de {file_name}, se descarga completo")
+                return None
+            
+            content = response.content
+            if content[:tail_bytes] != local_tail:
+                print(f"⚠️ {file_name} cambió antes del final del cache, se descarga completo")
+                return None
+            new_bytes = content[tail_bytes:]
+            
+            # Frame actual (desde el cache columnar, sin filtrar) antes de modificar el CSV
+            df_actual = self._read_csv(file_name, cache_path, encoding=encoding, schema=schema, **kwargs)
+            
+            # Parsear solo las filas nuevas, con los nombres de columna del encabezado
+            columns = pd.read_csv(cache_path, encoding=encoding, nrows=0).columns
+            df_nuevo = self._parse_in_chunks(BytesIO(new_bytes), encoding=encoding,
+                                             schema=schema, header=None, names=list(columns), **kwargs)
+            df_nuevo.attrs.pop('memoria_sin_esquema', None)
+            
+            with open(cache_path, 'ab') as f:
+                f.write(new_bytes)
+            
+            df = _concat_chunks([df_actual, df_nuevo])
+            self._save_columnar(file_name, cache_path, df, encoding, kwargs,
+                                complete=kwargs.get('usecols') is None, schema=schema)
+            df = _filtrar_filas(df, row_filter)
+            
+            df.attrs['bytes_descargados'] = len(content)
+            df.attrs['filas_nuevas'] = len(df_nuevo)
+            
+            size_kb = len(new_bytes) / 1024
+            print(f"✅ {file_name}: {len(df_nuevo)} filas nuevas ({size_kb:.1f} KB)")
+            return df
+        
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Error HTTP en la sincronización de {file_name}: {e.response.status_code}")
+            return None
+        except Exception as e:
+            print(f"❌ Error en la sincronización incremental de {file_name}: {e}")
+            return None
+    
     def _save_to_cache(self, file_name, content):
         """Guardar archivo en cache local"""
         if config.CACHE_LOCAL:
@@ -182,7 +728,8 @@ class SharePointLoader:
             
             cache_path = os.path.join(cache_dir, file_name)
             with open(cache_path, 'wb') as f:
-                f.write(content.getvalue())
+                # getbuffer() evita copiar de nuevo todo el contenido en memoria
+                f.write(content.getbuffer())
     
     def _load_from_cache(self, file_name):
         """Cargar archivo desde cache local"""
@@ -192,45 +739,481 @@ class SharePointLoader:
                 return cache_path
         return None
     
-    def load_csv(self, csv_key, encoding='utf-8', **kwargs):
+    def _metadata_path(self, file_name):
+        """Ruta del archivo sidecar con los metadatos de la versión cacheada"""
+        return os.path.join(config.CACHE_DIRECTORY, file_name + config.CACHE_METADATA_SUFFIX)
+    
+    def _load_cache_metadata(self, file_name):
+        """Leer los metadatos de la versión cacheada (None si no existen o están dañados)"""
+        metadata_path = self._metadata_path(file_name)
+        if not os.path.exists(metadata_path):
+            return None
+        
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Metadatos de cache inválidos para {file_name}: {e}")
+            return None
+    
+    def _save_cache_metadata(self, file_name, metadata):
+        """Guardar los metadatos de la versión recién descargada junto al archivo del cache"""
+        if config.CACHE_LOCAL:
+            os.makedirs(config.CACHE_DIRECTORY, exist_ok=True)
+            
+            # Escribir en un temporal y renombrar para no dejar un sidecar a medias
+            metadata_path = self._metadata_path(file_name)
+            tmp_path = metadata_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2)
+            os.replace(tmp_path, metadata_path)
+    
+    def _is_cache_current(self, file_name, remote_metadata):
+        """Verificar si el archivo del cache corresponde a la versión remota actual"""
+        if not remote_metadata:
+            return False
+        
+        cache_path = self._load_from_cache(file_name)
+        if not cache_path:
+            return False
+        
+        cached_metadata = self._load_cache_metadata(file_name)
+        if not cached_metadata:
+            return False
+        
+        # Cualquier diferencia en eTag, cTag, tamaño o fecha implica una nueva versión
+        for campo in METADATA_FIELDS:
+            if cached_metadata.get(campo) != remote_metadata.get(campo):
+                return False
+        
+        # Protege contra un archivo de cache truncado por una escritura interrumpida
+        return os.path.getsize(cache_path) == remote_metadata.get('size')
+    
+    def _columnar_path(self, file_name):
+        """Ruta del archivo Parquet con la versión ya parseada del CSV"""
+        return os.path.join(config.CACHE_DIRECTORY, file_name + config.CACHE_COLUMNAR_SUFFIX)
+    
+    def _source_version(self, csv_path):
+        """Identificador de la versión del CSV de origen (ruta, tamaño y fecha de modificación)"""
+        stat = os.stat(csv_path)
+        return {
+            'path': os.path.abspath(csv_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        }
+    
+    def _parse_fingerprint(self, encoding, kwargs, schema=None):
+        """Huella de las opciones de parseo que afectan el resultado (excepto usecols)"""
+        opciones = {k: v for k, v in kwargs.items() if k != 'usecols'}
+        opciones['encoding'] = encoding
+        if schema:
+            opciones['schema'] = schema
+        return json.dumps(opciones, sort_keys=True, default=str)
+    
+    def _parse_in_chunks(self, source, encoding='utf-8', row_filter=None, schema=None, **kwargs):
+        """
+        Parsear un CSV por bloques de config.STREAMING_CHUNK_ROWS filas
+        
+        Si se indica row_filter=(columna, valores), cada bloque se filtra antes
+        de acumularse, de modo que solo las filas que coinciden ocupan memoria.
+        Si se indica schema, los tipos se convierten bloque a bloque; la memoria
+        que habría ocupado cada columna sin convertir queda en
+        df.attrs['memoria_sin_esquema'].
+        """
+        indice = None
+        if row_filter is not None:
+            column, values = row_filter
+            # Índice hash construido una sola vez y reutilizado en todos los bloques
+            indice = pd.Index(pd.unique(pd.Series(values).dropna()))
+        
+        chunks = []
+        memoria = None
+        with pd.read_csv(source, encoding=encoding, chunksize=config.STREAMING_CHUNK_ROWS, **kwargs) as reader:
+            for chunk in reader:
+                if indice is not None:
+                    chunk = chunk[indice.get_indexer(chunk[column]) >= 0].copy()
+                if schema:
+                    if config.MEDIR_MEMORIA_CARGA:
+                        uso = chunk.memory_usage(deep=True, index=False)
+                        memoria = uso if memoria is None else memoria + uso
+                    chunk = aplicar_esquema(chunk, schema)
+                chunks.append(chunk)
+        
+        df = _concat_chunks(chunks)
+        if memoria is not None:
+            df.attrs['memoria_sin_esquema'] = memoria
+        return df
+    
+    def _load_columnar(self, file_name, csv_path, encoding, kwargs, schema=None):
+        """
+        Leer el DataFrame (sin filtrar) desde el cache columnar si corresponde a la versión actual del CSV
+        
+        Returns:
+            Tupla (DataFrame o None, metadatos del Parquet o None)
+        """
+        if not _cache_columnar_activo():
+            return None, None
+        
+        columnar_path = self._columnar_path(file_name)
+        metadata = self._load_cache_metadata(file_name + config.CACHE_COLUMNAR_SUFFIX)
+        if not metadata or not os.path.exists(columnar_path):
+            return None, None
+        
+        # Invalidar si el CSV cambió o si se parseó con otras opciones
+        if metadata.get('source') != self._source_version(csv_path):
+            return None, None
+        if metadata.get('parse') != self._parse_fingerprint(encoding, kwargs, schema):
+            return None, None
+        
+        usecols = kwargs.get('usecols')
+        stored_columns = metadata.get('columns', [])
+        if usecols is None:
+            if not metadata.get('complete'):
+                return None, metadata
+            columns = None
+        else:
+            if not set(usecols) <= set(stored_columns):
+                return None, metadata
+            # Mismo orden que devolvería pd.read_csv (orden del archivo)
+            columns = [c for c in stored_columns if c in set(usecols)]
+        
+        try:
+            with instrumentacion.fase('lectura_columnar', self.transport.etiqueta_actual()) as medida:
+                df = pd.read_parquet(columnar_path, columns=columns)
+                medida['bytes'] = os.path.getsize(columnar_path)
+                medida['filas'] = len(df)
+            return df, metadata
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el cache columnar de {file_name}: {e}")
+            return None, None
+    
+    def _save_columnar(self, file_name, csv_path, df, encoding, kwargs, complete, schema=None):
+        """Guardar el DataFrame parseado (sin filtrar) en el cache columnar (Parquet)"""
+        if not _cache_columnar_activo():
+            return
+        
+        try:
+            os.makedirs(config.CACHE_DIRECTORY, exist_ok=True)
+            columnar_path = self._columnar_path(file_name)
+            tmp_path = columnar_path + '.tmp'
+            
+            # Los attrs del parseo (reporte de memoria) no se guardan en el Parquet
+            attrs, df.attrs = df.attrs, {}
+            try:
+                df.to_parquet(tmp_path)
+            finally:
+                df.attrs = attrs
+            os.replace(tmp_path, columnar_path)
+            
+            self._save_cache_metadata(file_name + config.CACHE_COLUMNAR_SUFFIX, {
+                'source': self._source_version(csv_path),
+                'parse': self._parse_fingerprint(encoding, kwargs, schema),
+                'columns': list(df.columns),
+                'complete': complete,
+            })
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el cache columnar de {file_name}: {e}")
+    
+    def _read_csv(self, file_name, csv_path, encoding='utf-8', row_filter=None, schema=None, **kwargs):
+        """
+        Leer un CSV usando el cache columnar cuando sea posible
+        
+        Si el Parquet corresponde a la versión actual del CSV y contiene las
+        columnas solicitadas, solo se leen esas columnas. En caso contrario se
+        parsea el CSV y se actualiza el Parquet. El row_filter se aplica
+        después de leer el Parquet, así que cambiar el filtro no obliga a
+        parsear de nuevo.
+        """
+        usecols = kwargs.get('usecols')
+        if callable(usecols) or not _cache_columnar_activo():
+            # Sin cache columnar (o con un usecols callable, que no permite saber
+            # qué columnas quedan cubiertas) se filtra durante el parseo
+            return self._parse_in_chunks(csv_path, encoding=encoding, row_filter=row_filter,
+                                         schema=schema, **kwargs)
+        
+        df, metadata = self._load_columnar(file_name, csv_path, encoding, kwargs, schema)
+        if df is not None:
+            print(f"⚡ {file_name} cargado desde cache columnar")
+            return _filtrar_filas(df, row_filter)
+        
+        # Si el Parquet vigente ya tenía otras columnas, parsear la unión para no perderlas
+        parse_kwargs = dict(kwargs)
+        if usecols is not None and metadata:
+            if metadata.get('complete'):
+                parse_kwargs.pop('usecols')
+            else:
+                parse_kwargs['usecols'] = list(dict.fromkeys(list(metadata['columns']) + list(usecols)))
+        
+        with instrumentacion.fase('parseo_csv', self.transport.etiqueta_actual()) as medida:
+            df = self._parse_in_chunks(csv_path, encoding=encoding, schema=schema, **parse_kwargs)
+            medida['bytes'] = os.path.getsize(csv_path)
+            medida['filas'] = len(df)
+        self._save_columnar(file_name, csv_path, df, encoding, kwargs,
+                            complete=parse_kwargs.get('usecols') is None, schema=schema)
+        
+        if usecols is not None:
+            df = df[[c for c in df.columns if c in set(usecols)]]
+        return _filtrar_filas(df, row_filter)
+    
+    def get_version(self, csv_key):
+        """
+        Identificador de la versión actual de un archivo, sin descargarlo
+        
+        Usa el eTag de SharePoint si está disponible; si no, el tamaño y la
+        fecha de modificación del cache o del archivo local.
+        """
+        file_name = config.ARCHIVOS_CSV.get(csv_key)
+        
+        if not file_name:
+            raise ValueError(f"Archivo no configurado: {csv_key}")
+        
+        if self._ensure_connected():
+            remote_metadata = self._get_remote_metadata(file_name)
+            if remote_metadata and remote_metadata.get('eTag'):
+                return remote_metadata['eTag']
+        
+        for csv_path in (self._load_from_cache(file_name), file_name):
+            if csv_path and os.path.exists(csv_path):
+                version = self._source_version(csv_path)
+                return f"{version['size']}:{version['mtime_ns']}"
+        
+        return None
+    
+    def ruta_local(self, csv_key):
+        """
+        Ruta de la versión actual de un CSV en disco, sin parsearlo
+        
+        Lo usa la ingesta por bloques del backend SQL (almacen_sql.py). Si el
+        archivo cambió en SharePoint se descarga al cache por rangos, escribiendo
+        directamente en disco, para no tenerlo completo en memoria.
+        
+        Returns:
+            Ruta del CSV (cache o archivo local)
+        
+        Raises:
+            IOError si el archivo cambió en SharePoint y la descarga no se
+            completó: el cache es de la versión anterior y mezclarlo con los
+            demás archivos ya actualizados daría una versión inconsistente
+        """
+        file_name = config.ARCHIVOS_CSV.get(csv_key)
+        
+        if not file_name:
+            raise ValueError(f"Archivo no configurado: {csv_key}")
+        
+        with self.transport.medir(csv_key):
+            if config.CACHE_LOCAL and self._ensure_connected():
+                with instrumentacion.fase('graph_metadatos', csv_key) as medida:
+                    remote_metadata = self._get_remote_metadata(file_name)
+                    if remote_metadata is None:
+                        medida['error'] = 'sin_metadatos'
+                
+                if remote_metadata and remote_metadata.get('size') and not self._is_cache_current(file_name, remote_metadata):
+                    with instrumentacion.fase('descarga_rangos', csv_key) as medida:
+                        completa = self._download_in_ranges(file_name, remote_metadata)
+                        medida['bytes'] = remote_metadata['size'] if completa else None
+                        medida['error'] = None if completa else 'descarga_incompleta'
+                    if not completa:
+                        raise IOError(f"La descarga de {file_name} no se completó; "
+                                      f"el cache es de una versión anterior")
+                    self._save_cache_metadata(file_name, remote_metadata)
+        
+        # Cache (actualizado o el último disponible) y, si no hay, archivo local
+        cache_path = self._load_from_cache(file_name)
+        if cache_path:
+            return cache_path
+        if os.path.exists(file_name):
+            return file_name
+        raise FileNotFoundError(f"No se encontró {file_name} en SharePoint, en el cache ni localmente")
+    
+    def load_csv(self, csv_key, encoding='utf-8', row_filter=None, **kwargs):
         """
         Cargar un archivo CSV desde SharePoint o local
         
         Args:
             csv_key: Clave del archivo en config.ARCHIVOS_CSV
             encoding: Encoding del archivo
+            row_filter: Tupla opcional (columna, valores) para conservar solo las
+                filas cuya columna esté en valores. El cache columnar guarda el
+                archivo sin filtrar (un filtro distinto no obliga a parsearlo de
+                nuevo); sin cache columnar se aplica por bloques durante el parseo
             **kwargs: Argumentos adicionales para pd.read_csv
         
         Returns:
-            DataFrame de pandas
+            DataFrame de pandas, con los tipos de config.ESQUEMAS[csv_key]
         """
         file_name = config.ARCHIVOS_CSV.get(csv_key)
         
         if not file_name:
             raise ValueError(f"Archivo no configurado: {csv_key}")
         
-        # Intentar cargar desde SharePoint
-        if self.use_sharepoint:
+        schema = config.ESQUEMAS.get(csv_key)
+        with self.transport.medir(csv_key) as metricas, instrumentacion.fase('load_csv', csv_key) as medida:
+            df = self._load_csv(csv_key, file_name, encoding, row_filter, schema, **kwargs)
+            medida['filas'] = len(df)
+            medida['bytes'] = df.attrs.pop('bytes_descargados', None)
+        
+        if metricas['reintentos']:
+            print(f"⏳ {csv_key}: {metricas['reintentos']} reintentos HTTP, "
+                  f"{metricas['espera_segundos']:.1f}s de espera")
+        
+        # Registrar la memoria por columna antes/después de aplicar el esquema
+        memoria_sin_esquema = df.attrs.pop('memoria_sin_esquema', None)
+        if memoria_sin_esquema is not None:
+            reporte = reporte_memoria(memoria_sin_esquema, df)
+            self.memory_reports[csv_key] = reporte
+            total = reporte.loc['TOTAL']
+            print(f"🧮 {csv_key}: {total['mb_antes']:.1f} MB → {total['mb_despues']:.1f} MB")
+        
+        return df
+    
+    def _load_csv(self, csv_key, file_name, encoding, row_filter, schema, **kwargs):
+        """Cargar el CSV en cascada: SharePoint, cache local y archivo local"""
+        # Intentar cargar desde SharePoint (autentica en la primera solicitud)
+        if self._ensure_connected():
+            # Consultar primero los metadatos: si el archivo no cambió se usa el cache
+            with instrumentacion.fase('graph_metadatos', csv_key) as medida:
+                remote_metadata = self._get_remote_metadata(file_name)
+                if remote_metadata is None:
+                    medida['error'] = 'sin_metadatos'
+            
+            if self._is_cache_current(file_name, remote_metadata):
+                print(f"✅ {file_name} sin cambios en SharePoint, cargando desde cache...")
+                return self._read_csv(file_name, self._load_from_cache(file_name), encoding=encoding,
+                                      row_filter=row_filter, schema=schema, **kwargs)
+            
+            # Archivos que solo crecen: descargar únicamente los bytes nuevos
+            if csv_key in config.ARCHIVOS_INCREMENTALES:
+                with instrumentacion.fase('descarga_incremental', csv_key) as medida:
+                    df = self._sync_incremental(file_name, remote_metadata, encoding=encoding,
+                                                row_filter=row_filter, schema=schema, **kwargs)
+                    if df is not None:
+                        medida['bytes'] = df.attrs.get('bytes_descargados')
+                        medida['filas'] = df.attrs.pop('filas_nuevas')
+                if df is not None:
+                    self._save_cache_metadata(file_name, remote_metadata)
+                    return df
+            
             print(f"📥 Descargando {file_name} desde SharePoint...")
             
-            file_content = self._download_file_from_sharepoint(file_name)
+            # Archivos muy grandes: descarga paralela por rangos, reanudable
+            if (config.CACHE_LOCAL and remote_metadata and remote_metadata.get('size')
+                    and remote_metadata['size'] >= config.DESCARGA_RANGOS_UMBRAL):
+                with instrumentacion.fase('descarga_rangos', csv_key) as medida:
+                    completa = self._download_in_ranges(file_name, remote_metadata)
+                    medida['bytes'] = remote_metadata['size'] if completa else None
+                    medida['error'] = None if completa else 'descarga_incompleta'
+                if completa:
+                    self._save_cache_metadata(file_name, remote_metadata)
+                    return self._read_csv(file_name, self._load_from_cache(file_name), encoding=encoding,
+                                          row_filter=row_filter, schema=schema, **kwargs)
+            
+            # Archivos grandes: descarga y parseo por bloques en una sola pasada
+            if csv_key in config.ARCHIVOS_STREAMING:
+                with instrumentacion.fase('descarga_parseo', csv_key) as medida:
+                    df = self._stream_csv_from_sharepoint(file_name, encoding=encoding,
+                                                         row_filter=row_filter, schema=schema, **kwargs)
+                    if df is not None:
+                        medida['bytes'] = df.attrs.get('bytes_descargados')
+                        medida['filas'] = len(df)
+                    else:
+                        medida['error'] = 'descarga_fallida'
+                if df is not None:
+                    if remote_metadata:
+                        self._save_cache_metadata(file_name, remote_metadata)
+                    return df
+            
+            with instrumentacion.fase('descarga', csv_key) as medida:
+                file_content = self._download_file_from_sharepoint(file_name)
+                if file_content is not None:
+                    medida['bytes'] = file_content.getbuffer().nbytes
+                else:
+                    medida['error'] = 'descarga_fallida'
             
             if file_content:
-                # Guardar en cache
+                # Guardar en cache junto con los metadatos de la versión descargada
                 self._save_to_cache(file_name, file_content)
+                if remote_metadata:
+                    self._save_cache_metadata(file_name, remote_metadata)
                 
-                # Leer CSV
-                return pd.read_csv(file_content, encoding=encoding, **kwargs)
+                # Leer CSV (desde el cache si se guardó, para alimentar el cache columnar)
+                cache_path = self._load_from_cache(file_name)
+                if cache_path:
+                    return self._read_csv(file_name, cache_path, encoding=encoding,
+                                          row_filter=row_filter, schema=schema, **kwargs)
+                return self._parse_in_chunks(file_content, encoding=encoding, row_filter=row_filter,
+                                             schema=schema, **kwargs)
         
         # Fallback: intentar cargar desde cache
         cache_path = self._load_from_cache(file_name)
         if cache_path:
             print(f"📂 Cargando {file_name} desde cache...")
-            return pd.read_csv(cache_path, encoding=encoding, **kwargs)
+            return self._read_csv(file_name, cache_path, encoding=encoding, row_filter=row_filter,
+                                  schema=schema, **kwargs)
         
         # Fallback final: archivo local
         print(f"📁 Cargando {file_name} desde archivo local...")
-        return pd.read_csv(file_name, encoding=encoding, **kwargs)
+        return self._read_csv(file_name, file_name, encoding=encoding, row_filter=row_filter,
+                              schema=schema, **kwargs)
+    
+    def load_many(self, csv_specs, encoding='utf-8', max_workers=None):
+        """
+        Cargar varios archivos CSV en paralelo
+        
+        Las descargas y el parseo de cada archivo se ejecutan en un pool de
+        hilos que comparte la sesión HTTP (y su pool de conexiones), de modo
+        que el tiempo total queda dominado por el archivo más grande.
+        
+        Args:
+            csv_specs: Lista de claves de config.ARCHIVOS_CSV, o tuplas
+                (clave, kwargs) con argumentos específicos para pd.read_csv
+            encoding: Encoding por defecto de los archivos
+            max_workers: Número máximo de cargas simultáneas
+        
+        Returns:
+            Diccionario {clave: DataFrame}
+        """
+        specs = []
+        for spec in csv_specs:
+            if isinstance(spec, str):
+                specs.append((spec, {}))
+            else:
+                csv_key, kwargs = spec
+                specs.append((csv_key, dict(kwargs)))
+        
+        if max_workers is None:
+            max_workers = config.MAX_CARGAS_PARALELAS
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='carga_csv') as executor:
+            futures = {
+                csv_key: executor.submit(self.load_csv, csv_key, **{'encoding': encoding, **kwargs})
+                for csv_key, kwargs in specs
+            }
+            # result() relanza la excepción de la carga que haya fallado
+            return {csv_key: future.result() for csv_key, future in futures.items()}
+    
+    def memory_report(self):
+        """
+        Reporte de memoria por columna de los archivos parseados en este proceso
+        
+        Returns:
+            DataFrame indexado por (archivo, columna) con MB antes/después de
+            aplicar el esquema y el porcentaje de ahorro
+        """
+        if not self.memory_reports:
+            return pd.DataFrame(columns=['mb_antes', 'mb_despues', 'ahorro_pct'])
+        return pd.concat(self.memory_reports, names=['archivo', 'columna'])
+    
+    def transport_report(self):
+        """
+        Solicitudes HTTP, reintentos y segundos de espera de la última carga de cada archivo
+        
+        Returns:
+            DataFrame indexado por archivo
+        """
+        return pd.DataFrame.from_dict(
+            self.transport.metricas, orient='index',
+            columns=['solicitudes', 'reintentos', 'espera_segundos']
+        ).rename_axis('archivo')
 
 
 # Instancia global del loader
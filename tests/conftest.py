@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Configuración común de las pruebas (python -m pytest desde la raíz del repositorio)"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servidor_rangos import ServidorRangos  # noqa: E402
+
+
+@pytest.fixture
+def servidor():
+    """Servidor HTTP local con soporte de Range que hace de SharePoint"""
+    servidor = ServidorRangos()
+    yield servidor
+    servidor.cerrar()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor HTTP local que reemplaza a SharePoint en las pruebas
+Sirve archivos en memoria con soporte de Range (respuestas 206 con
+Content-Range), registra cada solicitud y puede simular los fallos que
+interesan: un servidor que ignora Range (200 completo), respuestas que se
+cortan a mitad del cuerpo o errores 503
+"""
+
+import re
+import sys
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, formato, *args):
+        pass
+    
+    def do_GET(self):
+        estado = self.server.estado
+        nombre = self.path.lstrip('/')
+        rango = self.headers.get('Range')
+        with estado.lock:
+            estado.solicitudes.append((nombre, rango))
+            contenido = estado.archivos.get(nombre)
+        
+        if contenido is None:
+            self._responder(404, b'no existe')
+            return
+        
+        coincide = re.fullmatch(r'bytes=(\d+)-(\d*)', rango or '')
+        if coincide is None or estado.ignorar_rangos:
+            self._responder(200, contenido)
+            return
+        
+        inicio = int(coincide.group(1))
+        fin = min(int(coincide.group(2) or len(contenido) - 1), len(contenido) - 1)
+        if inicio >= len(contenido):
+            self._responder(416, b'', {'Content-Range': f'bytes */{len(contenido)}'})
+            return
+        
+        if estado.fallar_desde is not None and inicio >= estado.fallar_desde:
+            self._responder(503, b'no disponible')
+            return
+        
+        cuerpo = contenido[inicio:fin + 1]
+        encabezados = {'Content-Range': f'bytes {inicio}-{fin}/{len(contenido)}'}
+        if estado.cortar_desde is not None and inicio >= estado.cortar_desde:
+            # Conexión que se cae a mitad del cuerpo (Content-Length completo)
+            self._responder(206, cuerpo[:len(cuerpo) // 2], encabezados, largo=len(cuerpo))
+            self.close_connection = True
+            return
+        self._responder(206, cuerpo, encabezados)
+    
+    def _responder(self, codigo, cuerpo, encabezados=None, largo=None):
+        self.send_response(codigo)
+        for clave, valor in (encabezados or {}).items():
+            self.send_header(clave, valor)
+        self.send_header('Content-Length', str(len(cuerpo) if largo is None else largo))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+        self.wfile.flush()
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Los clientes que abandonan una respuesta (rango rechazado) cierran la conexión
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class ServidorRangos:
+    """
+    Servidor en un hilo sobre 127.0.0.1 (puerto libre)
+    
+    - archivos: {nombre: bytes} que se sirven en /<nombre>
+    - solicitudes: lista de (nombre, header Range o None) en orden de llegada
+    - ignorar_rangos: responder 200 con el archivo completo aunque se pida Range
+    - cortar_desde: cortar a la mitad las respuestas de rangos que empiezan
+      en este byte o después
+    - fallar_desde: responder 503 a los rangos que empiezan en este byte o después
+    """
+    
+    def __init__(self):
+        self.archivos = {}
+        self.solicitudes = []
+        self.ignorar_rangos = False
+        self.cortar_desde = None
+        self.fallar_desde = None
+        self.lock = threading.Lock()
+        self._servidor = _Servidor(('127.0.0.1', 0), _Manejador)
+        self._servidor.estado = self
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+    
+    def url(self, nombre):
+        return f'http://127.0.0.1:{self._servidor.server_port}/{nombre}'
+    
+    def metadatos(self, nombre):
+        """Metadatos como los de un driveItem de Graph (el eTag cambia con el contenido)"""
+        contenido = self.archivos[nombre]
+        huella = hashlib.sha1(contenido).hexdigest()
+        return {
+            'eTag': f'"{huella}"',
+            'cTag': f'"c:{huella}"',
+            'size': len(contenido),
+            'lastModifiedDateTime': huella,
+            'quickXorHash': None,
+        }
+    
+    def rangos_pedidos(self, nombre=None):
+        """Headers Range de las solicitudes (de un archivo), sin las que no pidieron Range"""
+        return [rango for archivo, rango in self.solicitudes if rango and nombre in (None, archivo)]
+    
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
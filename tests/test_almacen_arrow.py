@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén Arrow compartido (almacen_arrow.AlmacenArrow): publicación, reserva
+de construcción entre procesos e índice de documentos abierto con memory-map
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+import indices
+from almacen_arrow import AlmacenArrow
+from benchmarks.datos_sinteticos import generar
+from conjunto_datos import construir_conjunto_datos
+from sharepoint_loader import SharePointLoader
+
+
+@pytest.fixture(scope='module')
+def directorio_datos(tmp_path_factory):
+    directorio = tmp_path_factory.mktemp('datos')
+    generar(str(directorio), escala=0.002, semilla=1)
+    return directorio
+
+
+@pytest.fixture
+def loader(directorio_datos, monkeypatch):
+    """Loader sobre los CSV sintéticos locales"""
+    monkeypatch.chdir(directorio_datos)
+    monkeypatch.setattr(config, 'USE_SHAREPOINT', False)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(directorio_datos / 'cache'))
+    monkeypatch.setattr(config, 'MEDIR_MEMORIA_CARGA', False)
+    monkeypatch.setattr(config, 'INSTRUMENTACION', False)
+    return SharePointLoader()
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenArrow(str(tmp_path / 'almacen'))
+
+
+def documentos_de_prueba(conjunto):
+    """Documentos existentes (incluidos repetidos) y otros que no existen"""
+    documentos = conjunto.indice_pacientes.pacientes['IDE_PAC'].astype(str)
+    return list(documentos.iloc[::7]) + list(documentos.iloc[:3]) + ['no-existe', '', documentos.iloc[0] + '0']
+
+
+def test_version_abierta_busca_documentos_igual_que_la_construida(loader, almacen):
+    privado = construir_conjunto_datos(loader, version='v1')
+    almacen.publicar(privado)
+    abierto = almacen.abrir('v1')
+    
+    documentos = documentos_de_prueba(privado)
+    pd.testing.assert_frame_equal(
+        abierto.indice_pacientes.buscar_documentos(documentos).astype(str),
+        privado.indice_pacientes.buscar_documentos(documentos).astype(str),
+    )
+    for documento in documentos:
+        assert abierto.indice_pacientes.id_paciente(documento) == privado.indice_pacientes.id_paciente(documento)
+    
+    # La primera aparición de cada documento, como resultado.iloc[0]
+    pacientes = privado.indice_pacientes.pacientes
+    for documento in documentos[:20]:
+        esperado = pacientes[pacientes['IDE_PAC'].astype(str) == documento]
+        fila = abierto.indice_pacientes.buscar_documento(documento)
+        assert (fila is None) == esperado.empty
+        if fila is not None:
+            assert fila['ID_PACIENTE'] == esperado['ID_PACIENTE'].iat[0]
+
+
+def test_documentos_con_el_mismo_hash(loader, monkeypatch):
+    # Todos los documentos colisionan: se resuelven comparando el texto
+    monkeypatch.setattr(indices, '_hash_documentos', lambda documentos: np.zeros(len(documentos), dtype=np.uint64))
+    conjunto = construir_conjunto_datos(loader, version='v1')
+    pacientes = conjunto.indice_pacientes.pacientes
+    
+    for posicion in (0, len(pacientes) // 2, len(pacientes) - 1):
+        documento = str(pacientes['IDE_PAC'].iat[posicion])
+        primera = np.flatnonzero(pacientes['IDE_PAC'].astype(str).to_numpy() == documento)[0]
+        assert conjunto.indice_pacientes.id_paciente(documento) == pacientes['ID_PACIENTE'].iat[primera]
+    assert conjunto.indice_pacientes.id_paciente('no-existe') is None
+
+
+def test_error_al_publicar_devuelve_la_version_construida(loader, almacen, monkeypatch):
+    def sin_espacio(*args, **kwargs):
+        raise OSError(28, 'No queda espacio en el dispositivo')
+    monkeypatch.setattr('almacen_arrow._escribir_tabla', sin_espacio)
+    
+    conjunto = almacen.construir(loader, 'v1')
+    assert conjunto.version == 'v1'
+    assert conjunto.indice_pacientes.id_paciente('no-existe') is None
+    assert almacen.version_actual() is None
+    # No quedan directorios temporales a medio escribir
+    assert os.listdir(almacen.directorio) == []
+
+
+def test_reserva_con_latidos_no_se_considera_abandonada(almacen, monkeypatch):
+    monkeypatch.setattr(config, 'ALMACEN_ARROW_LATIDO_SEGUNDOS', 0.05)
+    monkeypatch.setattr(config, 'ALMACEN_ARROW_RESERVA_ABANDONADA_SEGUNDOS', 0.3)
+    reserva = almacen._version_path('v1') + '.lock'
+    
+    with almacen.construccion('v1') as propia:
+        assert propia
+        # Una construcción más larga que el límite de abandono sigue reservada
+        time.sleep(0.6)
+        assert time.time() - os.path.getmtime(reserva) < 0.3
+        with almacen.construccion('v1') as otra:
+            assert not otra
+    assert not os.path.exists(reserva)
+
+
+def test_reserva_abandonada_se_toma(almacen, monkeypatch):
+    monkeypatch.setattr(config, 'ALMACEN_ARROW_RESERVA_ABANDONADA_SEGUNDOS', 60)
+    reserva = almacen._version_path('v1') + '.lock'
+    os.makedirs(almacen.directorio)
+    with open(reserva, 'w', encoding='ascii') as f:
+        f.write('999999')
+    antes = time.time() - 120
+    os.utime(reserva, (antes, antes))
+    
+    with almacen.construccion('v1') as propia:
+        assert propia
+        with open(reserva, 'r', encoding='ascii') as f:
+            assert f.read() == str(os.getpid())
+    assert not os.path.exists(reserva)
+
+
+def test_reserva_tomada_por_otro_proceso_no_se_elimina(almacen):
+    reserva = almacen._version_path('v1') + '.lock'
+    
+    with almacen.construccion('v1') as propia:
+        assert propia
+        # Otro proceso la dio por abandonada y la tomó
+        with open(reserva, 'w', encoding='ascii') as f:
+            f.write('999999')
+    
+    with open(reserva, 'r', encoding='ascii') as f:
+        assert f.read() == '999999'
+
+
+def test_version_abierta_conserva_los_tipos_de_la_construida(loader, almacen):
+    privado = construir_conjunto_datos(loader, version='v1')
+    almacen.publicar(privado)
+    abierto = almacen.abrir('v1')
+    
+    for nombre, (construida, abierta) in {
+        'actividades': (privado.actividades, abierto.actividades),
+        'pacientes': (privado.indice_pacientes.pacientes, abierto.indice_pacientes.pacientes),
+        'tabla': (privado.indice_actividades.tabla, abierto.indice_actividades.tabla),
+    }.items():
+        assert abierta.dtypes.to_dict() == construida.dtypes.to_dict(), nombre
+    assert abierto.indice_pacientes.pacientes['IDE_PAC'].dtype == pd.api.types.pandas_dtype(config.ESQUEMAS['DAT_PER']['IDE_PAC'])
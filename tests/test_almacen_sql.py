@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backend SQL (almacen_sql.AlmacenSQL): el cubo de actividades contado en la
+base es igual al que se construye en memoria
+"""
+
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+from almacen_sql import AlmacenSQL, DUCKDB_AVAILABLE
+from almacen_versiones import AlmacenVersiones
+from benchmarks.datos_sinteticos import generar
+from conjunto_datos import construir_conjunto_datos
+from sharepoint_loader import SharePointLoader
+
+
+FILAS_VACIAS = 100
+
+MOTORES = [
+    'sqlite',
+    pytest.param('duckdb', marks=pytest.mark.skipif(not DUCKDB_AVAILABLE, reason='duckdb no está instalado')),
+]
+
+
+@pytest.fixture(scope='module')
+def directorio_datos(tmp_path_factory):
+    directorio = tmp_path_factory.mktemp('datos')
+    generar(str(directorio), escala=0.002, semilla=1)
+    
+    # Casos que los datos sintéticos no tienen: paciente repetido en DAT_PER
+    # (cuenta el primer registro), factura repetida en CAB_FAC (cuenta la
+    # primera fila), paciente sin sexo, atenciones sin factura ni fecha y de
+    # un paciente que no está en DAT_PER
+    actividad = pd.read_csv(directorio / 'ACTXPROG_filtrado.csv')['ID_ACTXPROG'].iloc[0]
+    # FEC_NAC vacía en las primeras FILAS_VACIAS filas de DAT_PER (el primer bloque de la ingesta)
+    lineas = (directorio / 'DAT_PER.csv').read_text(encoding='utf-8').splitlines(keepends=True)
+    for i in range(1, FILAS_VACIAS + 1):
+        campos = lineas[i].split(',')
+        campos[8] = ''
+        lineas[i] = ','.join(campos)
+    (directorio / 'DAT_PER.csv').write_text(''.join(lineas), encoding='utf-8')
+    with open(directorio / 'DAT_PER.csv', 'a', encoding='utf-8') as f:
+        f.write("1,900000001,CC,ANA,,PEREZ,,F,1990-01-01,3000000000\n")
+        f.write("5001,900000002,CC,LUIS,,GOMEZ,,,1985-05-05,3000000001\n")
+    with open(directorio / 'CAB_FAC.csv', 'a', encoding='utf-8') as f:
+        f.write("1,FE000000001,2019-06-01 10:00:00,1,1,0,0,0,F,CAJA01,2019-06-01 10:00:00,REPETIDA\n")
+    with open(directorio / 'HISTORICO_PYP.csv', 'a', encoding='utf-8') as f:
+        f.write(f"1,{actividad},,2016-03-01\n")
+        f.write(f"5001,{actividad},,\n")
+        f.write(f"5001,{actividad},1,2016-03-01\n")
+        f.write(f"9999,{actividad},1,2016-03-01\n")
+    return directorio
+
+
+@pytest.fixture
+def loader(directorio_datos, monkeypatch):
+    """Loader sobre los CSV sintéticos locales"""
+    monkeypatch.chdir(directorio_datos)
+    monkeypatch.setattr(config, 'USE_SHAREPOINT', False)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(directorio_datos / 'cache'))
+    monkeypatch.setattr(config, 'MEDIR_MEMORIA_CARGA', False)
+    monkeypatch.setattr(config, 'INSTRUMENTACION', False)
+    monkeypatch.setattr(config, 'BACKEND_SQL_FILAS_BLOQUE', FILAS_VACIAS)
+    return SharePointLoader()
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_cubo_contado_en_la_base_igual_al_de_memoria(loader, tmp_path, motor):
+    esperado = construir_conjunto_datos(loader, version='v1').cubo_actividades
+    cubo = AlmacenSQL(str(tmp_path / 'sql'), motor=motor).construir(loader, 'v1').cubo_actividades
+    
+    assert cubo.filas == esperado.filas
+    assert cubo.sexos == esperado.sexos
+    pd.testing.assert_frame_equal(cubo.por_actividad(), esperado.por_actividad())
+    for id_actividad in [None] + esperado.por_actividad()['ID_ACTPYP'].tolist():
+        pd.testing.assert_frame_equal(cubo.por_mes(id_actividad), esperado.por_mes(id_actividad))
+        pd.testing.assert_frame_equal(cubo.por_sexo(id_actividad), esperado.por_sexo(id_actividad))
+
+
+@pytest.mark.parametrize('motor', MOTORES)
+def test_columna_vacia_en_el_primer_bloque_conserva_su_tipo(loader, tmp_path, motor):
+    privado = construir_conjunto_datos(loader, version='v1').indice_pacientes
+    conjunto = AlmacenSQL(str(tmp_path / 'sql'), motor=motor).construir(loader, 'v1')
+    
+    for posicion in (0, FILAS_VACIAS, len(privado.pacientes) - 3):
+        documento = privado.pacientes['IDE_PAC'].iloc[posicion]
+        esperado = privado.buscar_documento(documento)
+        paciente = conjunto.indice_pacientes.buscar_documento(documento)
+        assert paciente['ID_PACIENTE'] == esperado['ID_PACIENTE']
+        assert paciente['FEC_NAC'] == (None if pd.isna(esperado['FEC_NAC']) else esperado['FEC_NAC'])
+
+
+def test_almacen_sin_metodos_abstractos_falla_al_crearse(tmp_path):
+    class Incompleto(AlmacenVersiones):
+        def _version_path(self, version):
+            return str(tmp_path / version)
+    
+    with pytest.raises(TypeError):
+        Incompleto(str(tmp_path))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabla materializada de atenciones (indices.construir_atenciones)
+"""
+
+import numpy as np
+import pandas as pd
+
+from indices import construir_atenciones
+
+
+def datos():
+    historico = pd.DataFrame({
+        'ID_PACIENTE': [1, 2, 1, 3, 2, 4],
+        'ID_ACTPYP': [10, 10, 20, 99, 20, 10],
+        'IDCAB_FAC': pd.array([100, 101, None, 102, None, 999], dtype='Int32'),
+        'FECHA': pd.to_datetime(['2020-01-01', '2020-02-01', '2020-03-01', '2020-04-01', None, '2020-06-01']),
+        'OTRA': ['a', 'b', 'c', 'd', 'e', 'f'],
+    })
+    cab_fac = pd.DataFrame({
+        'IDCAB_FAC': pd.array([100, 101, 102, 103], dtype='Int32'),
+        'FAC_FEC': pd.to_datetime(['2021-05-01', None, '2021-01-01', '2021-03-01']),
+        'NUM_FAC': ['F1', 'F2', 'F3', 'F4'],
+    })
+    # Actividad 10 repetida en el catálogo: cuenta la primera descripción
+    actividades = pd.DataFrame({
+        'ID_ACTXPROG': [10, 20, 10],
+        'DES_ACTXPROG': ['CONSULTA', 'VACUNA', 'OTRA DESCRIPCION'],
+    })
+    return historico, cab_fac, actividades
+
+
+def test_solo_actividades_del_catalogo_unidas_con_su_fecha():
+    atenciones = construir_atenciones(*datos())
+    
+    assert list(atenciones.columns) == ['ID_PACIENTE', 'ID_ACTPYP', 'IDCAB_FAC', 'FECHA', 'FAC_FEC',
+                                        'DES_ACTXPROG', 'FECHA_ATENCION']
+    # Sin la actividad 99 (fuera del catálogo); la factura 999 no existe
+    por_paciente = atenciones.set_index(['ID_PACIENTE', 'ID_ACTPYP'])
+    assert len(atenciones) == 5
+    assert 99 not in atenciones['ID_ACTPYP'].tolist()
+    assert (atenciones['DES_ACTXPROG'] == atenciones['ID_ACTPYP'].map({10: 'CONSULTA', 20: 'VACUNA'})).all()
+    
+    # FAC_FEC si la factura la tiene; si no, FECHA del histórico
+    assert por_paciente.loc[(1, 10), 'FECHA_ATENCION'] == pd.Timestamp('2021-05-01')
+    assert por_paciente.loc[(2, 10), 'FECHA_ATENCION'] == pd.Timestamp('2020-02-01')
+    assert por_paciente.loc[(1, 20), 'FECHA_ATENCION'] == pd.Timestamp('2020-03-01')
+    assert por_paciente.loc[(4, 10), 'FECHA_ATENCION'] == pd.Timestamp('2020-06-01')
+
+
+def test_ordenada_por_fecha_descendente_y_sin_fecha_al_final():
+    atenciones = construir_atenciones(*datos())
+    
+    fechas = atenciones['FECHA_ATENCION']
+    assert fechas.iloc[:-1].is_monotonic_decreasing
+    assert pd.isna(fechas.iloc[-1])
+    assert atenciones.index.equals(pd.RangeIndex(len(atenciones)))
+
+
+def test_igual_que_filtrar_y_unir_en_cada_consulta():
+    # La tabla precalculada filtrada por paciente da lo mismo que unir por consulta
+    historico, cab_fac, actividades = datos()
+    atenciones = construir_atenciones(historico, cab_fac, actividades)
+    
+    for id_paciente in historico['ID_PACIENTE'].unique():
+        consulta = historico[historico['ID_PACIENTE'] == id_paciente].merge(
+            cab_fac[['IDCAB_FAC', 'FAC_FEC']], on='IDCAB_FAC', how='left')
+        consulta = consulta[consulta['ID_ACTPYP'].isin(actividades['ID_ACTXPROG'])]
+        fechas = consulta['FAC_FEC'].fillna(consulta['FECHA']).sort_values(ascending=False)
+        
+        resultado = atenciones.loc[atenciones['ID_PACIENTE'] == id_paciente, 'FECHA_ATENCION']
+        np.testing.assert_array_equal(resultado.to_numpy(), fechas.to_numpy())
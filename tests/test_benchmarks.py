@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks: datos sintéticos reproducibles, formato de las
+mediciones y detección de regresiones al comparar dos ejecuciones
+"""
+
+import os
+
+import pytest
+
+import config_sharepoint as config
+from benchmarks import comparar, datos_sinteticos
+from benchmarks.ejecutar import medir, ejecutar_suite
+
+ESCALA = 0.0001
+
+
+def contenidos(directorio):
+    """{archivo: bytes} de los CSV generados"""
+    archivos = {}
+    for nombre in sorted(os.listdir(directorio)):
+        if nombre.endswith('.csv'):
+            with open(os.path.join(directorio, nombre), 'rb') as f:
+                archivos[nombre] = f.read()
+    return archivos
+
+
+def test_datos_sinteticos_reproducibles(tmp_path):
+    archivos = datos_sinteticos.generar(tmp_path / 'a', ESCALA, semilla=1)
+    datos_sinteticos.generar(tmp_path / 'b', ESCALA, semilla=1)
+    datos_sinteticos.generar(tmp_path / 'c', ESCALA, semilla=2)
+    
+    primeros = contenidos(tmp_path / 'a')
+    assert set(primeros) == set(archivos)
+    assert {nombre: len(datos) for nombre, datos in primeros.items()} == archivos
+    assert contenidos(tmp_path / 'b') == primeros
+    assert contenidos(tmp_path / 'c') != primeros
+
+
+def test_datos_sinteticos_no_se_regeneran_con_los_mismos_parametros(tmp_path):
+    datos_sinteticos.generar(tmp_path, ESCALA, semilla=1)
+    fechas = {nombre: os.path.getmtime(tmp_path / nombre) for nombre in contenidos(tmp_path)}
+    
+    datos_sinteticos.generar(tmp_path, ESCALA, semilla=1)
+    assert {nombre: os.path.getmtime(tmp_path / nombre) for nombre in fechas} == fechas
+    
+    # Otra semilla reemplaza los archivos
+    anteriores = contenidos(tmp_path)
+    datos_sinteticos.generar(tmp_path, ESCALA, semilla=3)
+    assert contenidos(tmp_path) != anteriores
+
+
+def test_medir():
+    llamadas = []
+    resultado = medir(lambda: llamadas.append('medida'), repeticiones=3,
+                      preparar=lambda: llamadas.append('preparada'), operaciones=4)
+    
+    # Tres ejecuciones cronometradas y una más para la memoria, cada una preparada
+    assert llamadas == ['preparada', 'medida'] * 4
+    assert resultado['repeticiones'] == 3 and resultado['operaciones'] == 4
+    segundos = resultado['segundos']
+    assert 0 <= segundos['min'] <= segundos['mediana'] <= segundos['max']
+    assert resultado['ms_por_operacion'] == pytest.approx(segundos['mediana'] * 1000 / 4)
+    assert resultado['memoria_pico_mb'] >= 0
+
+
+def ejecucion(**benchmarks):
+    return {'resultados': {
+        nombre: {'segundos': {'mediana': segundos}, 'memoria_pico_mb': mb}
+        for nombre, (segundos, mb) in benchmarks.items()
+    }}
+
+
+def test_comparar_detecta_regresiones_por_encima_del_umbral_y_del_ruido():
+    base = ejecucion(igual=(1.0, 100), lento=(1.0, 100), pesado=(1.0, 100), ruido=(0.0001, 0.1),
+                     solo_base=(1.0, 100), mejor=(2.0, 200))
+    nuevo = ejecucion(igual=(1.1, 110), lento=(1.3, 100), pesado=(1.0, 130), ruido=(0.0009, 0.9),
+                      solo_nuevo=(1.0, 100), mejor=(1.0, 100))
+    
+    filas = {fila[0]: fila for fila in comparar.comparar(base, nuevo, umbral=0.15)}
+    
+    # Solo se comparan los benchmarks de ambas ejecuciones
+    assert set(filas) == {'igual', 'lento', 'pesado', 'ruido', 'mejor'}
+    assert filas['lento'][1:5] == (1.0, 1.3, 100, 100)
+    assert {nombre for nombre, fila in filas.items() if fila[5]} == {'lento', 'pesado'}
+    assert not any(fila[5] for fila in comparar.comparar(base, nuevo, umbral=0.5))
+
+
+def test_suite_a_escala_minima(tmp_path, monkeypatch):
+    # La suite cambia la configuración global; monkeypatch la restaura
+    for nombre in ('USE_SHAREPOINT', 'CACHE_DIRECTORY', 'MEDIR_MEMORIA_CARGA'):
+        monkeypatch.setattr(config, nombre, getattr(config, nombre))
+    directorio = os.getcwd()
+    
+    resultado = ejecutar_suite(str(tmp_path), ESCALA, semilla=0, repeticiones=1, solo=['normalizar'])
+    
+    assert os.getcwd() == directorio
+    assert resultado['resultados']
+    assert all(nombre.startswith('normalizar') for nombre in resultado['resultados'])
+    # Comparada consigo misma no hay regresiones
+    assert not any(fila[5] for fila in comparar.comparar(resultado, resultado))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Búsqueda masiva por documentos (IndicePacientes.buscar_documentos): mismo
+resultado que buscar cada documento por separado
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices import IndicePacientes
+
+
+@pytest.fixture
+def indice():
+    aleatorio = np.random.default_rng(2)
+    pacientes = pd.DataFrame({
+        'ID_PACIENTE': pd.array(list(range(1, 100)) + [None], dtype='Int32'),
+        'IDE_PAC': [str(3_000_000 + i) for i in range(100)],
+        'COD_TID': 'CC',
+        'NOMBRE_COMPLETO': [f'PACIENTE {i}' for i in range(100)],
+        'SEX_PAC': aleatorio.choice(['F', 'M'], 100),
+    })
+    # Documento repetido: cuenta el primer registro
+    pacientes.loc[50, 'IDE_PAC'] = pacientes.loc[40, 'IDE_PAC']
+    
+    cantidad = 600
+    atenciones = pd.DataFrame({
+        # Los pacientes 90 a 99 no tienen atenciones
+        'ID_PACIENTE': aleatorio.integers(1, 90, cantidad).astype(np.int32),
+        'ID_ACTPYP': aleatorio.integers(1, 10, cantidad).astype(np.int32),
+        'DES_ACTXPROG': 'ACTIVIDAD',
+        'FECHA_ATENCION': pd.Timestamp('2021-01-01') + pd.to_timedelta(aleatorio.integers(0, 300, cantidad), unit='D'),
+        'IDCAB_FAC': pd.array(np.arange(cantidad), dtype='Int32'),
+    }).sort_values('FECHA_ATENCION', ascending=False, kind='stable').reset_index(drop=True)
+    return IndicePacientes(pacientes, atenciones)
+
+
+def buscar_uno_a_uno(indice, documento):
+    """(ESTADO, ID_PACIENTE, facturas) buscando el documento solo"""
+    fila = indice.buscar_documento(documento)
+    if fila is None:
+        return 'No encontrado', None, []
+    if pd.isna(fila['ID_PACIENTE']):
+        return 'Sin atenciones', None, []
+    facturas = indice.atenciones_paciente(fila['ID_PACIENTE'])['IDCAB_FAC'].tolist()
+    return ('Encontrado' if facturas else 'Sin atenciones'), int(fila['ID_PACIENTE']), facturas
+
+
+def test_igual_que_buscar_cada_documento(indice):
+    documentos = [str(3_000_000 + i) for i in range(0, 100, 3)]
+    documentos += ['3000040', ' 3000005 ', 'no-existe', '3000099', '3000095', '3000001', 3000002]
+    
+    resultado = indice.buscar_documentos(documentos)
+    
+    # Una fila por atención, en el orden de la lista (también los repetidos)
+    buscados = pd.Series(documentos, dtype=object).astype(str).str.strip()
+    assert resultado['DOCUMENTO_BUSCADO'].drop_duplicates().tolist() == buscados.drop_duplicates().tolist()
+    inicio = 0
+    for documento in buscados:
+        estado, id_paciente, facturas = buscar_uno_a_uno(indice, documento)
+        filas = resultado.iloc[inicio:inicio + max(len(facturas), 1)]
+        inicio += len(filas)
+        
+        assert (filas['DOCUMENTO_BUSCADO'] == documento).all()
+        assert (filas['ESTADO'] == estado).all(), documento
+        if id_paciente is None:
+            assert filas['ID_PACIENTE'].isna().all()
+        else:
+            assert (filas['ID_PACIENTE'] == id_paciente).all()
+        if facturas:
+            assert filas['IDCAB_FAC'].tolist() == facturas
+        else:
+            assert filas['IDCAB_FAC'].isna().all()
+    assert inicio == len(resultado)
+
+
+def test_lista_vacia(indice):
+    resultado = indice.buscar_documentos([])
+    assert resultado.empty
+    assert {'DOCUMENTO_BUSCADO', 'ESTADO', 'ID_PACIENTE', 'IDCAB_FAC'} <= set(resultado.columns)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache columnar (Parquet) de los CSV ya parseados: se reutiliza mientras el
+CSV no cambie y se invalida cuando cambia
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+from sharepoint_loader import SharePointLoader
+
+ARCHIVO = 'CAB_FAC.csv'
+
+
+def escribir_facturas(path, ids):
+    pd.DataFrame({
+        'IDCAB_FAC': ids,
+        'NUM_FAC': [f'FE{i:09d}' for i in ids],
+        'FAC_FEC': [f'2024-01-{i % 28 + 1:02d} 10:00:00' for i in ids],
+    }).to_csv(path, index=False)
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    """Loader sobre un CAB_FAC.csv local, con cache columnar en tmp_path/cache"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'USE_SHAREPOINT', False)
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_COLUMNAR', True)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    escribir_facturas(tmp_path / ARCHIVO, list(range(1, 101)))
+    return SharePointLoader()
+
+
+@pytest.fixture
+def parseos(monkeypatch):
+    """Lista con una entrada por cada vez que se parsea CAB_FAC.csv"""
+    llamadas = []
+    read_csv = pd.read_csv
+    
+    def contar(fuente, *args, **kwargs):
+        if str(fuente).endswith(ARCHIVO):
+            llamadas.append(fuente)
+        return read_csv(fuente, *args, **kwargs)
+    monkeypatch.setattr(pd, 'read_csv', contar)
+    return llamadas
+
+
+def test_segunda_carga_desde_el_cache_columnar(loader, parseos):
+    primera = loader.load_csv('CAB_FAC')
+    segunda = loader.load_csv('CAB_FAC')
+    
+    assert len(parseos) == 1
+    assert os.path.exists(os.path.join(config.CACHE_DIRECTORY, ARCHIVO + config.CACHE_COLUMNAR_SUFFIX))
+    pd.testing.assert_frame_equal(segunda, primera)
+
+
+def test_columnas_de_un_cache_completo_sin_parsear(loader, parseos):
+    completo = loader.load_csv('CAB_FAC')
+    columnas = loader.load_csv('CAB_FAC', usecols=['IDCAB_FAC', 'FAC_FEC'])
+    
+    assert len(parseos) == 1
+    pd.testing.assert_frame_equal(columnas, completo[['IDCAB_FAC', 'FAC_FEC']])
+
+
+def test_csv_modificado_invalida_el_cache(loader, parseos, tmp_path):
+    assert len(loader.load_csv('CAB_FAC')) == 100
+    
+    escribir_facturas(tmp_path / ARCHIVO, list(range(1, 151)))
+    df = loader.load_csv('CAB_FAC')
+    
+    assert len(parseos) == 2
+    assert df['IDCAB_FAC'].tolist() == list(range(1, 151))
+
+
+def test_otro_filtro_de_filas_no_parsea_de_nuevo(loader, parseos):
+    # El histórico crece y referencia facturas nuevas: CAB_FAC no cambió
+    antes = loader.load_csv('CAB_FAC', usecols=['IDCAB_FAC', 'FAC_FEC'], row_filter=('IDCAB_FAC', [3, 1, 2]))
+    despues = loader.load_csv('CAB_FAC', usecols=['IDCAB_FAC', 'FAC_FEC'],
+                              row_filter=('IDCAB_FAC', [3, 1, 2, 50, 999]))
+    
+    assert len(parseos) == 1
+    assert antes['IDCAB_FAC'].tolist() == [1, 2, 3]
+    assert despues['IDCAB_FAC'].tolist() == [1, 2, 3, 50]
+    completo = loader.load_csv('CAB_FAC', usecols=['IDCAB_FAC', 'FAC_FEC'])
+    pd.testing.assert_frame_equal(despues, completo[completo['IDCAB_FAC'].isin([1, 2, 3, 50])].reset_index(drop=True))
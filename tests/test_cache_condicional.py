@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descarga condicional (SharePointLoader.load_csv): el archivo solo se descarga
+si sus metadatos en SharePoint (eTag, cTag, tamaño, fecha) cambiaron
+"""
+
+import io
+import os
+import time
+import hashlib
+
+import pytest
+
+import config_sharepoint as config
+from sharepoint_loader import SharePointLoader
+
+ARCHIVO = config.ARCHIVOS_CSV['ACTXPROG']
+
+
+class SharePointFalso:
+    """Archivos en memoria con metadatos como los de un driveItem de Graph"""
+    
+    def __init__(self):
+        self.archivos = {}
+        self.descargas = []
+        self.metadatos_disponibles = True
+    
+    def metadatos(self, nombre):
+        if not self.metadatos_disponibles:
+            return None
+        huella = hashlib.sha1(self.archivos[nombre]).hexdigest()
+        return {'eTag': f'"{huella}"', 'cTag': f'"c:{huella}"', 'size': len(self.archivos[nombre]),
+                'lastModifiedDateTime': huella}
+    
+    def descargar(self, nombre):
+        self.descargas.append(nombre)
+        return io.BytesIO(self.archivos[nombre])
+
+
+@pytest.fixture
+def sharepoint():
+    falso = SharePointFalso()
+    falso.archivos[ARCHIVO] = b'ID_ACTXPROG,DES_ACTXPROG\n1,CONSULTA\n2,VACUNA\n'
+    return falso
+
+
+@pytest.fixture
+def loader(sharepoint, tmp_path, monkeypatch):
+    """Loader ya autenticado cuyas solicitudes a Graph responde SharePointFalso"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'USE_SHAREPOINT', False)
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    loader = SharePointLoader()
+    loader.use_sharepoint = True
+    loader.access_token = 'token'
+    loader.token_expires_at = time.time() + 3600
+    loader.site_id, loader.drive_id = 'sitio', 'drive'
+    monkeypatch.setattr(loader, '_get_remote_metadata', sharepoint.metadatos)
+    monkeypatch.setattr(loader, '_download_file_from_sharepoint', sharepoint.descargar)
+    return loader
+
+
+def test_sin_cambios_se_carga_desde_el_cache(loader, sharepoint):
+    primera = loader.load_csv('ACTXPROG')
+    segunda = loader.load_csv('ACTXPROG')
+    
+    assert sharepoint.descargas == [ARCHIVO]
+    assert segunda.equals(primera)
+    with open(os.path.join(config.CACHE_DIRECTORY, ARCHIVO), 'rb') as f:
+        assert f.read() == sharepoint.archivos[ARCHIVO]
+
+
+def test_archivo_modificado_se_descarga_de_nuevo(loader, sharepoint):
+    loader.load_csv('ACTXPROG')
+    sharepoint.archivos[ARCHIVO] += b'3,CONTROL\n'
+    df = loader.load_csv('ACTXPROG')
+    
+    assert sharepoint.descargas == [ARCHIVO, ARCHIVO]
+    assert df['DES_ACTXPROG'].tolist() == ['CONSULTA', 'VACUNA', 'CONTROL']
+    # Y la siguiente carga vuelve a usar el cache
+    loader.load_csv('ACTXPROG')
+    assert len(sharepoint.descargas) == 2
+
+
+def test_cache_truncado_se_descarga_de_nuevo(loader, sharepoint):
+    loader.load_csv('ACTXPROG')
+    with open(os.path.join(config.CACHE_DIRECTORY, ARCHIVO), 'r+b') as f:
+        f.truncate(10)
+    
+    assert len(loader.load_csv('ACTXPROG')) == 2
+    assert len(sharepoint.descargas) == 2
+
+
+def test_sin_metadatos_no_se_confia_en_el_cache(loader, sharepoint):
+    loader.load_csv('ACTXPROG')
+    sharepoint.metadatos_disponibles = False
+    
+    loader.load_csv('ACTXPROG')
+    assert len(sharepoint.descargas) == 2
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga de varios CSV en paralelo (SharePointLoader.load_many)
+"""
+
+import io
+import time
+import hashlib
+import threading
+
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+from sharepoint_loader import SharePointLoader
+
+ARCHIVOS = {
+    'DAT_PER': b'ID_PACIENTE,IDE_PAC,COD_TID,NM1_PAC,SEX_PAC\n1,100,CC,ANA,F\n2,200,TI,LUIS,M\n',
+    'ACTXPROG': b'ID_ACTXPROG,DES_ACTXPROG\n1,CONSULTA\n2,VACUNA\n3,CONTROL\n',
+    'ACTXPROG_FILTRADO': b'ID_ACTXPROG,DES_ACTXPROG\n1,CONSULTA\n3,CONTROL\n',
+}
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    """Loader con SharePoint en memoria; cada descarga espera a las demás (barrera)"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, 'USE_SHAREPOINT', False)
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    contenidos = {config.ARCHIVOS_CSV[clave]: datos for clave, datos in ARCHIVOS.items()}
+    
+    def metadatos(nombre):
+        huella = hashlib.sha1(contenidos[nombre]).hexdigest()
+        return {'eTag': huella, 'cTag': huella, 'size': len(contenidos[nombre]), 'lastModifiedDateTime': huella}
+    
+    loader = SharePointLoader()
+    loader.use_sharepoint = True
+    loader.access_token = 'token'
+    loader.token_expires_at = time.time() + 3600
+    loader.site_id, loader.drive_id = 'sitio', 'drive'
+    loader.barrera = threading.Barrier(len(ARCHIVOS), timeout=10)
+    
+    def descargar(nombre):
+        loader.barrera.wait()
+        return io.BytesIO(contenidos[nombre])
+    
+    monkeypatch.setattr(loader, '_get_remote_metadata', metadatos)
+    monkeypatch.setattr(loader, '_download_file_from_sharepoint', descargar)
+    return loader
+
+
+def test_descargas_simultaneas_con_el_mismo_resultado(loader):
+    # La barrera solo se abre si las tres descargas están en curso a la vez
+    cargados = loader.load_many(['DAT_PER', 'ACTXPROG', ('ACTXPROG_FILTRADO', {'usecols': ['ID_ACTXPROG']})],
+                                max_workers=3)
+    
+    assert list(cargados) == ['DAT_PER', 'ACTXPROG', 'ACTXPROG_FILTRADO']
+    # Ya en el cache: cargarlos de a uno da lo mismo
+    loader.barrera = threading.Barrier(1)
+    for clave, df in cargados.items():
+        kwargs = {'usecols': ['ID_ACTXPROG']} if clave == 'ACTXPROG_FILTRADO' else {}
+        pd.testing.assert_frame_equal(df, loader.load_csv(clave, **kwargs))
+    assert cargados['ACTXPROG_FILTRADO'].columns.tolist() == ['ID_ACTXPROG']
+
+
+def test_error_de_una_carga_se_propaga(loader):
+    loader.barrera = threading.Barrier(1)
+    with pytest.raises(ValueError):
+        loader.load_many(['ACTXPROG', 'NO_CONFIGURADO'])
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descarga paralela y reanudable por rangos (descargas.DescargaPorRangos) contra
+un servidor HTTP local con soporte de Range, y QuickXorHash
+"""
+
+import os
+import json
+import base64
+import random
+import time
+
+import pytest
+import requests
+
+import config_sharepoint as config
+from descargas import DescargaPorRangos, quick_xor_hash
+from sharepoint_loader import SharePointLoader
+from transporte import TransporteHTTP
+
+ARCHIVO = 'CAB_FAC.csv'
+TAMANO_RANGO = 1000
+
+
+@pytest.fixture
+def contenido(servidor):
+    datos = random.Random(0).randbytes(10_500)
+    servidor.archivos[ARCHIVO] = datos
+    return datos
+
+
+@pytest.fixture
+def descarga(servidor, tmp_path, monkeypatch):
+    """Crear descargas del archivo del servidor hacia tmp_path/CAB_FAC.csv"""
+    monkeypatch.setattr(config, 'HTTP_REINTENTOS', 0)
+    monkeypatch.setattr(config, 'DESCARGA_RANGOS_REINTENTOS', 2)
+    monkeypatch.setattr(config, 'VERIFICAR_HASH_DESCARGA', True)
+    transporte = TransporteHTTP(requests.Session())
+    destino = str(tmp_path / ARCHIVO)
+    
+    def crear(size=None, quick_xor=None, version='v1'):
+        size = len(servidor.archivos[ARCHIVO]) if size is None else size
+        return DescargaPorRangos(transporte, servidor.url(ARCHIVO), destino, size, version=version,
+                                 quick_xor=quick_xor, range_size=TAMANO_RANGO, max_workers=3)
+    return crear
+
+
+def hash_de(tmp_path, datos):
+    path = tmp_path / 'referencia.bin'
+    path.write_bytes(datos)
+    return quick_xor_hash(str(path))
+
+
+def rangos(inicios, size):
+    return sorted(f'bytes={i}-{min(i + TAMANO_RANGO, size) - 1}' for i in inicios)
+
+
+def test_descarga_completa_y_verificada(servidor, contenido, descarga, tmp_path):
+    d = descarga(quick_xor=hash_de(tmp_path, contenido))
+    assert d.run()
+    
+    with open(d.destino, 'rb') as f:
+        assert f.read() == contenido
+    assert sorted(servidor.rangos_pedidos()) == rangos(range(0, len(contenido), TAMANO_RANGO), len(contenido))
+    assert not os.path.exists(d.part_path) and not os.path.exists(d.progress_path)
+
+
+def test_descarga_interrumpida_se_reanuda_sin_repetir_rangos(servidor, contenido, descarga):
+    # La conexión se corta en los rangos desde el byte 6000
+    servidor.cortar_desde = 6000
+    d = descarga()
+    assert not d.run()
+    assert not os.path.exists(d.destino)
+    
+    # Los rangos en curso cuando falló el de 6000 pueden haberse cancelado
+    with open(d.progress_path, 'r', encoding='utf-8') as f:
+        completados = json.load(f)['completed']
+    assert set(completados) <= set(range(6)) and completados
+    
+    servidor.cortar_desde = None
+    servidor.solicitudes.clear()
+    d = descarga()
+    assert d.run()
+    
+    faltantes = [i * TAMANO_RANGO for i in range(11) if i not in completados]
+    assert sorted(servidor.rangos_pedidos()) == rangos(faltantes, len(contenido))
+    with open(d.destino, 'rb') as f:
+        assert f.read() == contenido
+
+
+def test_errores_http_no_multiplican_los_reintentos_del_transporte(servidor, contenido, descarga,
+                                                                   monkeypatch):
+    monkeypatch.setattr(config, 'HTTP_REINTENTOS', 2)
+    monkeypatch.setattr(config, 'HTTP_BACKOFF_BASE_SEGUNDOS', 0)
+    servidor.fallar_desde = 6000
+    d = descarga()
+    assert not d.run()
+    
+    # Cada rango con 503 se pide 1 + HTTP_REINTENTOS veces (solo los reintentos
+    # del transporte), no además DESCARGA_RANGOS_REINTENTOS veces; los que
+    # quedaban cuando falló el primero ya no se piden
+    pedidos = servidor.rangos_pedidos()
+    assert pedidos.count(rangos([6000], len(contenido))[0]) == 3
+    for inicio in range(7000, len(contenido), TAMANO_RANGO):
+        assert pedidos.count(rangos([inicio], len(contenido))[0]) in (0, 3)
+    with open(d.progress_path, 'r', encoding='utf-8') as f:
+        assert set(json.load(f)['completed']) <= set(range(6))
+
+
+def test_primer_error_permanente_cancela_los_rangos_restantes(servidor, contenido, descarga):
+    servidor.fallar_desde = 3000
+    d = descarga()
+    assert not d.run()
+    
+    # Con 3 hilos, un rango desde el byte 6000 solo empieza cuando otro ya
+    # falló: ninguno se pide. Los rangos en curso pueden quedar sin terminar
+    assert all(pedido in rangos(range(0, 6000, TAMANO_RANGO), len(contenido))
+               for pedido in servidor.rangos_pedidos())
+    with open(d.progress_path, 'r', encoding='utf-8') as f:
+        assert set(json.load(f)['completed']) <= set(range(3))
+
+
+def test_otra_version_no_reanuda(servidor, contenido, descarga):
+    servidor.cortar_desde = 6000
+    assert not descarga(version='v1').run()
+    
+    servidor.cortar_desde = None
+    servidor.solicitudes.clear()
+    assert descarga(version='v2').run()
+    assert len(servidor.rangos_pedidos()) == 11
+
+
+@pytest.mark.parametrize('diferencia', [-500, 500])
+def test_tamano_distinto_no_reemplaza_el_cache(servidor, contenido, descarga, diferencia):
+    d = descarga(size=len(contenido) + diferencia)
+    with open(d.destino, 'wb') as f:
+        f.write(b'version anterior')
+    
+    assert not d.run()
+    with open(d.destino, 'rb') as f:
+        assert f.read() == b'version anterior'
+    assert not os.path.exists(d.part_path) and not os.path.exists(d.progress_path)
+
+
+def test_quickxorhash_distinto_no_reemplaza_el_cache(servidor, contenido, descarga, tmp_path):
+    d = descarga(quick_xor=hash_de(tmp_path, contenido[:-1] + b'x'))
+    with open(d.destino, 'wb') as f:
+        f.write(b'version anterior')
+    
+    assert not d.run()
+    with open(d.destino, 'rb') as f:
+        assert f.read() == b'version anterior'
+    assert not os.path.exists(d.part_path) and not os.path.exists(d.progress_path)
+
+
+def test_ruta_local_no_entrega_el_cache_anterior_si_la_descarga_falla(servidor, contenido, tmp_path,
+                                                                     monkeypatch):
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    monkeypatch.setattr(config, 'HTTP_REINTENTOS', 0)
+    monkeypatch.setattr(config, 'DESCARGA_RANGOS_REINTENTOS', 1)
+    monkeypatch.setattr(config, 'DESCARGA_RANGOS_TAMANO', TAMANO_RANGO)
+    loader = SharePointLoader()
+    loader.use_sharepoint = True
+    loader.access_token = 'token'
+    loader.token_expires_at = time.time() + 3600
+    loader.site_id, loader.drive_id = 'sitio', 'drive'
+    monkeypatch.setattr(loader, '_file_content_url', servidor.url)
+    monkeypatch.setattr(loader, '_get_remote_metadata', servidor.metadatos)
+    
+    assert loader.ruta_local('CAB_FAC') == os.path.join(config.CACHE_DIRECTORY, ARCHIVO)
+    
+    # Cambia en SharePoint y la descarga se corta: no se entrega la versión anterior
+    servidor.archivos[ARCHIVO] = contenido[::-1]
+    servidor.cortar_desde = 6000
+    with pytest.raises(IOError):
+        loader.ruta_local('CAB_FAC')
+    
+    servidor.cortar_desde = None
+    with open(loader.ruta_local('CAB_FAC'), 'rb') as f:
+        assert f.read() == contenido[::-1]
+
+
+def quick_xor_referencia(datos, bloque=97):
+    """
+    Traducción directa de la implementación de referencia de Microsoft (C#):
+    tres celdas de 64, 64 y 32 bits, byte a byte, alimentada por bloques
+    """
+    celdas = [0, 0, 0]
+    desplazamiento_total = 0
+    
+    for comienzo in range(0, len(datos), bloque):
+        arreglo = datos[comienzo:comienzo + bloque]
+        indice, posicion = desplazamiento_total // 64, desplazamiento_total % 64
+        for i in range(min(len(arreglo), 160)):
+            ultima = indice == 2
+            bits = 32 if ultima else 64
+            xor = 0
+            for j in range(i, len(arreglo), 160):
+                xor ^= arreglo[j]
+            celdas[indice] ^= (xor << posicion) & (2 ** 64 - 1)
+            if posicion > bits - 8:
+                celdas[0 if ultima else indice + 1] ^= xor >> (bits - posicion)
+            posicion += 11
+            while posicion >= bits:
+                indice = 0 if ultima else indice + 1
+                posicion -= bits
+        desplazamiento_total = (desplazamiento_total + 11 * (len(arreglo) % 160)) % 160
+    
+    resultado = bytearray(celdas[0].to_bytes(8, 'little') + celdas[1].to_bytes(8, 'little')
+                          + (celdas[2] & (2 ** 32 - 1)).to_bytes(4, 'little'))
+    for i, byte in enumerate(len(datos).to_bytes(8, 'little')):
+        resultado[12 + i] ^= byte
+    return base64.b64encode(bytes(resultado)).decode('ascii')
+
+
+@pytest.mark.parametrize('datos, esperado', [
+    (b'', 'AAAAAAAAAAAAAAAAAAAAAAAAAAA='),
+    (base64.b64decode('Sg=='), 'SgAAAAAAAAAAAAAAAQAAAAAAAAA='),
+    (base64.b64decode('tbQ='), 'taAFAAAAAAAAAAAAAgAAAAAAAAA='),
+])
+def test_quick_xor_hash_vectores_de_referencia(tmp_path, datos, esperado):
+    assert hash_de(tmp_path, datos) == esperado
+    assert quick_xor_referencia(datos) == esperado
+
+
+@pytest.mark.parametrize('largo', [1, 159, 160, 161, 321, 5000, 70_001])
+def test_quick_xor_hash_igual_a_la_referencia(tmp_path, largo):
+    datos = random.Random(largo).randbytes(largo)
+    path = tmp_path / 'datos.bin'
+    path.write_bytes(datos)
+    
+    esperado = quick_xor_referencia(datos)
+    assert quick_xor_hash(str(path)) == esperado
+    # Bloques de lectura más pequeños que el archivo (varios múltiplos de 160)
+    assert quick_xor_hash(str(path), block_size=1000) == esperado
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Descarga y parseo por bloques de CAB_FAC en una sola pasada
+(SharePointLoader._stream_csv_from_sharepoint) contra un servidor HTTP local
+"""
+
+import io
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+from sharepoint_loader import SharePointLoader, aplicar_esquema
+
+ARCHIVO = config.ARCHIVOS_CSV['CAB_FAC']
+
+
+def facturas(cantidad):
+    lineas = ['IDCAB_FAC,NUM_FAC,FAC_FEC,OBSERVACION']
+    for i in range(1, cantidad + 1):
+        fecha = '' if i % 11 == 0 else f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 08:{i % 60:02d}:00'
+        lineas.append(f'{i},FE{i:09d},{fecha},"texto, con coma {i}"')
+    return ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+@pytest.fixture
+def loader(servidor, tmp_path, monkeypatch):
+    """Loader conectado al servidor local, que parsea CAB_FAC por bloques de 7 filas"""
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_COLUMNAR', False)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    monkeypatch.setattr(config, 'ARCHIVOS_STREAMING', ['CAB_FAC'])
+    monkeypatch.setattr(config, 'STREAMING_CHUNK_ROWS', 7)
+    monkeypatch.setattr(config, 'STREAMING_BUFFER_BYTES', 64)
+    monkeypatch.setattr(config, 'DESCARGA_RANGOS_UMBRAL', 1 << 40)
+    monkeypatch.setattr(config, 'HTTP_REINTENTOS', 0)
+    servidor.archivos[ARCHIVO] = facturas(100)
+    
+    loader = SharePointLoader()
+    loader.use_sharepoint = True
+    loader.access_token = 'token'
+    loader.token_expires_at = time.time() + 3600
+    loader.site_id, loader.drive_id = 'sitio', 'drive'
+    monkeypatch.setattr(loader, '_file_content_url', servidor.url)
+    monkeypatch.setattr(loader, '_get_remote_metadata', servidor.metadatos)
+    return loader
+
+
+def leer_completo(contenido, **kwargs):
+    """Parseo de referencia: un solo read_csv del archivo completo"""
+    return aplicar_esquema(pd.read_csv(io.BytesIO(contenido), **kwargs), config.ESQUEMAS['CAB_FAC'])
+
+
+def test_por_bloques_igual_que_un_solo_read_csv(servidor, loader):
+    df = loader.load_csv('CAB_FAC')
+    
+    pd.testing.assert_frame_equal(df, leer_completo(servidor.archivos[ARCHIVO]))
+    # Una sola solicitud, sin Range, y el cache quedó con el archivo completo
+    assert servidor.solicitudes == [(ARCHIVO, None)]
+    with open(os.path.join(config.CACHE_DIRECTORY, ARCHIVO), 'rb') as f:
+        assert f.read() == servidor.archivos[ARCHIVO]
+    assert not os.path.exists(os.path.join(config.CACHE_DIRECTORY, ARCHIVO + '.part'))
+
+
+def test_columnas_y_filtro_por_bloques(servidor, loader):
+    ids = [3, 50, 8, 99, 1000]
+    df = loader.load_csv('CAB_FAC', usecols=['IDCAB_FAC', 'FAC_FEC'], row_filter=('IDCAB_FAC', ids))
+    
+    esperado = leer_completo(servidor.archivos[ARCHIVO], usecols=['IDCAB_FAC', 'FAC_FEC'])
+    esperado = esperado[esperado['IDCAB_FAC'].isin(ids)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, esperado)
+    # El parser no pidió todas las columnas, pero el cache tiene el archivo completo
+    with open(os.path.join(config.CACHE_DIRECTORY, ARCHIVO), 'rb') as f:
+        assert f.read() == servidor.archivos[ARCHIVO]
+
+
+def test_sin_cambios_no_se_descarga_de_nuevo(servidor, loader):
+    primera = loader.load_csv('CAB_FAC')
+    segunda = loader.load_csv('CAB_FAC')
+    
+    assert len(servidor.solicitudes) == 1
+    pd.testing.assert_frame_equal(segunda, primera)
+
+
+def test_descarga_fallida_no_reemplaza_el_cache(servidor, loader):
+    loader.load_csv('CAB_FAC')
+    anterior = servidor.archivos[ARCHIVO]
+    
+    # Otra versión que el servidor ya no entrega (404): se usa el cache anterior
+    servidor.archivos[ARCHIVO] = facturas(120)
+    metadatos = servidor.metadatos(ARCHIVO)
+    del servidor.archivos[ARCHIVO]
+    loader._get_remote_metadata = lambda nombre: metadatos
+    
+    assert len(loader.load_csv('CAB_FAC')) == 100
+    with open(os.path.join(config.CACHE_DIRECTORY, ARCHIVO), 'rb') as f:
+        assert f.read() == anterior
+    assert not os.path.exists(os.path.join(config.CACHE_DIRECTORY, ARCHIVO + '.part'))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tipos declarados en config.ESQUEMAS (sharepoint_loader.aplicar_esquema):
+fechas con el formato del archivo y enteros compactos estables entre bloques
+"""
+
+import pandas as pd
+
+import config_sharepoint as config
+from sharepoint_loader import aplicar_esquema
+
+
+def test_fechas_con_otra_forma_se_interpretan_como_iso():
+    df = pd.DataFrame({
+        'IDCAB_FAC': [1, 2, 3, 4, 5, 6],
+        'FAC_FEC': ['2024-01-05 10:00:00', '2024-01-05', '2024-01-05 10:00:00.123',
+                    '2024-01-05T10:00:00', None, 'sin fecha'],
+    })
+    df = aplicar_esquema(df, config.ESQUEMAS['CAB_FAC'])
+    
+    assert df['FAC_FEC'].dtype == 'datetime64[ns]'
+    assert df['FAC_FEC'].tolist()[:4] == [
+        pd.Timestamp('2024-01-05 10:00:00'),
+        pd.Timestamp('2024-01-05'),
+        pd.Timestamp('2024-01-05 10:00:00.123'),
+        pd.Timestamp('2024-01-05 10:00:00'),
+    ]
+    # Solo los valores que no son fechas quedan vacíos
+    assert df['FAC_FEC'].isna().tolist() == [False] * 4 + [True, True]
+
+
+def test_fechas_con_el_formato_declarado():
+    df = aplicar_esquema(pd.DataFrame({'FECHA': ['2015-01-05', '2015-02-03']}), config.ESQUEMAS['HISTORICO_PYP'])
+    assert df['FECHA'].tolist() == [pd.Timestamp('2015-01-05'), pd.Timestamp('2015-02-03')]
+
+
+def test_entero_nullable_declarado_igual_en_todos_los_bloques():
+    esquema = config.ESQUEMAS['HISTORICO_PYP']
+    con_vacios = aplicar_esquema(pd.DataFrame({'IDCAB_FAC': [1.0, None]}), esquema)
+    sin_vacios = aplicar_esquema(pd.DataFrame({'IDCAB_FAC': [1, 2]}), esquema)
+    assert con_vacios['IDCAB_FAC'].dtype == sin_vacios['IDCAB_FAC'].dtype == 'Int32'
+
+
+def test_entero_que_no_cabe_conserva_los_valores():
+    df = aplicar_esquema(pd.DataFrame({'ID_PACIENTE': [1, 2 ** 40]}), config.ESQUEMAS['DAT_PER'])
+    assert df['ID_PACIENTE'].tolist() == [1, 2 ** 40]
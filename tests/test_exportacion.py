@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Paginación, ordenamiento y exportación CSV por bloques (exportacion.py)
+"""
+
+import os
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+from exportacion import ordenar, paginar, clave_exportacion, huella_archivo, exportar_csv
+
+
+@pytest.fixture
+def resultado():
+    return pd.DataFrame({
+        'ID_PACIENTE': np.arange(1, 11, dtype=np.int32),
+        'NOMBRE': pd.Categorical(['b', 'a', None, 'c', 'a', 'b', 'c', None, 'a', 'b'], categories=['c', 'b', 'a']),
+        'FECHA': pd.to_datetime(['2024-01-0%d' % (i % 9 + 1) for i in range(10)]),
+    })
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'EXPORTACION_DIRECTORIO', str(tmp_path / 'exportaciones'))
+    monkeypatch.setattr(config, 'EXPORTACION_FILAS_BLOQUE', 3)
+    return tmp_path / 'exportaciones'
+
+
+def test_ordenar_categorias_por_texto_y_nulos_al_final(resultado):
+    orden = ordenar(resultado, 'NOMBRE')
+    assert resultado.take(orden)['ID_PACIENTE'].tolist() == [2, 5, 9, 1, 6, 10, 4, 7, 3, 8]
+    
+    orden = ordenar(resultado, 'NOMBRE', ascendente=False)
+    assert resultado.take(orden)['ID_PACIENTE'].tolist() == [4, 7, 1, 6, 10, 2, 5, 9, 3, 8]
+
+
+def test_paginar_con_y_sin_orden(resultado):
+    pagina, total = paginar(resultado, 2, 4)
+    assert total == 3
+    assert pagina['ID_PACIENTE'].tolist() == [5, 6, 7, 8]
+    
+    # Las páginas fuera de rango se ajustan a la última o a la primera
+    assert paginar(resultado, 9, 4)[0]['ID_PACIENTE'].tolist() == [9, 10]
+    assert paginar(resultado, 0, 4)[0]['ID_PACIENTE'].tolist() == [1, 2, 3, 4]
+    
+    orden = ordenar(resultado, 'ID_PACIENTE', ascendente=False)
+    assert paginar(resultado, 1, 3, orden)[0]['ID_PACIENTE'].tolist() == [10, 9, 8]
+    assert paginar(resultado.iloc[:0], 1, 3)[1] == 1
+
+
+@pytest.mark.parametrize('comprimir', [False, True])
+def test_exportacion_por_bloques_igual_a_un_solo_to_csv(resultado, directorio, comprimir):
+    orden = ordenar(resultado, 'NOMBRE')
+    columnas = {'ID_PACIENTE': 'Paciente'}
+    path = exportar_csv(resultado, clave_exportacion('v1', 'consulta'), 'prueba', comprimir=comprimir,
+                        orden=orden, columnas=columnas)
+    
+    abrir = gzip.open if comprimir else open
+    with abrir(path, 'rt', encoding='utf-8', newline='') as f:
+        contenido = f.read()
+    esperado = io.StringIO()
+    resultado.take(orden).rename(columns=columnas).to_csv(esperado, index=False)
+    assert contenido == esperado.getvalue()
+    assert os.listdir(directorio) == [os.path.basename(path)]
+
+
+def test_exportacion_con_la_misma_clave_se_reutiliza(resultado, directorio):
+    clave = clave_exportacion('v1', 'consulta', 'defecto', False)
+    path = exportar_csv(resultado, clave, 'prueba')
+    
+    # Otro resultado con la misma clave: se entrega el archivo ya generado
+    assert exportar_csv(resultado.iloc[:2], clave, 'prueba') == path
+    assert len(pd.read_csv(path)) == len(resultado)
+    
+    otro = exportar_csv(resultado.iloc[:2], clave_exportacion('v2', 'consulta', 'defecto', False), 'prueba')
+    assert otro != path and len(pd.read_csv(otro)) == 2
+
+
+def test_huella_de_un_archivo_cargado():
+    contenido = 'IDE_PAC\n1001\n1002\n'.encode('utf-8')
+    assert huella_archivo(contenido) == huella_archivo(bytes(contenido))
+    assert huella_archivo(contenido) != huella_archivo(contenido + b'1003\n')
+    assert len(huella_archivo(contenido)) == 16
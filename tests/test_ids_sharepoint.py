@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IDs de sitio/drive guardados (SharePointLoader): se vuelven a resolver una vez
+si Graph responde 404/400 con los IDs persistidos
+"""
+
+import json
+import os
+import time
+
+import pytest
+import requests
+
+import config_sharepoint as config
+from sharepoint_loader import SharePointLoader
+
+ARCHIVO = config.ARCHIVOS_CSV['CAB_FAC']
+
+
+class GraphFalso:
+    """Transporte que responde como Graph para un único sitio y drive vigentes"""
+    
+    def __init__(self, site_id='sitio-nuevo', drive_id='drive-nuevo', estado_obsoleto=404):
+        self.site_id = site_id
+        self.drive_id = drive_id
+        self.estado_obsoleto = estado_obsoleto
+        self.urls = []
+    
+    def _respuesta(self, url, estado, cuerpo):
+        response = requests.Response()
+        response.status_code = estado
+        response.url = url
+        response._content = json.dumps(cuerpo).encode('utf-8')
+        if estado >= 400:
+            raise requests.exceptions.HTTPError(f"{estado}", response=response)
+        return response
+    
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith(f"/sites/{self.site_id}/drive"):
+            return self._respuesta(url, 200, {'id': self.drive_id})
+        if '/sites/' in url and ':/' in url and '/drives/' not in url:
+            return self._respuesta(url, 200, {'id': self.site_id})
+        if f"/sites/{self.site_id}/drives/{self.drive_id}/" in url:
+            return self._respuesta(url, 200, {'eTag': 'e1', 'size': 10})
+        return self._respuesta(url, self.estado_obsoleto, {'error': {'code': 'itemNotFound'}})
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path))
+    
+    loader = SharePointLoader()
+    loader.use_sharepoint = True
+    loader.access_token = 'token'
+    loader.token_expires_at = time.time() + 3600
+    return loader
+
+
+def guardar_ids(site_id, drive_id):
+    with open(os.path.join(config.CACHE_DIRECTORY, config.SHAREPOINT_IDS_ARCHIVO), 'w', encoding='utf-8') as f:
+        json.dump({'site_url': config.SHAREPOINT_SITE_URL, 'site_id': site_id, 'drive_id': drive_id}, f)
+
+
+def ids_guardados():
+    with open(os.path.join(config.CACHE_DIRECTORY, config.SHAREPOINT_IDS_ARCHIVO), 'r', encoding='utf-8') as f:
+        ids = json.load(f)
+    return ids['site_id'], ids['drive_id']
+
+
+@pytest.mark.parametrize('estado', [404, 400])
+def test_ids_guardados_obsoletos_se_resuelven_de_nuevo(loader, estado):
+    guardar_ids('sitio-viejo', 'drive-viejo')
+    loader.transport = graph = GraphFalso(estado_obsoleto=estado)
+    
+    assert loader.get_version('CAB_FAC') == 'e1'
+    assert (loader.site_id, loader.drive_id) == ('sitio-nuevo', 'drive-nuevo')
+    assert ids_guardados() == ('sitio-nuevo', 'drive-nuevo')
+    
+    # Una sola resolución: las siguientes solicitudes usan los IDs nuevos
+    graph.urls.clear()
+    assert loader.get_version('CAB_FAC') == 'e1'
+    assert len(graph.urls) == 1
+
+
+def test_ids_recien_resueltos_no_se_resuelven_otra_vez(loader):
+    # Un 404 con IDs obtenidos de Graph en este proceso es un archivo que no existe
+    loader.transport = graph = GraphFalso()
+    loader._ensure_connected()
+    graph.drive_id = 'drive-otro'
+    graph.urls.clear()
+    
+    assert loader._get_remote_metadata(ARCHIVO) is None
+    assert len(graph.urls) == 1
+    assert loader.drive_id == 'drive-nuevo'
+
+
+def test_otros_errores_no_descartan_los_ids_guardados(loader):
+    guardar_ids('sitio-viejo', 'drive-viejo')
+    loader.transport = GraphFalso(estado_obsoleto=503)
+    
+    assert loader._ensure_connected()
+    assert loader._get_remote_metadata(ARCHIVO) is None
+    assert (loader.site_id, loader.drive_id) == ('sitio-viejo', 'drive-viejo')
+    assert ids_guardados() == ('sitio-viejo', 'drive-viejo')
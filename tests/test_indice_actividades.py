@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice invertido de actividades (indices.IndiceActividades): mismo resultado
+que filtrar la tabla de atenciones y unirla con DAT_PER en cada consulta
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices import IndiceActividades
+
+COLUMNAS = ['IDE_PAC', 'COD_TID', 'NOMBRE_COMPLETO', 'SEX_PAC', 'FECHA_ATENCION', 'IDCAB_FAC']
+
+
+@pytest.fixture
+def tablas():
+    aleatorio = np.random.default_rng(1)
+    pacientes = pd.DataFrame({
+        'ID_PACIENTE': np.arange(1, 201, dtype=np.int32),
+        'IDE_PAC': [str(2_000_000 + i) for i in range(200)],
+        'COD_TID': aleatorio.choice(['CC', 'TI', 'RC'], 200),
+        'NOMBRE_COMPLETO': [f'PACIENTE {i}' for i in range(200)],
+        'SEX_PAC': aleatorio.choice(['F', 'M'], 200),
+    })
+    # Atenciones por fecha descendente, con fechas repetidas, sin fecha y de
+    # pacientes que no están en DAT_PER
+    cantidad = 3_000
+    fechas = pd.Series(pd.Timestamp('2020-01-01') + pd.to_timedelta(aleatorio.integers(0, 400, cantidad), unit='D'))
+    fechas[aleatorio.random(cantidad) < 0.02] = pd.NaT
+    atenciones = pd.DataFrame({
+        'ID_PACIENTE': aleatorio.integers(1, 230, cantidad).astype(np.int32),
+        'ID_ACTPYP': aleatorio.choice([3, 5, 8, 13, 21], cantidad).astype(np.int32),
+        'FECHA_ATENCION': fechas,
+        'IDCAB_FAC': pd.array(np.arange(cantidad), dtype='Int32'),
+    }).sort_values('FECHA_ATENCION', ascending=False, kind='stable').reset_index(drop=True)
+    return atenciones, pacientes
+
+
+def filtrar(atenciones, pacientes, id_actividad, fecha_desde=None, fecha_hasta=None, top_n=None):
+    """Consulta sin índice: filtrar, unir con DAT_PER y recortar"""
+    resultado = atenciones[atenciones['ID_ACTPYP'] == id_actividad].merge(pacientes, on='ID_PACIENTE', how='left')
+    if fecha_desde is not None:
+        resultado = resultado[resultado['FECHA_ATENCION'] >= fecha_desde]
+    if fecha_hasta is not None:
+        resultado = resultado[resultado['FECHA_ATENCION'] <= fecha_hasta]
+    if top_n is not None:
+        resultado = resultado.head(top_n)
+    return resultado[COLUMNAS].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('filtros', [
+    {},
+    {'top_n': 10},
+    {'fecha_desde': pd.Timestamp('2020-06-01')},
+    {'fecha_hasta': pd.Timestamp('2020-03-15')},
+    {'fecha_desde': pd.Timestamp('2020-02-01'), 'fecha_hasta': pd.Timestamp('2020-02-28'), 'top_n': 5},
+])
+def test_igual_que_filtrar_la_tabla(tablas, filtros):
+    atenciones, pacientes = tablas
+    indice = IndiceActividades(atenciones, pacientes)
+    
+    for id_actividad in [3, 5, 8, 13, 21]:
+        resultado = indice.pacientes_actividad(id_actividad, **filtros)
+        assert list(resultado.columns) == COLUMNAS
+        pd.testing.assert_frame_equal(resultado.reset_index(drop=True),
+                                      filtrar(atenciones, pacientes, id_actividad, **filtros))
+
+
+def test_actividad_sin_atenciones(tablas):
+    atenciones, pacientes = tablas
+    indice = IndiceActividades(atenciones, pacientes)
+    
+    for id_actividad in [0, 4, 100]:
+        resultado = indice.pacientes_actividad(id_actividad)
+        assert resultado.empty
+        assert list(resultado.columns) == COLUMNAS
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Búsqueda aproximada y por prefijo de nombres (indices.IndiceNombres): los
+puntajes son los de la similitud de Jaccard de trigramas calculada sin índice
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices import IndiceNombres, clave_nombre
+
+NOMBRES = ['JOSÉ', 'JOSE', 'MARÍA', 'MARIO', 'ANA', 'LUIS', 'ÁNGEL']
+APELLIDOS = ['GARCÍA LÓPEZ', 'GARCIA LOPERA', 'GÓMEZ', 'PEÑA', 'MUÑOZ DÍAZ', 'LOPEZ']
+
+
+@pytest.fixture
+def pacientes():
+    nombres = [f'{n} {a}' for n, a in itertools.product(NOMBRES, APELLIDOS)]
+    # Nombres repetidos (varios pacientes con la misma clave), vacíos y con signos
+    nombres += ['JOSE GOMEZ', 'jose gómez', None, '', 'MARIA-PEÑA (2)']
+    return pd.DataFrame({
+        'ID_PACIENTE': np.arange(1, len(nombres) + 1, dtype=np.int32),
+        'NOMBRE_COMPLETO': nombres,
+    })
+
+
+def trigramas(clave, relleno_final=True):
+    texto = '  ' + clave + (' ' if relleno_final else '')
+    return {texto[i:i + 3] for i in range(len(texto) - 2)} - {'   '}
+
+
+def puntajes(pacientes, texto):
+    """(SIMILITUD, puntaje de orden) de cada paciente calculados sin índice"""
+    consulta = clave_nombre(pd.Series([texto])).iat[0]
+    propios = trigramas(consulta, relleno_final=False)
+    similitudes, orden = [], []
+    for clave in clave_nombre(pacientes['NOMBRE_COMPLETO']):
+        otros = trigramas(clave)
+        comunes = len(propios & otros)
+        similitud = comunes / (len(propios) + len(otros) - comunes) if comunes else 0.0
+        similitudes.append(similitud)
+        orden.append(similitud + (comunes == len(propios) and clave.startswith(consulta)))
+    return pd.Series(similitudes, index=pacientes.index), pd.Series(orden, index=pacientes.index)
+
+
+@pytest.mark.parametrize('texto', ['jose gomez', 'JOZE GOMES', 'garcia lop', 'maria', 'muñoz', 'PENA', 'angel diaz'])
+def test_puntajes_iguales_a_los_calculados_sin_indice(pacientes, texto):
+    indice = IndiceNombres(pacientes)
+    similitudes, orden = puntajes(pacientes, texto)
+    
+    resultado = indice.buscar(texto, top_k=8)
+    assert len(resultado) == 8
+    np.testing.assert_allclose(resultado['SIMILITUD'], similitudes[resultado.index].round(3))
+    
+    # De mayor a menor puntaje y sin dejar afuera un paciente con mayor puntaje
+    obtenidos = orden[resultado.index].to_numpy()
+    assert (np.diff(obtenidos) <= 1e-12).all()
+    assert obtenidos[-1] >= orden.drop(resultado.index).max() - 1e-12
+
+
+def test_prefijo_primero_sin_importar_tildes_ni_mayusculas(pacientes):
+    indice = IndiceNombres(pacientes)
+    
+    resultado = indice.buscar('jose garcia l', top_k=5)
+    claves = clave_nombre(resultado['NOMBRE_COMPLETO']).tolist()
+    # JOSÉ y JOSE tienen la misma clave: cuatro pacientes empiezan por el texto
+    assert sorted(claves[:4]) == ['JOSE GARCIA LOPERA'] * 2 + ['JOSE GARCIA LOPEZ'] * 2
+    
+    # Todos los pacientes con la misma clave
+    resultado = indice.buscar('José Gómez', top_k=10)
+    assert set(resultado['NOMBRE_COMPLETO'].head(4)) == {'JOSÉ GÓMEZ', 'JOSE GÓMEZ', 'JOSE GOMEZ', 'jose gómez'}
+
+
+@pytest.mark.parametrize('texto', ['', '   ', '¿?', 'XQZW'])
+def test_sin_resultados(pacientes, texto):
+    resultado = IndiceNombres(pacientes).buscar(texto)
+    assert resultado.empty
+    assert 'SIMILITUD' in resultado.columns
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de pacientes por documento y de sus atenciones por ID_PACIENTE
+(indices.IndicePacientes): mismo resultado que filtrar las tablas completas
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices import IndicePacientes
+
+
+@pytest.fixture
+def tablas():
+    aleatorio = np.random.default_rng(0)
+    pacientes = pd.DataFrame({
+        'ID_PACIENTE': np.arange(1, 301, dtype=np.int32),
+        'IDE_PAC': [str(1_000_000 + i) for i in range(300)],
+        'NOMBRE_COMPLETO': [f'PACIENTE {i}' for i in range(300)],
+    })
+    # Documento repetido (cuenta el primer registro) y documentos con letras
+    pacientes.loc[10, 'IDE_PAC'] = pacientes.loc[5, 'IDE_PAC']
+    pacientes.loc[20, 'IDE_PAC'] = 'PE123'
+    
+    # Atenciones por fecha descendente (como construir_atenciones); el paciente
+    # 300 no tiene atenciones y el 999 no está en DAT_PER
+    ids = np.append(aleatorio.integers(1, 300, 2_000), [999, 999])
+    fechas = pd.Timestamp('2020-01-01') + pd.to_timedelta(aleatorio.integers(0, 1_500, len(ids)), unit='D')
+    atenciones = pd.DataFrame({
+        'ID_PACIENTE': ids.astype(np.int32),
+        'ID_ACTPYP': aleatorio.integers(1, 20, len(ids)).astype(np.int32),
+        'FECHA_ATENCION': fechas,
+    }).sort_values('FECHA_ATENCION', ascending=False, kind='stable').reset_index(drop=True)
+    return pacientes, atenciones
+
+
+def test_documento_como_el_primer_registro_de_dat_per(tablas):
+    pacientes, atenciones = tablas
+    indice = IndicePacientes(pacientes, atenciones)
+    
+    for documento in list(pacientes['IDE_PAC'].iloc[::13]) + ['PE123', pacientes.loc[5, 'IDE_PAC'], 1_000_001]:
+        esperado = pacientes[pacientes['IDE_PAC'].astype(str) == str(documento)].iloc[0]
+        pd.testing.assert_series_equal(indice.buscar_documento(documento), esperado)
+        assert indice.id_paciente(documento) == esperado['ID_PACIENTE']
+    
+    for documento in ['no-existe', '', '1000000 ', '01000000']:
+        assert indice.buscar_documento(documento) is None
+        assert indice.id_paciente(documento) is None
+
+
+def test_atenciones_de_un_paciente_como_filtrar_la_tabla(tablas):
+    pacientes, atenciones = tablas
+    indice = IndicePacientes(pacientes, atenciones)
+    
+    for id_paciente in list(range(1, 301, 7)) + [300, 999, 0, 5000]:
+        esperado = atenciones[atenciones['ID_PACIENTE'] == id_paciente]
+        pd.testing.assert_frame_equal(indice.atenciones_paciente(id_paciente), esperado)
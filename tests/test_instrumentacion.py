@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentación de fases: registros JSON, histogramas en formato de texto de
+Prometheus y percentiles de los registros recientes
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+import pytest
+
+import config_sharepoint as config
+from instrumentacion import Instrumentacion
+
+
+def cerrar_log():
+    """El logger es global: que cada prueba escriba en su propio directorio"""
+    logger = logging.getLogger('sitis.instrumentacion')
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+@pytest.fixture
+def instrumentacion(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'INSTRUMENTACION', True)
+    monkeypatch.setattr(config, 'INSTRUMENTACION_DIRECTORIO', str(tmp_path))
+    monkeypatch.setattr(config, 'INSTRUMENTACION_BUCKETS_SEGUNDOS', (0.01, 0.1, 1))
+    cerrar_log()
+    yield Instrumentacion()
+    cerrar_log()
+
+
+def registros(directorio):
+    with open(os.path.join(directorio, config.INSTRUMENTACION_LOG_JSON), 'r', encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_fases_anidadas_con_bytes_filas_y_errores(instrumentacion, tmp_path):
+    with instrumentacion.fase('load_csv', 'DAT_PER') as medida:
+        with instrumentacion.fase('descarga', 'DAT_PER') as interna:
+            interna['bytes'] = 2048
+        medida['filas'] = 10
+    with pytest.raises(KeyError):
+        with instrumentacion.fase('consulta', 'documento'):
+            raise KeyError('no existe')
+    with instrumentacion.fase('consulta', 'nombre') as medida:
+        medida['error'] = 'sin_indice'
+    
+    escritos = registros(tmp_path)
+    assert escritos == list(instrumentacion.recientes)
+    # La fase interna termina (y se registra) primero
+    assert [(r['fase'], r['padre']) for r in escritos] == [
+        ('descarga', 'load_csv'), ('load_csv', None), ('consulta', None), ('consulta', None)]
+    assert [(r['bytes'], r['filas'], r['error']) for r in escritos] == [
+        (2048, None, None), (None, 10, None), (None, None, 'KeyError'), (None, None, 'sin_indice')]
+    assert escritos[1]['segundos'] >= escritos[0]['segundos'] >= 0
+    assert {r['pid'] for r in escritos} == {os.getpid()}
+
+
+def test_desactivada_no_registra(instrumentacion, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'INSTRUMENTACION', False)
+    with instrumentacion.fase('consulta') as medida:
+        medida['filas'] = 1
+    
+    assert not instrumentacion.recientes
+    assert not os.listdir(tmp_path)
+
+
+def test_histogramas_en_formato_prometheus(instrumentacion, tmp_path):
+    for segundos in (0.005, 0.05, 0.05, 0.5, 3):
+        instrumentacion.registrar('parseo_csv', segundos, etiqueta='CAB_FAC', bytes=100, filas=7)
+    instrumentacion.registrar('api', 0.02, etiqueta='/buscar "x"\\y', error='ValueError')
+    
+    lineas = set(instrumentacion.texto_prometheus().splitlines())
+    labels = f'fase="parseo_csv",etiqueta="CAB_FAC",pid="{os.getpid()}"'
+    # Buckets acumulados
+    for limite, n in (('0.01', 1), ('0.1', 3), ('1', 4), ('+Inf', 5)):
+        assert f'sitis_fase_segundos_bucket{{{labels},le="{limite}"}} {n}' in lineas
+    assert f'sitis_fase_segundos_sum{{{labels}}} 3.605000' in lineas
+    assert f'sitis_fase_segundos_count{{{labels}}} 5' in lineas
+    assert f'sitis_fase_bytes_total{{{labels}}} 500' in lineas
+    assert f'sitis_fase_filas_total{{{labels}}} 35' in lineas
+    assert f'sitis_fase_errores_total{{{labels}}} 0' in lineas
+    # Comillas y barras escapadas en las etiquetas
+    assert f'sitis_fase_errores_total{{fase="api",etiqueta="/buscar \\"x\\"\\\\y",pid="{os.getpid()}"}} 1' in lineas
+    
+    # El primer registro escribió el archivo del proceso; escribirlo de nuevo lo reemplaza
+    path = tmp_path / config.INSTRUMENTACION_PROMETHEUS.format(pid=os.getpid())
+    assert path.exists()
+    instrumentacion.escribir_prometheus()
+    # La memoria del proceso cambia entre una escritura y otra; las fases no
+    fases = [linea for linea in instrumentacion.texto_prometheus().splitlines() if 'sitis_fase' in linea]
+    assert [linea for linea in path.read_text(encoding='utf-8').splitlines() if 'sitis_fase' in linea] == fases
+    assert not os.path.exists(f'{path}.tmp')
+    instrumentacion._eliminar_prometheus()
+    assert not path.exists()
+
+
+def test_percentiles_de_los_registros_recientes(instrumentacion):
+    aleatorio = np.random.default_rng(0)
+    documento = aleatorio.exponential(0.02, 200)
+    for segundos in documento:
+        instrumentacion.registrar('consulta', segundos, etiqueta='documento')
+    instrumentacion.registrar('consulta', 0.3, etiqueta='nombre', error='Timeout')
+    instrumentacion.registrar('auth', 0.1)
+    
+    df = instrumentacion.percentiles().set_index(['fase', 'etiqueta'])
+    
+    assert list(df.index) == [('auth', ''), ('consulta', 'documento'), ('consulta', 'nombre')]
+    fila = df.loc[('consulta', 'documento')]
+    milisegundos = documento.round(6) * 1000
+    assert fila['n'] == 200 and fila['errores'] == 0
+    np.testing.assert_allclose(fila[['p50_ms', 'p90_ms', 'p99_ms']].astype(float),
+                               np.percentile(milisegundos, [50, 90, 99]))
+    assert fila['max_ms'] == pytest.approx(milisegundos.max())
+    assert df.loc[('consulta', 'nombre'), 'errores'] == 1
+    
+    # Registros antiguos fuera de la ventana
+    instrumentacion.registrar('consulta', 1.0, etiqueta='viejo', inicio=1_000_000)
+    assert 'viejo' not in instrumentacion.percentiles(ventana_segundos=3600)['etiqueta'].tolist()
+    assert 'viejo' in instrumentacion.percentiles()['etiqueta'].tolist()
+
+
+def test_percentiles_sin_registros(instrumentacion):
+    df = instrumentacion.percentiles()
+    assert df.empty
+    assert 'p99_ms' in df.columns
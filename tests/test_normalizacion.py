@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalización vectorizada de textos (normalizacion.py): mismo resultado que
+los reemplazos secuenciales con str.replace que reemplazó
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from normalizacion import normalizar_texto, normalizar_serie
+
+
+# Lista de la versión anterior tal cual (NUTRICION estaba repetido)
+REEMPLAZOS_ANTERIORES = [
+    ('ATENCIï¿½N', 'ATENCION'),
+    ('APLICACIï¿½N', 'APLICACION'),
+    ('FLï¿½OR', 'FLUOR'),
+    ('Aï¿½OS', 'AÑOS'),
+    ('Aï¿½O', 'AÑO'),
+    ('NIï¿½OS', 'NIÑOS'),
+    ('NIï¿½O', 'NIÑO'),
+    ('ODONTOLOGï¿½A', 'ODONTOLOGIA'),
+    ('Mï¿½DICO', 'MEDICO'),
+    ('ENFERMERï¿½A', 'ENFERMERIA'),
+    ('BIOLï¿½GICO', 'BIOLOGICO'),
+    ('QUï¿½MICO', 'QUIMICO'),
+    ('Fï¿½SICO', 'FISICO'),
+    ('CLï¿½NICO', 'CLINICO'),
+    ('Bï¿½SICO', 'BASICO'),
+    ('EVALUACIï¿½N', 'EVALUACION'),
+    ('VACUNACIï¿½N', 'VACUNACION'),
+    ('NUTRICIï¿½N', 'NUTRICION'),
+    ('PREVENCIï¿½N', 'PREVENCION'),
+    ('PROMOCIï¿½N', 'PROMOCION'),
+    ('GESTACIï¿½N', 'GESTACION'),
+    ('NUTRICIï¿½N', 'NUTRICION'),
+    ('ORIENTACIï¿½N', 'ORIENTACION'),
+]
+
+
+def normalizar_texto_secuencial(texto):
+    """Versión anterior (app.py): un str.replace por cada patrón, en orden"""
+    if pd.isna(texto) or texto == '':
+        return texto
+    
+    texto = str(texto)
+    for mal, bien in REEMPLAZOS_ANTERIORES:
+        texto = texto.replace(mal, bien)
+    texto = texto.replace('ï¿½', 'O')
+    texto = texto.replace('\ufffd', 'n')
+    return texto
+
+
+def textos_aleatorios(cantidad, semilla=0):
+    """Textos armados con fragmentos de los patrones, el caracter mal codificado y letras sueltas"""
+    aleatorio = random.Random(semilla)
+    fragmentos = [mal for mal, _ in REEMPLAZOS_ANTERIORES]
+    fragmentos += [mal[:mal.index('ï¿½') + 4] for mal in fragmentos] + [mal[mal.index('ï¿½'):] for mal in fragmentos]
+    fragmentos += ['ï¿½', '\ufffd', 'ï¿', '¿½', 'A', 'O', 'S', 'N', 'I', ' ', 'Ñ']
+    return [''.join(aleatorio.choice(fragmentos) for _ in range(aleatorio.randint(1, 6))) for _ in range(cantidad)]
+
+
+@pytest.mark.parametrize('texto', [
+    'ATENCIï¿½N EN SALUD',
+    'NIï¿½OS DE 5 Aï¿½OS',
+    'Aï¿½OSï¿½O',
+    'NIï¿½Oï¿½A',
+    'APLICACIï¿½N DE FLï¿½OR',
+    'PEï¿½A',
+    'MU\ufffdOZ',
+    'SIN CAMBIOS',
+    '',
+])
+def test_casos_conocidos(texto):
+    assert normalizar_texto(texto) == normalizar_texto_secuencial(texto)
+
+
+def test_textos_aleatorios_igual_que_los_reemplazos_secuenciales():
+    for texto in textos_aleatorios(20_000):
+        assert normalizar_texto(texto) == normalizar_texto_secuencial(texto), texto
+
+
+@pytest.mark.parametrize('categorica', [False, True])
+def test_serie_igual_que_apply(categorica):
+    textos = textos_aleatorios(500, semilla=1)
+    serie = pd.Series(textos * 3 + [np.nan, '', None], index=np.arange(1503) * 2, name='NM1_PAC', dtype=object)
+    if categorica:
+        serie = serie.astype('category')
+    
+    resultado = normalizar_serie(serie)
+    esperado = serie.astype(object).apply(normalizar_texto_secuencial)
+    
+    assert resultado.name == 'NM1_PAC'
+    assert resultado.index.equals(serie.index)
+    assert isinstance(resultado.dtype, pd.CategoricalDtype) == categorica
+    assert resultado.astype(object).isna().tolist() == esperado.isna().tolist()
+    assert resultado.astype(object).dropna().tolist() == esperado.dropna().tolist()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hilo de actualización (refresco.RefrescoDatos): reintentos de la primera carga
+"""
+
+import time
+from types import SimpleNamespace
+
+import config_sharepoint as config
+import refresco
+from refresco import RefrescoDatos
+
+
+def test_primera_carga_fallida_se_reintenta_pronto(monkeypatch):
+    monkeypatch.setattr(config, 'REFRESCO_REINTENTO_SEGUNDOS', 0.05)
+    monkeypatch.setattr(config, 'INSTRUMENTACION', False)
+    monkeypatch.setattr(config, 'BACKEND_DATOS', 'memoria')
+    monkeypatch.setattr(config, 'ALMACEN_ARROW', False)
+    monkeypatch.setattr(refresco, 'version_fuentes', lambda loader: 'v1')
+    monkeypatch.setattr(refresco.instrumentacion, 'registrar_datos', lambda conjunto: None)
+    
+    intentos = []
+    
+    def construir(loader, version, anterior=None):
+        intentos.append(time.monotonic())
+        if len(intentos) < 3:
+            raise IOError("SharePoint no responde")
+        return SimpleNamespace(version=version)
+    monkeypatch.setattr(refresco, 'construir_conjunto_datos', construir)
+    
+    # Con el intervalo normal de una hora, solo el reintento corto puede cargar a tiempo
+    r = RefrescoDatos(loader=None, intervalo_segundos=3600)
+    assert [r._espera(f) for f in range(3)] == [0.05, 0.1, 0.2]
+    r.iniciar()
+    try:
+        limite = time.monotonic() + 5
+        while r._actual is None and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert r.actual(timeout=0).version == 'v1'
+        assert len(intentos) == 3
+        assert r._espera(0) == 3600
+    finally:
+        r.detener()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validación de los parámetros, los encabezados y la clave de la API HTTP del
+motor de consultas
+"""
+
+import http.client
+import threading
+
+import pandas as pd
+import pytest
+
+from motor_consultas.servidor import ErrorSolicitud, ServidorConsultas, _fecha
+
+
+def test_fecha_valida():
+    assert _fecha({'desde': ['2024-02-05']}, 'desde') == pd.Timestamp('2024-02-05')
+    assert _fecha({}, 'desde') is None
+    assert _fecha({'desde': ['']}, 'desde') is None
+
+
+@pytest.mark.parametrize('valor', [
+    '2024-02-05T00:00:00+00:00',
+    '2024-02-05 10:30',
+    '05/02/2024',
+    '2024-02-30',
+    '99999-01-01',
+    'ayer',
+])
+def test_fecha_invalida_es_error_400(valor):
+    with pytest.raises(ErrorSolicitud) as error:
+        _fecha({'desde': [valor]}, 'desde')
+    assert error.value.estado == 400
+
+
+@pytest.fixture
+def servidor_api():
+    """API en un puerto libre con clave; las solicitudes rechazadas no llegan al motor"""
+    servidor = ServidorConsultas(('127.0.0.1', 0), motor=None, clave='clave-secreta')
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def solicitar(servidor, metodo, ruta, encabezados, cuerpo=b''):
+    """Estado de la respuesta a una solicitud con los encabezados tal cual (sin completar Content-Length)"""
+    conexion = http.client.HTTPConnection(*servidor.server_address, timeout=5)
+    try:
+        conexion.putrequest(metodo, ruta, skip_accept_encoding=True)
+        for nombre, valor in encabezados.items():
+            conexion.putheader(nombre, valor)
+        conexion.endheaders(cuerpo or None)
+        return conexion.getresponse().status
+    finally:
+        conexion.close()
+
+
+@pytest.mark.parametrize('largo, estado', [
+    (None, 411),
+    ('abc', 400),
+    ('-1', 400),
+    ('+5', 400),
+])
+def test_busqueda_masiva_rechaza_content_length_invalido(servidor_api, largo, estado):
+    encabezados = {'X-API-Key': 'clave-secreta'}
+    if largo is not None:
+        encabezados['Content-Length'] = largo
+    assert solicitar(servidor_api, 'POST', '/pacientes/busqueda', encabezados, b'{"documentos": ["1"]}') == estado
+
+
+@pytest.mark.parametrize('clave', ['incorrecta', 'clave-ñ', ''])
+def test_clave_incorrecta_es_error_401(servidor_api, clave):
+    assert solicitar(servidor_api, 'GET', '/actividades', {'X-API-Key': clave}) == 401
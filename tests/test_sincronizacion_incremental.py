@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sincronización incremental de HISTORICO_PYP (SharePointLoader._sync_incremental)
+contra un servidor HTTP local con soporte de Range
+"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import config_sharepoint as config
+from sharepoint_loader import SharePointLoader
+
+ARCHIVO = config.ARCHIVOS_CSV['HISTORICO_PYP']
+ENCABEZADO = b'ID_PACIENTE,ID_ACTPYP,IDCAB_FAC,FECHA\n'
+
+
+def filas(desde, hasta):
+    """Filas CSV del histórico con IDs desde..hasta-1"""
+    return b''.join(
+        f'{i},{100 + i % 7},{i if i % 5 else ""},2024-01-{1 + i % 28:02d}\n'.encode('ascii')
+        for i in range(desde, hasta)
+    )
+
+
+@pytest.fixture
+def loader(servidor, tmp_path, monkeypatch):
+    """Loader conectado al servidor local, con cache en un directorio temporal"""
+    monkeypatch.setattr(config, 'CACHE_LOCAL', True)
+    monkeypatch.setattr(config, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    monkeypatch.setattr(config, 'INCREMENTAL_TAIL_BYTES', 64)
+    monkeypatch.setattr(config, 'ARCHIVOS_STREAMING', [])
+    monkeypatch.setattr(config, 'DESCARGA_RANGOS_UMBRAL', 1 << 40)
+    monkeypatch.setattr(config, 'HTTP_REINTENTOS', 0)
+    monkeypatch.setattr(config, 'STREAMING_CHUNK_ROWS', 50)
+    
+    loader = SharePointLoader()
+    loader.use_sharepoint = True
+    loader.access_token = 'token'
+    loader.token_expires_at = time.time() + 3600
+    loader.site_id, loader.drive_id = 'sitio', 'drive'
+    monkeypatch.setattr(loader, '_file_content_url', servidor.url)
+    monkeypatch.setattr(loader, '_get_remote_metadata', servidor.metadatos)
+    return loader
+
+
+def cache_csv():
+    with open(os.path.join(config.CACHE_DIRECTORY, ARCHIVO), 'rb') as f:
+        return f.read()
+
+
+def cargar(loader):
+    return loader.load_csv('HISTORICO_PYP')
+
+
+def test_crecimiento_descarga_solo_los_bytes_nuevos(servidor, loader):
+    servidor.archivos[ARCHIVO] = ENCABEZADO + filas(0, 300)
+    assert len(cargar(loader)) == 300
+    assert servidor.rangos_pedidos() == []
+    
+    anterior = len(servidor.archivos[ARCHIVO])
+    servidor.archivos[ARCHIVO] += filas(300, 420)
+    df = cargar(loader)
+    
+    # Una sola solicitud, desde la cola ya conocida hasta el final
+    inicio = anterior - config.INCREMENTAL_TAIL_BYTES
+    assert servidor.rangos_pedidos() == [f'bytes={inicio}-{len(servidor.archivos[ARCHIVO]) - 1}']
+    assert len(servidor.solicitudes) == 2
+    
+    assert df['ID_PACIENTE'].tolist() == list(range(420))
+    assert df['IDCAB_FAC'].dtype == 'Int32'
+    assert df['FECHA'].dtype == 'datetime64[ns]'
+    assert cache_csv() == servidor.archivos[ARCHIVO]
+    
+    # El cache columnar quedó con las filas agregadas: la siguiente carga no pide nada
+    leido, metadatos = loader._load_columnar(ARCHIVO, os.path.join(config.CACHE_DIRECTORY, ARCHIVO),
+                                             'utf-8', {}, schema=config.ESQUEMAS['HISTORICO_PYP'])
+    pd.testing.assert_frame_equal(leido, df)
+    pd.testing.assert_frame_equal(cargar(loader), df)
+    assert len(servidor.solicitudes) == 2
+
+
+def test_prefijo_modificado_descarga_completo(servidor, loader):
+    servidor.archivos[ARCHIVO] = ENCABEZADO + filas(0, 300)
+    cargar(loader)
+    
+    # Cambia la última fila ya cacheada (dentro de la cola que se compara) y crece
+    contenido = servidor.archivos[ARCHIVO]
+    corte = contenido.rstrip(b'\n').rfind(b'\n') + 1
+    servidor.archivos[ARCHIVO] = contenido[:corte] + b'9999,100,,2024-02-01\n' + filas(300, 350)
+    df = cargar(loader)
+    
+    assert len(servidor.rangos_pedidos()) == 1
+    assert servidor.solicitudes[-1] == (ARCHIVO, None)
+    assert df['ID_PACIENTE'].tolist() == list(range(299)) + [9999] + list(range(300, 350))
+    assert cache_csv() == servidor.archivos[ARCHIVO]
+
+
+def test_respuesta_200_a_un_range_descarga_completo(servidor, loader):
+    servidor.archivos[ARCHIVO] = ENCABEZADO + filas(0, 300)
+    cargar(loader)
+    
+    servidor.ignorar_rangos = True
+    servidor.archivos[ARCHIVO] += filas(300, 360)
+    df = cargar(loader)
+    
+    # Se pidió el rango, el servidor respondió completo y se volvió a descargar sin Range
+    assert len(servidor.rangos_pedidos()) == 1
+    assert servidor.solicitudes[-1] == (ARCHIVO, None)
+    assert df['ID_PACIENTE'].tolist() == list(range(360))
+    assert cache_csv() == servidor.archivos[ARCHIVO]
+
+
+def test_cache_sin_salto_de_linea_final_descarga_completo(servidor, loader):
+    servidor.archivos[ARCHIVO] = ENCABEZADO + filas(0, 300).rstrip(b'\n')
+    assert len(cargar(loader)) == 300
+    
+    # Al crecer, la última fila del cache recibe su salto de línea: no se puede
+    # pegar solo la cola sin unir dos filas
+    servidor.archivos[ARCHIVO] += b'\n' + filas(300, 330)
+    df = cargar(loader)
+    
+    assert servidor.rangos_pedidos() == []
+    assert len(servidor.solicitudes) == 2
+    assert df['ID_PACIENTE'].tolist() == list(range(330))
+    assert cache_csv() == servidor.archivos[ARCHIVO]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Capa de transporte HTTP para Microsoft Graph
+Todas las solicitudes del loader pasan por aquí: agrega el token, reintenta
+con espera exponencial acotada los errores temporales (429/5xx, conexión,
+timeout) respetando Retry-After, renueva el token ante un 401 y registra
+cuántos reintentos y cuánto tiempo de espera consumió cada carga
+"""
+
+import time
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import requests
+
+import config_sharepoint as config
+
+
+def _parse_retry_after(valor):
+    """Segundos indicados por el header Retry-After (número o fecha HTTP)"""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TransporteHTTP:
+    """
+    Solicitudes HTTP con reintentos, Retry-After, renovación de token y métricas
+    
+    Las métricas se acumulan por etiqueta (normalmente la clave del archivo)
+    en self.metricas; la etiqueta de la carga en curso es propia de cada hilo
+    y se fija con medir().
+    """
+    
+    def __init__(self, session, token_provider=None, token_refresh=None):
+        """
+        Args:
+            session: requests.Session compartida (pool de conexiones)
+            token_provider: Función que devuelve el token de acceso actual
+            token_refresh: Función que fuerza la obtención de un token nuevo
+        """
+        self.session = session
+        self.token_provider = token_provider
+        self.token_refresh = token_refresh
+        self.metricas = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    @contextmanager
+    def medir(self, etiqueta):
+        """Asociar las solicitudes de este hilo a una etiqueta (reinicia sus métricas)"""
+        with self._lock:
+            self.metricas[etiqueta] = {'solicitudes': 0, 'reintentos': 0, 'espera_segundos': 0.0}
+        anterior = getattr(self._local, 'etiqueta', None)
+        self._local.etiqueta = etiqueta
+        try:
+            yield self.metricas[etiqueta]
+        finally:
+            self._local.etiqueta = anterior
+    
+    def etiqueta_actual(self):
+        """Etiqueta de la carga en curso en este hilo (para propagarla a otros hilos)"""
+        return getattr(self._local, 'etiqueta', None)
+    
+    @contextmanager
+    def continuar(self, etiqueta):
+        """Asociar este hilo a una etiqueta existente sin reiniciar sus métricas"""
+        anterior = getattr(self._local, 'etiqueta', None)
+        self._local.etiqueta = etiqueta
+        try:
+            yield
+        finally:
+            self._local.etiqueta = anterior
+    
+    def _registrar(self, campo, valor):
+        etiqueta = getattr(self._local, 'etiqueta', None)
+        if etiqueta is None:
+            return
+        with self._lock:
+            metricas = self.metricas.setdefault(
+                etiqueta, {'solicitudes': 0, 'reintentos': 0, 'espera_segundos': 0.0})
+            metricas[campo] += valor
+    
+    def _espera(self, intento, response=None):
+        """Segundos a esperar antes del siguiente intento"""
+        if response is not None:
+            retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(retry_after, config.HTTP_RETRY_AFTER_MAX_SEGUNDOS)
+        
+        # Espera exponencial acotada con jitter para no sincronizar los reintentos de varios hilos
+        espera = min(config.HTTP_BACKOFF_MAX_SEGUNDOS, config.HTTP_BACKOFF_BASE_SEGUNDOS * (2 ** intento))
+        return espera * random.uniform(0.5, 1.0)
+    
+    def get(self, url, headers=None, params=None, stream=False, timeout=None, auth=True):
+        """
+        GET con reintentos
+        
+        Args:
+            url: URL a consultar
+            headers: Headers adicionales (Range, etc.)
+            params: Parámetros de la consulta
+            stream: No descargar el cuerpo de inmediato
+            timeout: (conexión, lectura) en segundos; por defecto config.HTTP_TIMEOUT
+            auth: Agregar el header Authorization con el token actual
+        
+        Returns:
+            requests.Response con estado exitoso
+        
+        Raises:
+            requests.exceptions.HTTPError si la respuesta final es un error,
+            o la excepción de conexión/timeout del último intento
+        """
+        timeout = timeout or config.HTTP_TIMEOUT
+        token_renovado = False
+        intento = 0
+        
+        while True:
+            request_headers = dict(headers or {})
+            if auth and self.token_provider:
+                request_headers['Authorization'] = f'Bearer {self.token_provider()}'
+            
+            self._registrar('solicitudes', 1)
+            response = None
+            try:
+                response = self.session.get(url, headers=request_headers, params=params,
+                                            stream=stream, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if intento >= config.HTTP_REINTENTOS:
+                    raise
+            else:
+                # Token vencido o revocado: renovarlo una vez y repetir sin contar como reintento
+                if response.status_code == 401 and auth and self.token_refresh and not token_renovado:
+                    response.close()
+                    token_renovado = True
+                    self.token_refresh()
+                    continue
+                
+                if response.status_code not in config.HTTP_ESTADOS_REINTENTO or intento >= config.HTTP_REINTENTOS:
+                    response.raise_for_status()
+                    return response
+                response.close()
+            
+            espera = self._espera(intento, response)
+            estado = response.status_code if response is not None else 'sin respuesta'
+            print(f"⏳ Reintento {intento + 1}/{config.HTTP_REINTENTOS} en {espera:.1f}s ({estado}): {url}")
+            self._registrar('reintentos', 1)
+            self._registrar('espera_segundos', espera)
+            time.sleep(espera)
+            intento += 1